@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Logging benchmark - event loop time spent inside log calls.
+
+Compares the old synchronous StreamHandler with the queued logger from
+utils/logger.py while stdout is a slow sink (e.g. piped to a log collector).
+
+Usage:
+    python benchmarks/logging_bench.py --calls 5000 --write-delay-ms 0.2
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class SlowStream:
+    """Stream that blocks on every write like a congested pipe"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.lines = 0
+
+    def write(self, data):
+        time.sleep(self.delay)
+        self.lines += data.count('\n')
+
+    def flush(self):
+        pass
+
+
+async def log_calls(logger, calls, lazy):
+    """Log like a battle loop would and measure time spent in log calls"""
+    spent = 0.0
+    hp, max_hp = 120, 300
+    for round_number in range(calls):
+        started = time.perf_counter()
+        if lazy:
+            logger.info("Clicked attack (round %s, HP: %s/%s)", round_number, hp, max_hp)
+        else:
+            logger.info(f"Clicked attack (round {round_number}, HP: {hp}/{max_hp})")
+        spent += time.perf_counter() - started
+        await asyncio.sleep(0)
+    return spent
+
+
+def sync_logger(stream):
+    """The previous setup: StreamHandler writing on the calling thread"""
+    logger = logging.getLogger("bench.sync")
+    logger.handlers.clear()
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                                           datefmt='%Y-%m-%d %H:%M:%S'))
+    logger.addHandler(handler)
+    return logger
+
+
+def queued_logger(stream):
+    """utils.logger setup with stdout replaced by the slow stream"""
+    from utils import logger as log_module
+    real_stdout = sys.stdout
+    sys.stdout = stream
+    try:
+        log_module.configure_logging(json_output=False, log_file='')
+    finally:
+        sys.stdout = real_stdout
+    logger = log_module.setup_logger("bench.queued")
+    logger.propagate = False
+    return logger, log_module
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Event loop time spent on logging')
+    parser.add_argument('--calls', type=int, default=5000, help='Log calls per run (default: 5000)')
+    parser.add_argument('--write-delay-ms', type=float, default=0.2, help='Blocking time per write (default: 0.2)')
+    args = parser.parse_args()
+
+    delay = args.write_delay_ms / 1000
+    results = []
+
+    for lazy in (False, True):
+        stream = SlowStream(delay)
+        spent = asyncio.run(log_calls(sync_logger(stream), args.calls, lazy))
+        results.append(("sync StreamHandler", lazy, spent))
+
+    for lazy in (False, True):
+        stream = SlowStream(delay)
+        logger, log_module = queued_logger(stream)
+        spent = asyncio.run(log_calls(logger, args.calls, lazy))
+        log_module.shutdown_logging()  # drain queue before next run
+        results.append(("QueueHandler", lazy, spent))
+
+    print(f"{args.calls} log calls, sink blocks {args.write_delay_ms} ms per write")
+    print(f"{'backend':<20} {'style':<9} {'loop time':>12} {'per call':>10}")
+    for backend, lazy, spent in results:
+        style = "%-style" if lazy else "f-string"
+        print(f"{backend:<20} {style:<9} {spent * 1000:10.1f}ms {spent / args.calls * 1e6:8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Event loop benchmark - loop lag and throughput on asyncio vs uvloop.
+
+Several worker tasks run a bot-like cycle against the stand-in client from
+utils/traffic_log.py (no network): read the latest messages, parse the
+profile, click a button and save energy data as JSON. Each backend runs in a
+fresh interpreter with the LoopMonitor from utils/loop_monitor.py sampling
+scheduling delay, so the report shows p50/p99/max lag, slow callbacks and
+completed cycles per second. uvloop is skipped when it is not installed.
+
+Usage:
+    python benchmarks/loop_bench.py --seconds 5 --workers 20
+    python benchmarks/loop_bench.py --backend uvloop
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+PROFILE = ("👤 Bench\n❤️ Здоров'я: 245/300\n⚡ Енергія: 12/20\n💰 Золото: 1534\n"
+           "📊 Рівень: 14 (8120/9000 досвіду)")
+
+
+def child(args):
+    """Run the workload on one backend and print its stats as JSON"""
+    import asyncio
+    import os
+    sys.path.insert(0, str(ROOT))
+    os.chdir(tempfile.mkdtemp(prefix='loop_bench_'))  # Keep energy_data.json out of the project
+    from utils import loop_monitor
+    from utils.energy_tracker import EnergyTracker
+    from utils.parser import GameParser
+    from utils.traffic_log import StandInClient
+
+    async def worker(client, parser, tracker, deadline, done):
+        while time.monotonic() < deadline:
+            messages = await client.get_messages('bench', limit=5)
+            parser.parse_profile(messages[0].text)
+            await messages[0].click(0)
+            client.actions.clear()
+            tracker.energy_used += 1
+            tracker.save_data()
+            done[0] += 1
+            await asyncio.sleep(0)
+
+    async def run():
+        monitor = loop_monitor.start(interval=args.interval, slow_callback=args.slow_ms / 1000)
+        client = StandInClient()
+        await client.start()
+        for _ in range(20):
+            client.add_message(PROFILE, [['⚔️ Атакувати', '🏃 Втекти']])
+        tracker = EnergyTracker()
+        done = [0]
+        deadline = time.monotonic() + args.seconds
+        await asyncio.gather(*(worker(client, GameParser(), tracker, deadline, done)
+                               for _ in range(args.workers)))
+        stats = monitor.stats()
+        stats['backend'] = loop_monitor.loop_backend()
+        stats['cycles'] = done[0]
+        monitor.stop()
+        print("RESULT " + json.dumps(stats), flush=True)
+
+    loop_monitor.run(run(), use_uvloop=args.backend == 'uvloop')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loop lag and throughput with and without uvloop')
+    parser.add_argument('--seconds', type=float, default=5, help='Run time per backend (default: 5)')
+    parser.add_argument('--workers', type=int, default=20, help='Concurrent bot-like tasks (default: 20)')
+    parser.add_argument('--interval', type=float, default=0.01, help='Lag sampling interval (default: 0.01)')
+    parser.add_argument('--slow-ms', type=float, default=20, help='Slow callback threshold (default: 20)')
+    parser.add_argument('--backend', choices=('asyncio', 'uvloop'), help='Run only this backend')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    backends = [args.backend] if args.backend else ['asyncio', 'uvloop']
+    results = []
+    for backend in backends:
+        command = [sys.executable, __file__, '--child', '--backend', backend,
+                   '--seconds', str(args.seconds), '--workers', str(args.workers),
+                   '--interval', str(args.interval), '--slow-ms', str(args.slow_ms)]
+        output = subprocess.run(command, capture_output=True, text=True).stdout
+        line = next((line for line in output.splitlines() if line.startswith('RESULT ')), None)
+        if line is None:
+            print(f"{backend}: run failed\n{output}")
+            continue
+        stats = json.loads(line[len('RESULT '):])
+        if stats['backend'] != backend:
+            print(f"{backend}: not installed (pip install {backend}), skipped")
+            continue
+        results.append(stats)
+
+    print(f"{args.workers} workers, {args.seconds:g}s per backend, lag sampled every {args.interval * 1000:g}ms")
+    print(f"{'backend':<9} {'p50':>8} {'p99':>8} {'max':>8} {'slow':>6} {'cycles/s':>10}")
+    for stats in results:
+        print(f"{stats['backend']:<9} {stats['p50'] * 1000:6.2f}ms {stats['p99'] * 1000:6.2f}ms "
+              f"{stats['max'] * 1000:6.2f}ms {stats['slow_callbacks']:>6} {stats['cycles'] / args.seconds:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
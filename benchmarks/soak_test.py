@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Memory soak test - GameBot running for a simulated week.
+
+GameBot.main_loop runs against a scripted game (a stand-in client from
+utils/traffic_log.py that answers profile checks, explores, battle clicks and
+potion shop trips)
+on an event loop with a virtual clock: whenever nothing is ready to run, the
+clock jumps to the next timer, so HP/energy waits and human delays cost no
+real time. time.time() and time.monotonic() follow the virtual clock.
+The report ends with the time lost to human delays per action kind.
+
+After a warm-up period the memory probe (utils/memory_probe.py) takes a
+tracemalloc baseline, then a snapshot every few virtual hours. The run fails
+(exit code 1) when RSS grew more than --rss-budget-mb or a single allocation
+site grew more than --site-budget-kb since the baseline.
+
+State files (battle database, checkpoint, escape table, energy data) go to a
+temp directory. The parse cache is shrunk (--parse-cache-size) so that bounded
+caches are full before the baseline and only unbounded growth is reported.
+
+Usage:
+    python benchmarks/soak_test.py --days 7
+    python benchmarks/soak_test.py --days 1 --snapshot-hours 2 --site-budget-kb 128
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import selectors
+import sys
+import tempfile
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from config import Config
+from modules.game_bot import GameBot
+from utils import humanize, memory_probe
+from utils.logger import configure_logging
+from utils.traffic_log import StandInClient
+
+BATTLE_BUTTONS = [['⚔️ Атака', '✨ Прийоми'], ['🧪 Зілля', '🏃 Втеча']]
+MOBS = ["Вовк", "Дикий Кабан", "Лісовий Гоблін", "Лютий Злоніч"]
+POTION_PRICE = 10
+SHOP_ITEMS = [[f"Зілля здоров'я - {POTION_PRICE}💰"], ['⬅️ Назад']]
+
+
+class SkippingSelector(selectors.DefaultSelector):
+    """Selector that advances the virtual clock instead of blocking for a timeout"""
+
+    def __init__(self, clock):
+        super().__init__()
+        self.clock = clock
+
+    def select(self, timeout=None):
+        events = super().select(0)
+        if events or timeout == 0:
+            return events
+        if timeout is None or self.clock.executor_jobs:
+            return super().select(timeout)  # Thread pool work (SQLite) finishes in real time
+        self.clock.now += timeout
+        return []
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose time jumps to the next scheduled timer when idle"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.executor_jobs = 0
+        super().__init__(SkippingSelector(self))
+
+    def time(self):
+        return self.now
+
+    def run_in_executor(self, executor, func, *args):
+        """Count thread pool jobs so the clock does not jump while one is running"""
+        self.executor_jobs += 1
+        future = super().run_in_executor(executor, func, *args)
+        future.add_done_callback(self._executor_job_done)
+        return future
+
+    def _executor_job_done(self, future):
+        self.executor_jobs -= 1
+
+
+class SoakGame(StandInClient):
+    """Scripted game: profile, exploration, battles with HP/energy regeneration and a potion shop"""
+
+    HISTORY = 50  # Chat messages kept, like a client only ever seeing recent history
+
+    def __init__(self, seed=1):
+        super().__init__()
+        self.random = random.Random(seed)
+        self.actions = deque(maxlen=1000)
+        self.hp, self.max_hp = 120, 120  # Low enough to drink potions (BATTLE_POTION_THRESHOLD)
+        self.energy, self.max_energy = 20, 20
+        self.level, self.gold, self.xp = 10, 0, 0
+        self.regen_at = time.time()
+        self.battle = None  # [message, mob name, mob HP]
+        self.battles = 0
+        self.potions, self.potions_bought = 3, 0
+        self.shop = None  # Shop item list message, item details replace it in place
+
+    def add_message(self, text, buttons=None, out=False):
+        msg = super().add_message(text, buttons, out)
+        while len(self.messages) > self.HISTORY:
+            del self.messages[min(self.messages)]
+        return msg
+
+    def regenerate(self):
+        """HP +5 per minute, energy +1 per 30 minutes"""
+        minutes = (time.time() - self.regen_at) / 60
+        if minutes < 1:
+            return
+        self.regen_at = time.time()
+        self.hp = min(self.max_hp, self.hp + int(minutes * 5))
+        self.energy = min(self.max_energy, self.energy + int(minutes // 30))
+
+    def profile(self):
+        text = (f"👤 Soak\n🏅 Рівень {self.level}\n❤️ Здоров'я: {self.hp}/{self.max_hp}\n"
+                f"⚡ Енергія: {self.energy}/{self.max_energy}\n💰 Золото: {self.gold}")
+        if self.hp < self.max_hp:
+            text += f"\n⏳ {(self.max_hp - self.hp) // 5 + 1}хв до повного відновлення здоров'я"
+        if self.energy < self.max_energy:
+            text += "\n⏳ 30хв до відновлення енергії"
+        return text
+
+    async def send_message(self, entity, message, **kwargs):
+        sent = await super().send_message(entity, message, **kwargs)
+        self.regenerate()
+        if message == '/start':
+            self.add_message("Головне меню", [['🏘 Місто']])
+        elif message.startswith("🧍"):
+            self.add_message(self.profile())
+        elif message.startswith("🗺️"):
+            self.explore()
+        return sent
+
+    def explore(self):
+        if self.energy < 1:
+            self.add_message("Недостатньо енергії")
+            return
+        self.energy -= 1
+        roll = self.random.random()
+        if roll < 0.75:
+            mob = self.random.choice(MOBS)
+            self.battles += 1
+            self.battle = [None, mob, self.random.randint(60, 150)]
+            self.battle[0] = self.add_message(self.battle_text(), BATTLE_BUTTONS)
+        elif roll < 0.85:
+            self.add_message("Ви знайшли покинутий табір", [['🔍 Дослідити']])
+        else:
+            self.add_message("Ви нічого не знайшли")
+
+    def battle_text(self):
+        msg, mob, mob_hp = self.battle
+        return f"З'явився {mob}!\n👤 Ви ({self.hp}/{self.max_hp})\n👹 {mob} ({mob_hp})"
+
+    def edit_battle(self):
+        self.battle[0].update(self.battle_text(), BATTLE_BUTTONS, datetime.fromtimestamp(time.time()))
+
+    def hit(self, damage):
+        """Our hit and the mob's answer, ends the battle when someone drops"""
+        self.battle[2] -= damage
+        if self.battle[2] <= 0:
+            xp, gold = self.random.randint(10, 30), self.random.randint(1, 10)
+            self.xp += xp
+            self.gold += gold
+            self.battle = None
+            self.add_message(f"Перемога!\nВи отримали:\n⭐ {xp} досвіду\n💰 {gold} золота")
+            return
+        self.hp -= self.random.randint(10, 35)
+        if self.hp <= 0:
+            self.hp = 1
+            self.battle = None
+            self.add_message("Ви зазнали поразки!")
+            return
+        self.edit_battle()
+
+    def on_click(self, msg, label):
+        label = label or ''
+        if "Дослідити" in label:
+            msg.update("Табір досліджено", None)
+            self.add_message(f"Ви знайшли:\n💰 {self.random.randint(1, 5)} золота")
+            return
+        if self.shop_click(msg, label):
+            return
+        if self.battle is None:
+            self.add_message("Ви не перебуваєте в бою")
+            return
+        if "Атака" in label:
+            self.hit(self.random.randint(20, 40))
+        elif "Прийоми" in label:
+            self.add_message("Оберіть прийом:", [['💥 Сильний удар'], ['⬅️ Назад']])
+        elif "Сильний удар" in label:
+            msg.update("Прийом використано", None)
+            self.hit(self.random.randint(40, 70))
+        elif "Зілля" in label and msg is self.battle[0]:
+            if self.potions:
+                self.add_message("Оберіть зілля:", [[f"🧪 Мале зілля здоров'я ({self.potions})"], ['⬅️ Назад']])
+            else:
+                self.add_message("Оберіть зілля:\nУ вас немає зілль", [['⬅️ Назад']])
+        elif "зілля" in label and self.potions:
+            msg.update("Зілля випито", None)
+            self.potions -= 1
+            self.hp = min(self.max_hp, self.hp + 100)
+            self.edit_battle()
+        elif "Втеча" in label:
+            if self.random.random() < 0.5:
+                self.battle = None
+                self.add_message("Вам вдалося втекти!")
+            else:
+                self.add_message("Втеча не вдалася!")
+                self.edit_battle()
+
+    def shop_click(self, msg, label):
+        """Town -> shop -> item list -> item details -> buy; True if the click was a shop click"""
+        if "Місто" in label:
+            self.add_message("🏘 Місто", [['🏪 Крамниця'], ['⬅️ Назад']])
+        elif "Крамниця" in label:
+            self.add_message("🏪 Крамниця", [['🛍 Купити предмети']])
+        elif "Купити предмети" in label:
+            self.shop = self.add_message("Товари:", SHOP_ITEMS)
+        elif msg is not self.shop:
+            return False
+        elif "Зілля здоров'я" in label:
+            msg.update(f"Зілля здоров'я\nХарактеристики: +100 здоров'я\nЦіна: {POTION_PRICE}",
+                       [[f"Купити за {POTION_PRICE}💰"], ['⬅️ Назад']], datetime.fromtimestamp(time.time()))
+        elif "Купити за" in label:
+            if self.gold < POTION_PRICE:
+                self.add_message("Недостатньо золота")
+            else:
+                self.gold -= POTION_PRICE
+                self.potions += 1
+                self.potions_bought += 1
+                self.add_message(f"Успішно придбано Зілля здоров'я за {POTION_PRICE} золота")
+        elif "Назад" in label:
+            msg.update("Товари:", SHOP_ITEMS, datetime.fromtimestamp(time.time()))
+        return True
+
+
+def soak_config(directory, parse_cache_size):
+    """Config with all state files in the temp directory"""
+    config = Config()
+    config.PARSE_CACHE_SIZE = parse_cache_size
+    config.BATTLE_DB_PATH = str(directory / 'battles.db')
+    config.CHECKPOINT_PATH = str(directory / 'checkpoint.json')
+    config.ESCAPE_TABLE_PATH = str(directory / 'escape_table.json')
+    config.PEER_CACHE_PATH = ''
+    config.TRAFFIC_LOG = ''
+    config.DAILY_ENERGY_LIMIT = 0
+    config.EXPLORATION_START_HOUR = -1
+    config.POTION_RESTOCK_BELOW = 2  # Opt in, so the soak covers shop trips
+    return config
+
+
+async def soak(args, loop):
+    config = soak_config(Path(os.getcwd()), args.parse_cache_size)
+    game = SoakGame(args.seed)
+    await game.start()
+    bot = GameBot(game, config)
+    bot_task = asyncio.create_task(bot.start())
+
+    hour = 3600
+    probe = memory_probe.MemoryProbe()
+    snapshots = []
+    await asyncio.sleep(args.warmup_hours * hour)
+    probe.start()
+    started = time.perf_counter()
+    print(f"Baseline after {args.warmup_hours:g}h warm-up: RSS {probe.baseline_rss / 2**20:.1f}MB, "
+          f"{game.battles} battles")
+    print(f"{'virtual time':>12} {'RSS':>9} {'RSS growth':>11} {'traced':>9} {'battles':>8}")
+
+    while loop.time() < args.days * 24 * hour:
+        await asyncio.sleep(min(args.snapshot_hours * hour, args.days * 24 * hour - loop.time()))
+        if bot_task.done():
+            break
+        snapshot = probe.snapshot(args.top)
+        snapshots.append(snapshot)
+        hours = loop.time() / hour
+        print(f"{int(hours // 24)}d {hours % 24:5.1f}h {snapshot['rss'] / 2**20:7.1f}MB "
+              f"{snapshot['rss_growth'] / 2**20:+9.1f}MB {snapshot['traced'] / 2**20:7.1f}MB {game.battles:8}",
+              flush=True)
+
+    bot.is_running = False
+    bot_task.cancel()
+    await asyncio.gather(bot_task, return_exceptions=True)
+    if bot_task.done() and not bot_task.cancelled() and bot_task.exception():
+        print(f"GameBot stopped with an error: {bot_task.exception()}")
+        return False
+    await bot.stop()
+    probe.stop()
+    print(f"Simulated {loop.time() / 86400:.1f} days in {time.perf_counter() - started:.0f}s after warm-up, "
+          f"{game.battles} battles, {game.xp} XP, {game.gold} gold, {game.potions_bought} potions bought "
+          f"in {bot.potion_stock.restocks} restock trips")
+    delays = humanize.get_humanizer().totals(config.HUMAN_DELAY_BUDGET_WINDOW)
+    print(f"Time lost to human delays: {delays['seconds'] / 3600:.1f}h over {delays['count']} actions "
+          f"({delays['seconds'] / loop.time():.1%} of wall time), {delays['trimmed'] / 3600:.1f}h trimmed by the "
+          f"{config.HUMAN_DELAY_BUDGET:.0%} budget\n{humanize.get_humanizer().summary()}")
+    return check_budget(snapshots[-1] if snapshots else None, args)
+
+
+def check_budget(snapshot, args):
+    """Compare the last snapshot against the budgets"""
+    if snapshot is None:
+        print("No snapshots taken")
+        return False
+    print(f"Top growing allocation sites since baseline:\n{memory_probe.format_snapshot(snapshot)}")
+    ok = True
+    if snapshot['rss_growth'] > args.rss_budget_mb * 2**20:
+        print(f"FAIL: RSS grew {snapshot['rss_growth'] / 2**20:.1f}MB (budget {args.rss_budget_mb:g}MB)")
+        ok = False
+    for site in snapshot['top_growth']:
+        if site['size_diff'] > args.site_budget_kb * 1024:
+            print(f"FAIL: {site['site']} grew {site['size_diff'] / 1024:.1f}KB (budget {args.site_budget_kb:g}KB)")
+            ok = False
+    if ok:
+        print("PASS: memory growth within budget")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run GameBot for simulated days and check memory growth')
+    parser.add_argument('--days', type=float, default=7, help='Simulated days (default: 7)')
+    parser.add_argument('--warmup-hours', type=float, default=6, help='Virtual hours before the baseline (default: 6)')
+    parser.add_argument('--snapshot-hours', type=float, default=12, help='Virtual hours between snapshots (default: 12)')
+    parser.add_argument('--rss-budget-mb', type=float, default=16, help='Allowed RSS growth (default: 16)')
+    parser.add_argument('--site-budget-kb', type=float, default=256,
+                        help='Allowed growth of one allocation site (default: 256)')
+    parser.add_argument('--parse-cache-size', type=int, default=128,
+                        help='Parse cache entries, filled during warm-up (default: 128)')
+    parser.add_argument('--top', type=int, default=10, help='Allocation sites to report (default: 10)')
+    parser.add_argument('--seed', type=int, default=1, help='Game randomness seed (default: 1)')
+    parser.add_argument('--verbose', action='store_true', help='Show bot log output')
+    args = parser.parse_args()
+
+    configure_logging(log_file='', level=logging.INFO if args.verbose else logging.ERROR)
+    os.chdir(tempfile.mkdtemp(prefix='soak_'))
+
+    loop = VirtualClockLoop()
+    wall_start, monotonic_start = time.time(), time.monotonic()
+    time.time = lambda: wall_start + loop.now
+    time.monotonic = lambda: monotonic_start + loop.now
+    asyncio.set_event_loop(loop)
+    try:
+        ok = loop.run_until_complete(soak(args, loop))
+    finally:
+        loop.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark - time from process launch to the first game command.
+
+Each run launches a fresh interpreter that starts GameBot the way main.py
+does and exits right before the first command (send or click) would go out,
+so nothing reaches the game. The parent measures launch -> first command;
+the child reports time spent importing and in deliberate sleeps (human
+delays, the post-/start wait), which are skipped with --skip-sleeps.
+
+By default the child uses the stand-in client from utils/traffic_log.py
+(no network, measures our own startup overhead, state files go to a temp
+directory). With --live it uses the real session, peer cache and checkpoint
+from the project directory, so Telethon import, client.start() and peer
+resolution are included.
+
+Usage:
+    python benchmarks/startup_bench.py --runs 5 --skip-sleeps
+    python benchmarks/startup_bench.py --live --skip-sleeps
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def child(args):
+    """Start GameBot and report when it is about to send its first command"""
+    import asyncio
+    started = time.monotonic()
+    sys.path.insert(0, str(ROOT))
+    if args.live:
+        os.chdir(ROOT)  # Session file, .env, caches and checkpoint of the real bot
+    else:
+        import tempfile
+        os.chdir(tempfile.mkdtemp(prefix='startup_bench_'))  # Keep state files out of the project
+
+    from config import Config
+    from modules.game_bot import GameBot
+    from utils import tracing
+    from utils.game_client import GameClient
+    imported = time.monotonic()
+
+    slept = [0.0]
+    real_sleep = tracing.sleep
+
+    async def counting_sleep(seconds, name=None):
+        slept[0] += seconds
+        if not args.skip_sleeps:
+            await real_sleep(seconds, name)
+
+    def first_command(kind):
+        elapsed = time.monotonic() - started
+        print(f"FIRST_COMMAND total={elapsed:.4f} import={imported - started:.4f} "
+              f"slept={0.0 if args.skip_sleeps else slept[0]:.4f} {kind}", flush=True)
+        os._exit(0)
+
+    async def send_message(self, entity, message, **kwargs):
+        first_command(f"send:{message}")
+
+    async def click(self, msg, *click_args, **kwargs):
+        first_command("click")
+
+    tracing.sleep = counting_sleep
+    GameClient.send_message = send_message
+    GameClient.click = click
+
+    async def run():
+        config = Config()
+        if args.live:
+            from telethon import TelegramClient
+            client = TelegramClient(config.SESSION_NAME, config.API_ID, config.API_HASH)
+            await client.start()
+        else:
+            from utils.traffic_log import StandInClient
+            client = StandInClient()
+            await client.start()
+        await GameBot(client, config, started).start()
+
+    asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Process launch to first game command')
+    parser.add_argument('--runs', type=int, default=5, help='Launches to measure (default: 5)')
+    parser.add_argument('--live', action='store_true', help='Use the real Telegram session from .env')
+    parser.add_argument('--skip-sleeps', action='store_true', help='Skip deliberate delays before the first command')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    command = [sys.executable, __file__, '--child']
+    if args.live:
+        command.append('--live')
+    if args.skip_sleeps:
+        command.append('--skip-sleeps')
+
+    results = []
+    for _ in range(args.runs):
+        launched = time.perf_counter()
+        output = subprocess.run(command, capture_output=True, text=True).stdout
+        wall = time.perf_counter() - launched
+        line = next((line for line in output.splitlines() if line.startswith('FIRST_COMMAND')), None)
+        if line is None:
+            print("Child exited without sending a command:\n" + output)
+            return
+        parts = line.split(maxsplit=4)
+        fields = dict(part.split('=') for part in parts[1:4])
+        results.append((wall, float(fields['import']), float(fields['slept']), parts[4]))
+
+    print(f"{'run':<4} {'launch->cmd':>12} {'imports':>9} {'sleeps':>9} {'overhead':>9}  first command")
+    for index, (wall, imported, slept, kind) in enumerate(results, 1):
+        print(f"{index:<4} {wall * 1000:10.0f}ms {imported * 1000:7.0f}ms {slept * 1000:7.0f}ms "
+              f"{(wall - slept) * 1000:7.0f}ms  {kind}")
+    walls = sorted(wall for wall, *_ in results)
+    print(f"median launch -> first command: {walls[len(walls) // 2] * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Control client for the AutoOstromag daemon (daemon.py)
+
+Examples:
+    python botctl.py auto
+    python botctl.py buy --item "Шкіряні Чоботи" --quantity 10
+    python botctl.py buy --list "Шкіряні Чоботи:10:60" --list "Зілля здоров'я:5"
+    python botctl.py disassemble --item "Шкіряні Чоботи"
+    python botctl.py list | status | pause | resume | shutdown
+    python botctl.py cancel 3
+    python botctl.py memory [--limit 20] [--stop]
+"""
+
+import argparse
+import json
+import socket
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def request(socket_path, payload):
+    """Send one command to the daemon and return its response"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(payload, ensure_ascii=False).encode() + b'\n')
+        data = b''
+        while not data.endswith(b'\n'):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+
+def format_job(job):
+    args = ' '.join(f"{key}={value}" for key, value in job['args'].items())
+    error = f" ({job['error']})" if job.get('error') else ''
+    return f"#{job['id']:<4} {job['kind']:<12} {job['status']:<10} {args}{error}"
+
+
+def main():
+    from config import Config
+    from buying_bot import parse_shopping_entry
+
+    parser = argparse.ArgumentParser(description='AutoOstromag daemon control')
+    parser.add_argument('--socket', default=None, help='Daemon socket (default: DAEMON_SOCKET from .env)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('auto', help='Queue auto-leveling')
+    buy = sub.add_parser('buy', help='Queue a buying job')
+    buy.add_argument('--item', default='Шкіряні Чоботи', help='Item to buy (default: Шкіряні Чоботи)')
+    buy.add_argument('--quantity', type=int, default=50, help='Quantity to buy (default: 50)')
+    buy.add_argument('--list', dest='shopping_list', action='append', type=parse_shopping_entry,
+                     metavar='ITEM:QTY[:MAX_PRICE]', help='Shopping list entry, may be repeated')
+    disassemble = sub.add_parser('disassemble', help='Queue a disassembly job')
+    disassemble.add_argument('--item', default='Шкіряні Чоботи', help='Item to disassemble (default: Шкіряні Чоботи)')
+    cancel = sub.add_parser('cancel', help='Cancel a queued or running job')
+    cancel.add_argument('id', type=int)
+    memory = sub.add_parser('memory', help='Memory snapshot (the first one starts tracemalloc)')
+    memory.add_argument('--limit', type=int, default=10, help='Allocation sites to show (default: 10)')
+    memory.add_argument('--stop', action='store_true', help='Stop tracemalloc')
+    for name, help_text in (('list', 'List jobs'), ('status', 'Daemon status'), ('pause', 'Pause the running job'),
+                            ('resume', 'Resume after pause'), ('shutdown', 'Stop the daemon')):
+        sub.add_parser(name, help=help_text)
+    args = parser.parse_args()
+
+    if args.command == 'auto':
+        payload = {'cmd': 'submit', 'kind': 'auto'}
+    elif args.command == 'buy':
+        job_args = {'item': args.item, 'quantity': args.quantity}
+        if args.shopping_list:
+            job_args['list'] = args.shopping_list
+        payload = {'cmd': 'submit', 'kind': 'buy', 'args': job_args}
+    elif args.command == 'disassemble':
+        payload = {'cmd': 'submit', 'kind': 'disassemble', 'args': {'item': args.item}}
+    elif args.command == 'cancel':
+        payload = {'cmd': 'cancel', 'id': args.id}
+    elif args.command == 'memory':
+        payload = {'cmd': 'memory', 'limit': args.limit, 'stop': args.stop}
+    else:
+        payload = {'cmd': args.command}
+
+    socket_path = args.socket or Config.DAEMON_SOCKET
+    try:
+        response = request(socket_path, payload)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"Daemon is not running (no socket at {socket_path})")
+        sys.exit(1)
+
+    if not response.get('ok'):
+        print(f"Error: {response.get('error')}")
+        sys.exit(1)
+    if 'job' in response:
+        print(format_job(response['job']))
+    elif 'jobs' in response:
+        for job in response['jobs']:
+            print(format_job(job))
+    elif 'memory' in response:
+        from utils.memory_probe import format_snapshot
+        print(format_snapshot(response['memory']) if response['memory'] else "Memory tracing stopped")
+    elif 'paused' in response:
+        current = format_job(response['current']) if response['current'] else 'idle'
+        print(f"{'paused' if response['paused'] else 'running'}, "
+              f"{'connected' if response['connected'] else 'reconnecting'} - current: {current}, "
+              f"queued: {response['queued'] or 'none'}")
+        cache = response.get('parse_cache')
+        if cache:
+            print(f"parse cache: {cache['hit_rate']:.0%} hit rate ({cache['hits']} hits, "
+                  f"{cache['misses']} misses, {cache['size']} entries)")
+        reads = response.get('history_reads')
+        if reads:
+            print(f"history reads: {reads['fetched']} fetched, {reads['coalesced']} served by a request in flight")
+        floods = response.get('flood_waits')
+        if floods and floods['count']:
+            print(f"flood waits: {floods['count']} raised, {floods['seconds']}s required")
+        for window, stats in (response.get('economy') or {}).items():
+            if stats['battles'] or stats['energy']:
+                print(f"economy {window}: {stats['xp_per_hour']:.1f} XP/h, {stats['gold_per_hour']:.1f} gold/h, "
+                      f"{stats['xp_per_energy']:.1f} XP/energy, {stats['waiting_share']:.0%} waiting "
+                      f"({stats['battles']} battles)")
+        delays = response.get('human_delays')
+        if delays and delays['count']:
+            print(f"human delays: {delays['seconds']:.0f}s over {delays['count']} actions, "
+                  f"{delays['trimmed']:.0f}s trimmed by the budget, {delays['share']:.0%} of recent wall time")
+        lag = response.get('loop_lag')
+        if lag:
+            print(f"loop lag: p50 {lag['p50'] * 1000:.1f}ms, p99 {lag['p99'] * 1000:.1f}ms, "
+                  f"max {lag['max'] * 1000:.1f}ms, {lag['slow_callbacks']} slow callbacks")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,55 +4,99 @@ Buying Bot for AutoOstromag - Specialized bot for purchasing resources
 Navigates through the game interface to buy items from the shop
 """
 
-import asyncio
 import sys
 import re
+import time
 from pathlib import Path
-from telethon import TelegramClient
-from telethon.errors import SessionPasswordNeededError
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from config import Config
-from utils.logger import setup_logger
+from utils import humanize, loop_monitor, parse_cache, runtime, tracing
+from utils.game_client import GameClient
+from utils.peer_cache import PeerCache
+from utils.logger import setup_logger, set_log_context
+from utils.parser import GameParser
 
 logger = setup_logger(__name__)
 
 
+class ShopCatalog:
+    """
+    Cached view of the shop item list: item name -> button position and price
+    """
+    
+    def __init__(self, ttl=600):
+        """Initialize empty catalog with cache lifetime in seconds"""
+        self.ttl = ttl
+        self.items = {}
+        self.message_id = None
+        self.updated_at = None
+    
+    def update(self, message_id, items):
+        """Store freshly parsed catalog for the given shop message"""
+        self.items = {name: dict(entry) for name, entry in items.items()}  # Own copy, prices are corrected in place
+        self.message_id = message_id
+        self.updated_at = time.monotonic()
+    
+    def is_fresh(self):
+        """Check if the cached catalog can still be trusted"""
+        if self.updated_at is None or not self.items:
+            return False
+        return time.monotonic() - self.updated_at < self.ttl
+    
+    def invalidate(self):
+        """Drop cached catalog so the next lookup rescans the shop"""
+        self.updated_at = None
+    
+    def find(self, item_name):
+        """Find catalog entry by exact or partial item name"""
+        if item_name in self.items:
+            return item_name, self.items[item_name]
+        for name, entry in self.items.items():
+            if item_name in name or name in item_name:
+                return name, entry
+        return None, None
+
+
 class BuyingBot:
     """
     Specialized bot for buying resources from the game shop
     """
     
-    def __init__(self, client, config, item_to_buy="Шкіряні Чоботи", quantity=50):
+    def __init__(self, client, config, item_to_buy="Шкіряні Чоботи", quantity=50, shopping_list=None):
         """Initialize buying bot with client and configuration"""
-        self.client = client
+        self.client = GameClient.wrap(client)
         self.config = config
+        self.parser = GameParser(parse_cache.get_cache(config.PARSE_CACHE_SIZE))
         self.game_chat = None
         self.item_to_buy = item_to_buy
-        self.quantity = quantity
         self.purchases_made = 0
         self.is_running = False
+        
+        # Shopping list of (item, quantity, max price or None)
+        self.shopping_list = shopping_list or [(item_to_buy, quantity, None)]
+        self.quantity = sum(qty for _, qty, _ in self.shopping_list)
+        self.purchases = {}  # item -> purchased count
+        self.gold = None
+        self.catalog = ShopCatalog(config.SHOP_CATALOG_TTL)
+        self.selected_after = 0  # Newest message id seen before the current item was clicked in the catalog
     
-    async def human_delay(self, min_seconds=None, max_seconds=None):
-        """Simulate human-like reaction time"""
-        import random
-        if min_seconds is None:
-            min_seconds = self.config.HUMAN_DELAY_MIN
-        if max_seconds is None:
-            max_seconds = self.config.HUMAN_DELAY_MAX
-        delay = random.uniform(min_seconds, max_seconds)
-        await asyncio.sleep(delay)
+    async def human_delay(self, kind=humanize.MENU_NAV):
+        """Simulate human-like reaction time for this kind of action"""
+        await humanize.delay(self.config, kind)
     
+    @tracing.traced('send_start_command')
     async def send_start_command(self):
         """Send /start command to refresh the game keyboard"""
         logger.info("Sending /start command to refresh game menu...")
-        await self.human_delay(2, 4)
+        await self.human_delay()
         await self.client.send_message(self.game_chat, '/start')
-        await asyncio.sleep(3)
+        await tracing.sleep(3)
         logger.info("Game menu refreshed")
     
+    @tracing.traced('navigate_to_town')
     async def navigate_to_town(self):
         """Navigate to the town (Місто)"""
         logger.info("Navigating to town...")
@@ -67,14 +111,15 @@ class BuyingBot:
                     for btn_idx, btn in enumerate(row):
                         if btn.text and "Місто" in btn.text:
                             await self.human_delay()
-                            await msg.click(row_idx, btn_idx)
+                            await self.client.click(msg, row_idx, btn_idx)
                             logger.info("Clicked 'Місто' button")
-                            await asyncio.sleep(3)
+                            await tracing.sleep(3)
                             return True
         
         logger.error("Could not find 'Місто' button")
         return False
     
+    @tracing.traced('navigate_to_shop')
     async def navigate_to_shop(self):
         """Navigate to the shop (Крамниця)"""
         logger.info("Navigating to shop...")
@@ -89,14 +134,15 @@ class BuyingBot:
                     for btn_idx, btn in enumerate(row):
                         if btn.text and "Крамниця" in btn.text:
                             await self.human_delay()
-                            await msg.click(row_idx, btn_idx)
+                            await self.client.click(msg, row_idx, btn_idx)
                             logger.info("Clicked 'Крамниця' button")
-                            await asyncio.sleep(3)
+                            await tracing.sleep(3)
                             return True
         
         logger.error("Could not find 'Крамниця' button")
         return False
     
+    @tracing.traced('click_buy_items')
     async def click_buy_items(self):
         """Click on 'Купити предмети' button"""
         logger.info("Looking for 'Купити предмети' button...")
@@ -110,44 +156,165 @@ class BuyingBot:
                     for btn_idx, btn in enumerate(row):
                         if btn.text and "Купити предмети" in btn.text:
                             await self.human_delay()
-                            await msg.click(row_idx, btn_idx)
+                            await self.client.click(msg, row_idx, btn_idx)
                             logger.info("Clicked 'Купити предмети' button")
-                            await asyncio.sleep(3)
+                            await tracing.sleep(3)
                             return True
         
         logger.error("Could not find 'Купити предмети' button")
         return False
     
-    async def select_item_to_buy(self):
-        """Select the item to buy (first button by default - Шкіряні Чоботи)"""
-        logger.info(f"Looking for '{self.item_to_buy}' to buy...")
-        await self.human_delay()
+    @tracing.traced('check_gold')
+    async def check_gold(self):
+        """Open character profile and read current gold"""
+        logger.info("Checking gold in character profile...")
+        await self.human_delay(humanize.PROFILE_CHECK)
+        await self.client.send_message(self.game_chat, "🧍 Персонаж")
+        await tracing.sleep(3)
+        
+        messages = await self.client.get_messages(self.game_chat, limit=2)
+        for msg in messages:
+            profile = self.parser.profile(msg)
+            if profile and 'gold' in profile:
+                self.gold = profile['gold']
+                logger.info(f"Current gold: {self.gold}")
+                return self.gold
         
+        logger.warning("Could not read gold from profile - affordability checks disabled")
+        return None
+    
+    async def scan_catalog(self):
+        """Parse the shop item list into the catalog cache"""
         messages = await self.client.get_messages(self.game_chat, limit=3)
         
         for msg in messages:
             if msg.buttons:
-                # Click the first button (leather boots)
-                if len(msg.buttons) > 0 and len(msg.buttons[0]) > 0:
-                    await self.human_delay()
-                    await msg.click(0, 0)
-                    logger.info(f"Clicked first item button (expecting '{self.item_to_buy}')")
-                    await asyncio.sleep(3)
+                items = self.parser.shop_catalog(msg)
+                if items:
+                    self.catalog.update(msg.id, items)
+                    prices = ', '.join(f"{name}={entry['price']}" for name, entry in items.items())
+                    logger.info(f"Shop catalog cached: {len(items)} items ({prices})")
                     return True
         
-        logger.error("Could not find item selection buttons")
+        logger.error("Could not find shop item list")
         return False
     
+    @tracing.traced('navigate_to_catalog')
+    async def navigate_to_catalog(self):
+        """Full navigation to the shop item list and catalog rescan"""
+        if not await self.navigate_to_town():
+            return False
+        if not await self.navigate_to_shop():
+            return False
+        if not await self.click_buy_items():
+            return False
+        return await self.scan_catalog()
+    
+    def is_catalog_screen(self, msg):
+        """Check that the message still shows the cached item list"""
+        if not msg or not msg.buttons:
+            return False
+        # One cached position is enough to tell the list from item details
+        for name, entry in self.catalog.items.items():
+            row, col = entry['row'], entry['col']
+            if row < len(msg.buttons) and col < len(msg.buttons[row]):
+                btn = msg.buttons[row][col]
+                return bool(btn.text and name in btn.text)
+            return False
+        return False
     
-    async def check_purchase_success(self):
-        """Check if the purchase was successful and wait for success message"""
+    async def get_catalog_message(self):
+        """Get the shop item list, going back via cached message instead of rescanning"""
+        if not self.catalog.is_fresh():
+            logger.info("Shop catalog cache expired, rescanning shop...")
+            if not await self.navigate_to_catalog():
+                return None
+        
+        msg = await self.client.get_messages(self.game_chat, ids=self.catalog.message_id)
+        
+        # Item details replaced the list in place - press "Назад" on the same message
+        if msg and msg.buttons and not self.is_catalog_screen(msg):
+            for row_idx, row in enumerate(msg.buttons):
+                for btn_idx, btn in enumerate(row):
+                    if btn.text and ("Назад" in btn.text or "⬅️" in btn.text):
+                        await self.human_delay()
+                        await self.client.click(msg, row_idx, btn_idx)
+                        logger.info("Clicked back to shop catalog")
+                        await tracing.sleep(2)
+                        msg = await self.client.get_messages(self.game_chat, ids=self.catalog.message_id)
+                        break
+                else:
+                    continue
+                break
+        
+        if self.is_catalog_screen(msg):
+            return msg
+        
+        logger.warning("Cached shop catalog is gone, navigating to shop again...")
+        self.catalog.invalidate()
+        if not await self.navigate_to_catalog():
+            return None
+        return await self.client.get_messages(self.game_chat, ids=self.catalog.message_id)
+    
+    @tracing.traced('select_item_to_buy')
+    async def select_item_to_buy(self, item_name=None):
+        """Select the item to buy using its cached catalog position"""
+        item_name = item_name or self.item_to_buy
+        logger.info(f"Looking for '{item_name}' to buy...")
+        
+        msg = await self.get_catalog_message()
+        if msg is None:
+            logger.error("Could not open shop catalog")
+            return False
+        
+        name, entry = self.catalog.find(item_name)
+        if entry is None:
+            logger.error(f"'{item_name}' is not sold in the shop")
+            return False
+        
+        await self.human_delay(humanize.SHOP_PURCHASE)
+        self.selected_after = self.client.last_seen_id
+        await self.client.click(msg, entry['row'], entry['col'])
+        logger.info(f"Clicked '{name}' (catalog position {entry['row']}:{entry['col']})")
+        await tracing.sleep(3)
+        return True
+    
+    @tracing.traced('find_buying_message')
+    async def find_buying_message(self, item_name):
+        """Find the item details message with the buy button"""
+        # Start with reasonable limit, increase if needed
+        for search_limit in [20, 50, 100, 200]:
+            messages = await self.client.get_messages(self.game_chat, limit=search_limit)
+            
+            for msg in messages:
+                # Look for message with item details and buy button
+                if msg.buttons and msg.text:
+                    # Item details message: names the item, or a details screen that arrived after the
+                    # item was clicked (details of an earlier item are older than that click)
+                    details = "Характеристики:" in msg.text and "Ціна:" in msg.text
+                    if item_name in msg.text or (details and msg.id > self.selected_after):
+                        # Check if it has a buy button
+                        for row_idx, row in enumerate(msg.buttons):
+                            for btn_idx, btn in enumerate(row):
+                                if btn.text and ("Купити за" in btn.text or "💰" in btn.text):
+                                    logger.info(f"Found buying message with item details (searched {search_limit} messages)")
+                                    return msg, row_idx, btn_idx
+            
+            logger.warning(f"Buying message not found in {search_limit} messages, trying larger search...")
+        
+        return None, None, None
+    
+    @tracing.traced('check_purchase_success')
+    async def check_purchase_success(self, clicked_after=0):
+        """Check if the purchase was successful from replies newer than clicked_after (id before the buy click)"""
         # Wait for success message to appear
-        await asyncio.sleep(2)
+        await tracing.sleep(2)
         
         messages = await self.client.get_messages(self.game_chat, limit=10)
         
         for msg in messages:
-            if msg.text:
+            # Older replies belong to earlier purchases
+            if msg.text and msg.id > clicked_after:
                 # Look for success message
                 if "Успішно придбано" in msg.text and "золота" in msg.text:
                     self.purchases_made += 1
@@ -162,6 +329,105 @@ class BuyingBot:
         self.purchases_made += 1
         return True
     
+    def affordable_quantity(self, item_name, quantity, price, max_price):
+        """Limit quantity by max price and known gold, 0 means skip the item"""
+        if price is None:
+            return quantity
+        if max_price is not None and price > max_price:
+            logger.warning(f"Skipping '{item_name}': price {price} is above max {max_price}")
+            return 0
+        if self.gold is None:
+            return quantity
+        affordable = self.gold // price
+        if affordable <= 0:
+            logger.warning(f"Skipping '{item_name}': costs {price}, only {self.gold} gold left")
+            return 0
+        if affordable < quantity:
+            logger.warning(f"Can afford only {affordable}/{quantity} of '{item_name}' ({self.gold} gold)")
+        return min(quantity, affordable)
+    
+    @tracing.traced('buy_item')
+    async def buy_item(self, item_name, quantity, max_price=None):
+        """Buy up to quantity of one shopping list item, returns number bought"""
+        name, entry = self.catalog.find(item_name)
+        if entry is None:
+            logger.warning(f"Skipping '{item_name}': not found in shop catalog")
+            return 0
+        
+        quantity = self.affordable_quantity(item_name, quantity, entry['price'], max_price)
+        if quantity <= 0:
+            return 0
+        
+        if not await self.select_item_to_buy(item_name):
+            return 0
+        
+        bought = 0
+        price_checked = False
+        
+        while self.is_running and bought < quantity:
+            logger.info(f"Starting purchase {bought + 1}/{quantity} of '{name}'")
+            
+            # Always search for the buying message dynamically (to handle unlimited purchases)
+            buying_message, row_idx, btn_idx = await self.find_buying_message(name)
+            
+            if not buying_message:
+                logger.error("Could not find buying message after extensive search")
+                logger.error("This might mean the buying interface disappeared or changed")
+                break
+            
+            # Verify real price from the details screen once
+            if not price_checked:
+                price_checked = True
+                price = self.parser.item_price(buying_message)
+                if price is not None and price != entry['price']:
+                    entry['price'] = price
+                    quantity = min(quantity, self.affordable_quantity(item_name, quantity, price, max_price))
+                    if quantity <= 0:
+                        break
+            
+            # Click the buy button
+            clicked_after = self.client.last_seen_id
+            await self.client.click(buying_message, row_idx, btn_idx)
+            logger.info(f"Clicked buy button (purchase #{self.purchases_made + 1})")
+            
+            # Check if purchase was successful
+            if not await self.check_purchase_success(clicked_after):
+                logger.error(f"Purchase of '{name}' failed or insufficient funds")
+                self.gold = None  # Not necessarily out of gold, the next item must not be skipped on a guess
+                break
+            
+            bought += 1
+            if self.gold is not None and entry['price']:
+                self.gold -= entry['price']
+        
+        logger.info(f"Bought {bought}/{quantity} of '{name}'")
+        return bought
+    
+    async def run_shopping_list(self):
+        """Open the shop, buy the shopping list and return to the main menu (game chat resolved, gold read)"""
+        # Navigate to shop and cache item positions and prices
+        if not await self.navigate_to_catalog():
+            return False
+        
+        self.is_running = True
+        
+        for item_name, quantity, max_price in self.shopping_list:
+            if not self.is_running:
+                break
+            self.purchases[item_name] = await self.buy_item(item_name, quantity, max_price)
+        
+        # Buying complete
+        logger.info(f"=== BUYING COMPLETE ===")
+        for item_name, quantity, _ in self.shopping_list:
+            logger.info(f"{item_name}: {self.purchases.get(item_name, 0)}/{quantity}")
+        logger.info(f"Total purchases made: {self.purchases_made}/{self.quantity}")
+        
+        # Return to main menu
+        await self.send_start_command()
+        
+        # Stop the process
+        self.is_running = False
+        return True
     
     async def start_buying_process(self):
         """Main buying process"""
@@ -169,99 +435,22 @@ class BuyingBot:
             logger.info("=== BUYING BOT STARTING ===")
             
             # Connect to game bot
-            self.game_chat = await self.client.get_entity(self.config.GAME_BOT_USERNAME)
-            logger.info(f"Connected to game bot: {self.game_chat.username}")
+            self.game_chat = await self.client.resolve_peer(self.config.GAME_BOT_USERNAME,
+                                                            PeerCache.from_config(self.config))
+            self.client.watch_chat(self.game_chat)
+            logger.info(f"Connected to game bot: {self.config.GAME_BOT_USERNAME}")
             
             # Send /start to refresh menu
             await self.send_start_command()
             
-            # Navigate to town
-            if not await self.navigate_to_town():
-                raise Exception("Failed to navigate to town")
-            
-            # Navigate to shop
-            if not await self.navigate_to_shop():
-                raise Exception("Failed to navigate to shop")
-            
-            # Click buy items
-            if not await self.click_buy_items():
-                raise Exception("Failed to find buy items button")
-            
-            # Select the item to buy (one time only)
-            if not await self.select_item_to_buy():
-                raise Exception("Failed to select item to buy")
-            
-            # Start buying loop - dynamically find buying message each time
-            self.is_running = True
-            
-            while self.is_running and self.purchases_made < self.quantity:
-                logger.info(f"Starting purchase {self.purchases_made + 1}/{self.quantity}")
-                
-                # Always search for the buying message dynamically (to handle unlimited purchases)
-                buying_message = None
-                # Start with reasonable limit, increase if needed
-                for search_limit in [20, 50, 100, 200]:
-                    messages = await self.client.get_messages(self.game_chat, limit=search_limit)
-                    
-                    for msg in messages:
-                        # Look for message with item details and buy button
-                        if msg.buttons and msg.text:
-                            # Check if this is the item details message (has item name and characteristics)
-                            if self.item_to_buy in msg.text or ("Характеристики:" in msg.text and "Ціна:" in msg.text):
-                                # Check if it has a buy button
-                                for row in msg.buttons:
-                                    for btn in row:
-                                        if btn.text and ("Купити за" in btn.text or "💰" in btn.text):
-                                            buying_message = msg
-                                            logger.info(f"Found buying message with item details (searched {search_limit} messages)")
-                                            break
-                                    if buying_message:
-                                        break
-                        
-                        if buying_message:
-                            break
-                    
-                    if buying_message:
-                        break
-                    
-                    logger.warning(f"Buying message not found in {search_limit} messages, trying larger search...")
-                
-                if not buying_message:
-                    logger.error("Could not find buying message after extensive search")
-                    logger.error("This might mean the buying interface disappeared or changed")
-                    break
-                
-                # Find and click the buy button
-                buy_button_found = False
-                for row_idx, row in enumerate(buying_message.buttons):
-                    for btn_idx, btn in enumerate(row):
-                        if btn.text and ("Купити за" in btn.text or "💰" in btn.text):
-                            await buying_message.click(row_idx, btn_idx)
-                            logger.info(f"Clicked buy button (purchase #{self.purchases_made + 1})")
-                            buy_button_found = True
-                            break
-                    if buy_button_found:
-                        break
-                
-                if not buy_button_found:
-                    logger.error("Could not find buy button on message")
-                    break
-                
-                # Check if purchase was successful
-                if not await self.check_purchase_success():
-                    logger.error("Purchase failed or insufficient funds. Stopping...")
-                    break
+            # Read gold so unaffordable items are skipped up front
+            await self.check_gold()
             
-            # Buying complete
-            logger.info(f"=== BUYING COMPLETE ===")
-            logger.info(f"Total purchases made: {self.purchases_made}/{self.quantity}")
+            if not await self.run_shopping_list():
+                raise Exception("Failed to open shop catalog")
             
-            # Return to main menu
-            await self.send_start_command()
-            
-            # Stop the process
-            self.is_running = False
             logger.info("Buying bot finished successfully")
+            self.client.log_summary()
             
         except Exception as e:
             logger.error(f"Error in buying process: {e}")
@@ -271,21 +460,43 @@ class BuyingBot:
     async def stop(self):
         """Stop the buying bot"""
         self.is_running = False
+        humanize.get_humanizer().log_summary()
         logger.info("Buying bot stopped")
 
 
+def parse_shopping_entry(value):
+    """Parse 'ITEM:QTY[:MAX_PRICE]' command line shopping list entry"""
+    import argparse
+    parts = value.rsplit(':', 2) if value.count(':') >= 2 else value.rsplit(':', 1)
+    try:
+        item = parts[0].strip()
+        quantity = int(parts[1])
+        max_price = int(parts[2]) if len(parts) > 2 and parts[2] else None
+    except (IndexError, ValueError):
+        raise argparse.ArgumentTypeError(f"Invalid shopping list entry '{value}', expected ITEM:QTY[:MAX_PRICE]")
+    if not item or quantity <= 0:
+        raise argparse.ArgumentTypeError(f"Invalid shopping list entry '{value}'")
+    return item, quantity, max_price
+
+
 async def main():
     """Main function to run the buying bot"""
     config = Config()
+    set_log_context(account=config.SESSION_NAME, bot='buying')
+    runtime.setup(config)
     
     # Parse command line arguments for customization
     import argparse
     parser = argparse.ArgumentParser(description='AutoOstromag Buying Bot')
     parser.add_argument('--item', default='Шкіряні Чоботи', help='Item to buy (default: Шкіряні Чоботи)')
     parser.add_argument('--quantity', type=int, default=50, help='Quantity to buy (default: 50)')
+    parser.add_argument('--list', dest='shopping_list', action='append', type=parse_shopping_entry,
+                        metavar='ITEM:QTY[:MAX_PRICE]',
+                        help='Shopping list entry, may be repeated (overrides --item/--quantity)')
     args = parser.parse_args()
     
-    # Create client
+    # Create client (Telethon is imported here, after arguments and config are checked)
+    from telethon import TelegramClient
     client = TelegramClient(
         config.SESSION_NAME,
         config.API_ID,
@@ -297,8 +508,10 @@ async def main():
         await client.start()
         logger.info("Client connected successfully")
         
+        await runtime.start_services(config)
+        
         # Initialize buying bot
-        buying_bot = BuyingBot(client, config, args.item, args.quantity)
+        buying_bot = BuyingBot(client, config, args.item, args.quantity, args.shopping_list)
         
         # Start the buying process
         await buying_bot.start_buying_process()
@@ -312,9 +525,10 @@ async def main():
     finally:
         await client.disconnect()
         logger.info("Client disconnected")
+        runtime.teardown()
         # Exit the process entirely
         sys.exit(0)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    loop_monitor.run(main(), Config.USE_UVLOOP)
@@ -5,7 +5,75 @@ Simplified Configuration for AutoOstromag bot
 import os
 from dotenv import load_dotenv
 
+from utils.logger import setup_logger
+
 load_dotenv()
+logger = setup_logger(__name__)
+
+
+def _bool(value):
+    return str(value).lower() == 'true'
+
+
+def delay_profile(value):
+    """Human delay profile "median,sigma,floor,cap" (seconds) as a tuple of floats"""
+    profile = tuple(float(part) for part in str(value).split(','))
+    if len(profile) != 4:
+        raise ValueError(f"expected median,sigma,floor,cap, got {value!r}")
+    return profile
+
+
+# Settings applied at runtime when .env changes (utils/config_reload.py): name -> (default, type)
+RELOADABLE = {
+    'HUMAN_DELAY_BATTLE_CLICK': ('0.7,0.35,0.3,2.0', delay_profile),
+    'HUMAN_DELAY_MENU_NAV': ('1.2,0.4,0.5,4.0', delay_profile),
+    'HUMAN_DELAY_SHOP_PURCHASE': ('1.5,0.4,0.8,4.0', delay_profile),
+    'HUMAN_DELAY_PROFILE_CHECK': ('2.0,0.45,1.0,6.0', delay_profile),
+    'HUMAN_DELAY_BUDGET': ('0.3', float),
+    'HUMAN_DELAY_BUDGET_WINDOW': ('600', float),
+    'DAILY_ENERGY_LIMIT': ('0', int),
+    'EXPLORATION_START_HOUR': ('-1', int),
+    'BATTLE_POTION_THRESHOLD': ('100', int),
+    'BATTLE_USE_SKILLS': ('True', _bool),
+    'BATTLE_MAX_ESCAPE_ATTEMPTS': ('5', int),
+    'ACTION_RETRY_SECONDS': ('10', float),
+    'ESCAPE_MIN_BATTLES': ('5', int),
+    'ESCAPE_MAX_DEFEAT_RATE': ('0.2', float),
+    'ESCAPE_REFRESH_BATTLES': ('20', int),
+    'ESCAPE_GOLD_WEIGHT': ('0', float),
+    'POTION_RESTOCK_BELOW': ('0', int),
+    'POTION_RESTOCK_TARGET': ('10', int),
+    'POTION_RESTOCK_MIN_WAIT': ('5', float),
+}
+
+
+# Uniform delay range the per-kind profiles replaced, still honored for profiles not set
+LEGACY_DELAY_SETTINGS = ('HUMAN_DELAY_MIN', 'HUMAN_DELAY_MAX')
+
+
+def legacy_delay_profile(default, env):
+    """Default profile bounded by HUMAN_DELAY_MIN/MAX, with the median midway between them"""
+    median, sigma, floor, cap = delay_profile(default)
+    floor = float(env.get('HUMAN_DELAY_MIN', floor))
+    cap = max(float(env.get('HUMAN_DELAY_MAX', cap)), floor)
+    return (floor + cap) / 2, sigma, floor, cap
+
+
+def reloadable_setting(name, env=os.environ):
+    """Typed value of a reloadable setting from env (raises ValueError on a bad value)"""
+    default, cast = RELOADABLE[name]
+    if cast is delay_profile and name not in env and any(legacy in env for legacy in LEGACY_DELAY_SETTINGS):
+        return legacy_delay_profile(default, env)
+    return cast(env.get(name, default))
+
+
+def read_escape_mobs_file(path):
+    """Mob names from the escape list file, one per line (# comments), [] if it does not exist"""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        lines = (line.split('#', 1)[0].strip() for line in f)
+        return [line for line in lines if line]
 
 
 class Config:
@@ -19,20 +87,110 @@ class Config:
     # Game settings
     GAME_BOT_USERNAME = os.getenv('GAME_BOT_USERNAME', '@ostromag_game_bot')
     
-    # Human-like delays
-    HUMAN_DELAY_MIN = float(os.getenv('HUMAN_DELAY_MIN', '1.0'))
-    HUMAN_DELAY_MAX = float(os.getenv('HUMAN_DELAY_MAX', '3.0'))
+    # Human-like delay profiles per action kind (median,sigma,floor,cap) and
+    # max share of wall time spent in them over a window (utils/humanize.py)
+    HUMAN_DELAY_BATTLE_CLICK = reloadable_setting('HUMAN_DELAY_BATTLE_CLICK')
+    HUMAN_DELAY_MENU_NAV = reloadable_setting('HUMAN_DELAY_MENU_NAV')
+    HUMAN_DELAY_SHOP_PURCHASE = reloadable_setting('HUMAN_DELAY_SHOP_PURCHASE')
+    HUMAN_DELAY_PROFILE_CHECK = reloadable_setting('HUMAN_DELAY_PROFILE_CHECK')
+    HUMAN_DELAY_BUDGET = reloadable_setting('HUMAN_DELAY_BUDGET')
+    HUMAN_DELAY_BUDGET_WINDOW = reloadable_setting('HUMAN_DELAY_BUDGET_WINDOW')
     
     # Debug
     DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
     
+    # Logging: LOG_JSON, LOG_FILE, LOG_FILE_MAX_BYTES and LOG_FILE_BACKUPS are read by
+    # utils/logger.py, since logging is set up by the first import, before any Config exists
+    
     # Daily energy limit (0 = unlimited)
-    DAILY_ENERGY_LIMIT = int(os.getenv('DAILY_ENERGY_LIMIT', '0'))
+    DAILY_ENERGY_LIMIT = reloadable_setting('DAILY_ENERGY_LIMIT')
     
     # Exploration time window (-1 = always explore, 0-23 = start hour)
-    EXPLORATION_START_HOUR = int(os.getenv('EXPLORATION_START_HOUR', '-1'))
+    EXPLORATION_START_HOUR = reloadable_setting('EXPLORATION_START_HOUR')
+    
+    # Battle policy tunables
+    BATTLE_POTION_THRESHOLD = reloadable_setting('BATTLE_POTION_THRESHOLD')
+    BATTLE_USE_SKILLS = reloadable_setting('BATTLE_USE_SKILLS')
+    BATTLE_MAX_ESCAPE_ATTEMPTS = reloadable_setting('BATTLE_MAX_ESCAPE_ATTEMPTS')
+    
+    # Seconds before the same action may be repeated on an unchanged battle message
+    ACTION_RETRY_SECONDS = reloadable_setting('ACTION_RETRY_SECONDS')
+    
+    # Local Prometheus metrics endpoint (0 = disabled)
+    METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+    METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+    
+    # Event loop lag sampling, slow callback warning threshold and uvloop backend (if installed)
+    LOOP_MONITOR = os.getenv('LOOP_MONITOR', 'True').lower() == 'true'
+    SLOW_CALLBACK_MS = float(os.getenv('SLOW_CALLBACK_MS', '100'))
+    # Time every asyncio callback to name the slow ones (patches asyncio process-wide, diagnostics only)
+    LOOP_CALLBACK_TIMING = os.getenv('LOOP_CALLBACK_TIMING', 'False').lower() == 'true'
+    USE_UVLOOP = os.getenv('USE_UVLOOP', 'False').lower() == 'true'
+    
+    # Chrome trace-event output of phase timings (empty = disabled)
+    TRACE_FILE = os.getenv('TRACE_FILE', '')
+    
+    # Drop Telegram updates from chats other than the game bot early
+    UPDATE_FILTER = os.getenv('UPDATE_FILTER', 'True').lower() == 'true'
+    
+    # Record game chat traffic for replay (empty = disabled)
+    TRAFFIC_LOG = os.getenv('TRAFFIC_LOG', '')
+    
+    # Reconnect backoff (seconds) and max missed game chat messages fetched after reconnect
+    RECONNECT_MIN_DELAY = float(os.getenv('RECONNECT_MIN_DELAY', '2'))
+    RECONNECT_MAX_DELAY = float(os.getenv('RECONNECT_MAX_DELAY', '300'))
+    CATCHUP_LIMIT = int(os.getenv('CATCHUP_LIMIT', '100'))
+    
+    # Control socket of the daemon (daemon.py / botctl.py)
+    DAEMON_SOCKET = os.getenv('DAEMON_SOCKET', 'ostromag.sock')
+    
+    # Local cache of the resolved game bot peer, saves a lookup on every start (empty = disabled)
+    PEER_CACHE_PATH = os.getenv('PEER_CACHE_PATH', 'peer_cache.json')
+    
+    # Parsed message versions kept in memory, shared by all bots (0 = parse every time)
+    PARSE_CACHE_SIZE = int(os.getenv('PARSE_CACHE_SIZE', '2048'))
+    
+    # Checkpoint for fast resume after restart (empty = disabled), ignored when older than max age
+    CHECKPOINT_PATH = os.getenv('CHECKPOINT_PATH', 'checkpoint.json')
+    CHECKPOINT_MAX_AGE = int(os.getenv('CHECKPOINT_MAX_AGE', '1800'))
+    
+    # Shop catalog cache lifetime for buying bot (seconds)
+    SHOP_CATALOG_TTL = int(os.getenv('SHOP_CATALOG_TTL', '600'))
+    
+    # Potion restock trips during HP waits: buy up to TARGET when fewer than BELOW are left
+    # (0 = off), only when HP takes at least MIN_WAIT minutes; failed trips wait COOLDOWN seconds
+    POTION_RESTOCK_ITEM = os.getenv('POTION_RESTOCK_ITEM', "Зілля здоров'я")
+    POTION_RESTOCK_MAX_PRICE = int(os.getenv('POTION_RESTOCK_MAX_PRICE', '0')) or None
+    POTION_RESTOCK_BELOW = reloadable_setting('POTION_RESTOCK_BELOW')
+    POTION_RESTOCK_TARGET = reloadable_setting('POTION_RESTOCK_TARGET')
+    POTION_RESTOCK_MIN_WAIT = reloadable_setting('POTION_RESTOCK_MIN_WAIT')
+    POTION_RESTOCK_COOLDOWN = float(os.getenv('POTION_RESTOCK_COOLDOWN', '3600'))
+    
+    # Battle telemetry database, on by default (set BATTLE_DB_PATH= to an empty value to disable)
+    BATTLE_DB_PATH = os.getenv('BATTLE_DB_PATH', 'battles.db')
     
     # Escape configuration - mobs to immediately run away from
     ESCAPE_MOBS = [
         "Лютий Злоніч"
     ]
+    
+    # More escape mobs, one per line - edits are picked up without a restart
+    ESCAPE_MOBS_FILE = os.getenv('ESCAPE_MOBS_FILE', 'escape_mobs.txt')
+    ESCAPE_MOBS_FROM_FILE = read_escape_mobs_file(ESCAPE_MOBS_FILE)
+    
+    # Seconds between checks of .env and ESCAPE_MOBS_FILE for changes (0 = no hot reload)
+    CONFIG_RELOAD_SECONDS = float(os.getenv('CONFIG_RELOAD_SECONDS', '5'))
+    
+    # Data-driven escape decisions from recorded battles (see utils/escape_advisor.py)
+    ESCAPE_TABLE_PATH = os.getenv('ESCAPE_TABLE_PATH', 'escape_table.json')
+    ESCAPE_MIN_BATTLES = reloadable_setting('ESCAPE_MIN_BATTLES')
+    ESCAPE_MAX_DEFEAT_RATE = reloadable_setting('ESCAPE_MAX_DEFEAT_RATE')
+    ESCAPE_REFRESH_BATTLES = reloadable_setting('ESCAPE_REFRESH_BATTLES')
+    ESCAPE_GOLD_WEIGHT = reloadable_setting('ESCAPE_GOLD_WEIGHT')  # XP worth of 1 gold
+    ESCAPE_DEFAULT_HP_PER_MINUTE = float(os.getenv('ESCAPE_DEFAULT_HP_PER_MINUTE', '5'))
+    ESCAPE_DEFAULT_ENERGY_MINUTES = float(os.getenv('ESCAPE_DEFAULT_ENERGY_MINUTES', '30'))
+
+
+if any(legacy in os.environ for legacy in LEGACY_DELAY_SETTINGS):
+    logger.warning("HUMAN_DELAY_MIN/HUMAN_DELAY_MAX are deprecated: they only bound the HUMAN_DELAY_<KIND> profiles "
+                   "not set in .env (median midway) - set the profiles instead")
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Bot daemon for AutoOstromag - one long-lived Telegram client for all bot modes
+Buy, disassemble and auto-level jobs are submitted over a local Unix socket
+(see botctl.py) and run one at a time on the shared connection.
+
+Auto-leveling runs in the background: when another job is submitted it is
+interrupted at the next safe point (waiting/idle, never mid-battle), the job
+runs, and auto-leveling resumes from its checkpoint.
+
+Protocol: one JSON object per line, e.g. {"cmd": "submit", "kind": "buy",
+"args": {"item": "Шкіряні Чоботи", "quantity": 5}} -> {"ok": true, "job": {...}}
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import Config
+from utils import config_reload, economy, humanize, loop_monitor, memory_probe, parse_cache, runtime
+from utils.connection import ConnectionManager
+from utils.game_client import GameClient
+from utils.logger import setup_logger, set_log_context
+
+logger = setup_logger(__name__)
+
+# Job kinds
+AUTO = 'auto'
+BUY = 'buy'
+DISASSEMBLE = 'disassemble'
+JOB_KINDS = (AUTO, BUY, DISASSEMBLE)
+
+# Job statuses
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class Job:
+    """A submitted bot run"""
+
+    def __init__(self, job_id, kind, args=None):
+        self.id = job_id
+        self.kind = kind
+        self.args = args or {}
+        self.status = QUEUED
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.bot = None
+        self.task = None
+        self.preempted = False
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'kind': self.kind, 'args': self.args, 'status': self.status,
+            'error': self.error, 'created': self.created, 'started': self.started, 'finished': self.finished
+        }
+
+
+def validate_args(kind, args):
+    """Job args with types checked and normalized, raises ValueError on bad args"""
+    args = dict(args or {})
+    if not isinstance(args.get('item', ''), str):
+        raise ValueError("'item' must be a string")
+    if kind == BUY:
+        if 'quantity' in args:
+            try:
+                args['quantity'] = int(args['quantity'])
+            except (TypeError, ValueError):
+                raise ValueError(f"'quantity' must be an integer, got {args['quantity']!r}")
+            if args['quantity'] <= 0:
+                raise ValueError("'quantity' must be positive")
+        if args.get('list'):
+            shopping_list = []
+            for entry in args['list']:
+                try:
+                    item, quantity, *rest = entry
+                    max_price = int(rest[0]) if rest and rest[0] is not None else None
+                    shopping_list.append([str(item), int(quantity), max_price])
+                except (TypeError, ValueError):
+                    raise ValueError(f"Bad shopping list entry {entry!r} (expected [item, quantity, max price])")
+            args['list'] = shopping_list
+    return args
+
+
+class Daemon:
+    """Owns the client, runs queued jobs and serves the control socket"""
+
+    def __init__(self, client, config):
+        """client: started TelegramClient"""
+        self.config = config
+        self.game_client = GameClient(client)
+        self.connection = ConnectionManager(client, config)
+        self.jobs = {}
+        self.queue = deque()
+        self.wakeup = asyncio.Event()
+        self.current = None
+        self.next_id = 1
+        self.server = None
+        self.stopped = asyncio.Event()
+
+    # ---- jobs ----
+
+    def submit(self, kind, args=None):
+        """Queue a job; a running auto-leveling job yields to it at its next safe point"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind '{kind}' (expected one of {', '.join(JOB_KINDS)})")
+        job = Job(self.next_id, kind, validate_args(kind, args))
+        self.next_id += 1
+        self.jobs[job.id] = job
+        self.queue.append(job)
+        self.wakeup.set()
+        logger.info(f"Job {job.id} queued: {kind} {job.args or ''}")
+
+        current = self.current
+        if current and current.kind == AUTO and kind != AUTO and not current.preempted:
+            current.preempted = True
+            asyncio.create_task(self.preempt(current))
+        return job
+
+    async def preempt(self, job):
+        """Stop an auto-leveling job once it is outside encounters and battles"""
+        while job.status == RUNNING and not job.bot.at_safe_point():
+            await asyncio.sleep(0.5)
+        if job.status == RUNNING:
+            logger.info(f"Interrupting auto-leveling (state {job.bot.fsm.state}) for queued jobs")
+            job.task.cancel()
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"No job {job_id}")
+        if job.status == QUEUED:
+            job.status = CANCELLED
+        elif job.status == RUNNING:
+            job.preempted = False
+            job.task.cancel()
+        return job
+
+    def create_bot(self, job):
+        """Bot instance for a job, sharing the daemon's GameClient"""
+        args = job.args
+        if job.kind == AUTO:
+            from modules.game_bot import GameBot
+            return GameBot(self.game_client, self.config), lambda bot: bot.start()
+        if job.kind == BUY:
+            from buying_bot import BuyingBot
+            shopping_list = [tuple(entry) for entry in args['list']] if args.get('list') else None
+            bot = BuyingBot(self.game_client, self.config, args.get('item', "Шкіряні Чоботи"),
+                            int(args.get('quantity', 50)), shopping_list)
+            return bot, lambda bot: bot.start_buying_process()
+        from disassembly_bot import DisassemblyBot
+        bot = DisassemblyBot(self.game_client, self.config, args.get('item', "Шкіряні Чоботи"))
+        return bot, lambda bot: bot.start_disassembly_process()
+
+    async def run_job(self, job):
+        try:
+            bot, start = self.create_bot(job)
+        except Exception as e:
+            # A job that cannot even start must not take the worker down with it
+            job.status = FAILED
+            job.error = f"Could not create bot: {e}"
+            job.finished = time.time()
+            logger.error(f"Job {job.id} failed: {job.error}")
+            return
+        job.bot = bot
+        job.status = RUNNING
+        job.started = time.time()
+        job.error = None
+        self.current = job
+        self.connection.attach(bot)
+        logger.info(f"Job {job.id} started: {job.kind}")
+
+        async def run_with_context():
+            set_log_context(job=job.id, bot=job.kind)  # Only for this job's task
+            return await start(bot)
+
+        job.task = asyncio.create_task(run_with_context())
+        await asyncio.wait({job.task})
+        self.current = None
+        if job.kind == AUTO:
+            await bot.stop()
+
+        if job.task.cancelled():
+            if job.preempted:
+                # ⏸️ Back in the queue after the jobs that interrupted it
+                job.preempted = False
+                job.status = QUEUED
+                self.queue.append(job)
+                logger.info(f"Job {job.id} paused, will resume after queued jobs")
+            else:
+                job.status = CANCELLED
+                logger.info(f"Job {job.id} cancelled")
+        elif job.task.exception():
+            job.status = FAILED
+            job.error = str(job.task.exception())
+            logger.error(f"Job {job.id} failed: {job.error}")
+        else:
+            job.status = DONE
+            logger.info(f"Job {job.id} done")
+        job.finished = time.time()
+
+    async def worker(self):
+        """Run queued jobs one at a time"""
+        while True:
+            while not self.queue:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+            job = self.queue.popleft()
+            if job.status == CANCELLED:
+                continue
+            config_reload.apply_pending()
+            await self.run_job(job)
+
+    # ---- control socket ----
+
+    def status(self):
+        return {
+            'paused': self.game_client.paused,
+            'connected': self.connection.connected.is_set(),
+            'current': self.current.to_dict() if self.current else None,
+            'queued': [job.id for job in self.queue if job.status == QUEUED],
+            'parse_cache': parse_cache.get_cache().stats(),
+            'history_reads': {'fetched': self.game_client.history_fetches,
+                              'coalesced': self.game_client.history_coalesced},
+            'flood_waits': {'count': self.game_client.flood_waits,
+                            'seconds': self.game_client.flood_wait_seconds},
+            'economy': economy.get_tracker().stats(),
+            'human_delays': humanize.get_humanizer().totals(self.config.HUMAN_DELAY_BUDGET_WINDOW),
+            'loop_lag': loop_monitor.get_monitor().stats() if loop_monitor.get_monitor() else None
+        }
+
+    def handle(self, request):
+        """Execute one control command, returns the response dict"""
+        cmd = request.get('cmd')
+        if cmd == 'submit':
+            return {'job': self.submit(request.get('kind'), request.get('args')).to_dict()}
+        if cmd == 'list':
+            return {'jobs': [job.to_dict() for job in self.jobs.values()]}
+        if cmd == 'status':
+            return self.status()
+        if cmd == 'pause':
+            self.game_client.pause()
+            logger.info("Paused - bot calls wait until resume")
+            return self.status()
+        if cmd == 'resume':
+            self.game_client.resume()
+            logger.info("Resumed")
+            return self.status()
+        if cmd == 'cancel':
+            return {'job': self.cancel(int(request.get('id'))).to_dict()}
+        if cmd == 'memory':
+            if request.get('stop'):
+                memory_probe.stop()
+                return {'memory': None}
+            return {'memory': memory_probe.log_snapshot(int(request.get('limit', 10)))}
+        if cmd == 'shutdown':
+            self.stopped.set()
+            return {}
+        raise ValueError(f"Unknown command '{cmd}'")
+
+    async def handle_connection(self, reader, writer):
+        """Serve newline-delimited JSON requests on one socket connection"""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = dict(self.handle(json.loads(line)), ok=True)
+                except Exception as e:
+                    response = {'ok': False, 'error': str(e)}
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b'\n')
+                await writer.drain()
+        except Exception as e:
+            logger.debug(f"Control connection closed: {e}")
+        finally:
+            writer.close()
+
+    async def serve(self, socket_path):
+        """Serve the control socket and run jobs until shutdown"""
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.server = await asyncio.start_unix_server(self.handle_connection, socket_path)
+        os.chmod(socket_path, 0o600)
+        logger.info(f"Daemon listening on {socket_path}")
+
+        worker = asyncio.create_task(self.worker())
+        watchdog = asyncio.create_task(self.connection.watch())
+        try:
+            await self.stopped.wait()
+        finally:
+            self.connection.stopping = True
+            for task in (worker, watchdog):
+                task.cancel()
+            if self.current and self.current.task:
+                self.current.task.cancel()
+                await asyncio.wait({self.current.task})
+                if self.current.kind == AUTO:
+                    await self.current.bot.stop()
+            self.server.close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+
+async def main():
+    """Main function to run the daemon"""
+    config = Config()
+    set_log_context(account=config.SESSION_NAME, bot='daemon')
+    runtime.setup(config)
+
+    import argparse
+    parser = argparse.ArgumentParser(description='AutoOstromag daemon')
+    parser.add_argument('--auto', action='store_true', help='Queue auto-leveling at startup')
+    args = parser.parse_args()
+
+    # Create client (Telethon is imported here, after arguments and config are checked)
+    from telethon import TelegramClient
+    client = TelegramClient(
+        config.SESSION_NAME,
+        config.API_ID,
+        config.API_HASH
+    )
+
+    try:
+        # Connect and authorize once for every job
+        await client.start()
+        logger.info("Client connected successfully")
+
+        # Metrics, .env watcher (changes are applied between jobs and at GameBot safe points) and memory snapshots
+        await runtime.start_services(config, watch_config=True)
+
+        daemon = Daemon(client, config)
+        if args.auto:
+            daemon.submit(AUTO)
+        await daemon.serve(config.DAEMON_SOCKET)
+
+    except KeyboardInterrupt:
+        logger.info("Daemon stopped by user")
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+    finally:
+        await client.disconnect()
+        logger.info("Client disconnected")
+        runtime.teardown()
+
+
+if __name__ == "__main__":
+    loop_monitor.run(main(), Config.USE_UVLOOP)
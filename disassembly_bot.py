@@ -9,14 +9,16 @@ import sys
 import re
 from datetime import datetime
 from pathlib import Path
-from telethon import TelegramClient
-from telethon.errors import SessionPasswordNeededError
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from config import Config
-from utils.logger import setup_logger
+from utils import humanize, loop_monitor, metrics, parse_cache, runtime, tracing
+from utils.game_client import GameClient
+from utils.peer_cache import PeerCache
+from utils.logger import setup_logger, set_log_context
+from utils.parser import GameParser, DONT_RUSH
 
 logger = setup_logger(__name__)
 
@@ -28,27 +30,37 @@ class DisassemblyBot:
     
     def __init__(self, client, config, item_to_disassemble="Шкіряні Чоботи"):
         """Initialize disassembly bot with client and configuration"""
-        self.client = client
+        self.client = GameClient.wrap(client)
         self.config = config
+        self.parser = GameParser(parse_cache.get_cache(config.PARSE_CACHE_SIZE))
         self.game_chat = None
         self.item_to_disassemble = item_to_disassemble
         self.items_disassembled = 0
         self.is_running = False
         self.inventory_message = None  # Store inventory message reference
         self.dont_rush_count = 0  # Track how many times we've seen don't rush
+        self.click_tasks = set()  # Fire-and-forget clicks still in flight
     
-    async def human_delay(self, seconds=1):
-        """Fast delay for speedy operation"""
-        await asyncio.sleep(seconds)
+    def click_in_background(self, msg, row_idx, btn_idx):
+        """Fire-and-forget click; the task is referenced until done so it is not collected mid-flight"""
+        task = asyncio.create_task(self.client.click(msg, row_idx, btn_idx))
+        self.click_tasks.add(task)
+        task.add_done_callback(self.click_tasks.discard)
     
+    async def human_delay(self, kind=humanize.MENU_NAV):
+        """Simulate human-like reaction time for this kind of action"""
+        await humanize.delay(self.config, kind)
+    
+    @tracing.traced('send_start_command')
     async def send_start_command(self):
         """Send /start command to refresh the game keyboard"""
         logger.info("Sending /start command to refresh game menu...")
-        await self.human_delay(1)
+        await self.human_delay()
         await self.client.send_message(self.game_chat, '/start')
-        await asyncio.sleep(2)
+        await tracing.sleep(2)
         logger.info("Game menu refreshed")
     
+    @tracing.traced('navigate_to_inventory')
     async def navigate_to_inventory(self, retry_count=0):
         """Navigate to inventory (Інвентар) with unlimited retries"""
         logger.info(f"Navigating to inventory... (attempt {retry_count + 1})")
@@ -60,19 +72,20 @@ class DisassemblyBot:
         # Check for "don't rush" message (only recent ones)
         current_time = asyncio.get_event_loop().time()
         for msg in messages:
-            if msg.text and ("Будь ласка, не поспішайте" in msg.text or "не поспішайте" in msg.text):
+            if self.parser.classify(msg) == DONT_RUSH:
                 # Check if message is recent (within last 5 seconds)
                 if msg.date and (datetime.now().timestamp() - msg.date.timestamp()) < 5:
+                    metrics.DONT_RUSH.inc(bot='disassembly')
                     self.dont_rush_count += 1
                     if self.dont_rush_count > 10:
                         logger.error("Too many 'don't rush' messages - stopping to prevent infinite loop")
                         raise Exception("Bot is being rate limited too heavily")
                     
                     logger.warning(f"Game says 'don't rush' - waiting 10 seconds and refreshing... (count: {self.dont_rush_count})")
-                    await asyncio.sleep(10)
+                    await tracing.sleep(10)
                     # Send /start to truly refresh
                     await self.send_start_command()
-                    await asyncio.sleep(2)
+                    await tracing.sleep(2)
                     # Retry navigation
                     return await self.navigate_to_inventory(0)  # Reset retry count
         
@@ -83,14 +96,14 @@ class DisassemblyBot:
                         if btn.text and "Інвентар" in btn.text:
                             await self.human_delay()
                             # Fire-and-forget click to avoid API delays
-                            asyncio.create_task(msg.click(row_idx, btn_idx))
+                            self.click_in_background(msg, row_idx, btn_idx)
                             logger.info("Clicked 'Інвентар' button")
-                            await asyncio.sleep(2)  # Give more time for navigation
+                            await tracing.sleep(2)  # Give more time for navigation
                             return True
         
         # Always retry - no limit
         logger.warning(f"Could not find 'Інвентар' button, retrying in 3 seconds... (attempt {retry_count + 1})")
-        await asyncio.sleep(3)
+        await tracing.sleep(3)
         
         # Send /start to refresh if we've tried many times
         if retry_count > 0 and retry_count % 3 == 0:
@@ -99,6 +112,7 @@ class DisassemblyBot:
         
         return await self.navigate_to_inventory(retry_count + 1)
     
+    @tracing.traced('navigate_to_equipment')
     async def navigate_to_equipment(self, retry_count=0):
         """Navigate to equipment section (Спорядження) with unlimited retries"""
         logger.info(f"Navigating to equipment section... (attempt {retry_count + 1})")
@@ -109,14 +123,15 @@ class DisassemblyBot:
         
         # Check for "don't rush" message (only recent ones)
         for msg in messages:
-            if msg.text and ("Будь ласка, не поспішайте" in msg.text or "не поспішайте" in msg.text):
+            if self.parser.classify(msg) == DONT_RUSH:
                 # Check if message is recent (within last 5 seconds)
                 if msg.date and (datetime.now().timestamp() - msg.date.timestamp()) < 5:
+                    metrics.DONT_RUSH.inc(bot='disassembly')
                     logger.warning("Game says 'don't rush' - waiting 10 seconds and refreshing...")
-                    await asyncio.sleep(10)
+                    await tracing.sleep(10)
                     # Send /start to truly refresh
                     await self.send_start_command()
-                    await asyncio.sleep(2)
+                    await tracing.sleep(2)
                     # Retry navigation from start
                     return await self.navigate_to_inventory()  # Start from beginning
         
@@ -127,9 +142,9 @@ class DisassemblyBot:
                         if btn.text and "Спорядження" in btn.text:
                             await self.human_delay()
                             # Fire-and-forget click to avoid API delays
-                            asyncio.create_task(msg.click(row_idx, btn_idx))
+                            self.click_in_background(msg, row_idx, btn_idx)
                             logger.info("Clicked 'Спорядження' button")
-                            await asyncio.sleep(2)  # Give more time for navigation
+                            await tracing.sleep(2)  # Give more time for navigation
                             return True
         
         # Always retry - no limit
@@ -140,13 +155,14 @@ class DisassemblyBot:
             logger.info("Equipment button not found after multiple attempts, going back to inventory first")
             # Navigate to inventory first
             if await self.navigate_to_inventory():
-                await asyncio.sleep(2)
+                await tracing.sleep(2)
                 # Now try equipment again
                 return await self.navigate_to_equipment(0)  # Reset counter
         
-        await asyncio.sleep(5)
+        await tracing.sleep(5)
         return await self.navigate_to_equipment(retry_count + 1)
     
+    @tracing.traced('navigate_to_last_page')
     async def navigate_to_last_page(self, retry_count=0):
         """Navigate to the last inventory page using left arrow with unlimited retries"""
         logger.info(f"Navigating to last inventory page... (attempt {retry_count + 1})")
@@ -157,14 +173,15 @@ class DisassemblyBot:
         
         # Check for "don't rush" message (only recent ones)
         for msg in messages:
-            if msg.text and ("Будь ласка, не поспішайте" in msg.text or "не поспішайте" in msg.text):
+            if self.parser.classify(msg) == DONT_RUSH:
                 # Check if message is recent (within last 5 seconds)
                 if msg.date and (datetime.now().timestamp() - msg.date.timestamp()) < 5:
+                    metrics.DONT_RUSH.inc(bot='disassembly')
                     logger.warning("Game says 'don't rush' - waiting 10 seconds and refreshing...")
-                    await asyncio.sleep(10)
+                    await tracing.sleep(10)
                     # Send /start to truly refresh
                     await self.send_start_command()
-                    await asyncio.sleep(2)
+                    await tracing.sleep(2)
                     # Retry navigation from start
                     return await self.navigate_to_inventory()  # Start from beginning
         
@@ -175,12 +192,12 @@ class DisassemblyBot:
                         if btn.text and ("⬅️" in btn.text or "←" in btn.text):
                             await self.human_delay()
                             # Fire-and-forget click to avoid API delays
-                            asyncio.create_task(msg.click(row_idx, btn_idx))
+                            self.click_in_background(msg, row_idx, btn_idx)
                             logger.info("Clicked left arrow to go to last page")
-                            await asyncio.sleep(1)
+                            await tracing.sleep(1)
                             
                             # Store the inventory message for later use
-                            await asyncio.sleep(1)  # Let page load
+                            await tracing.sleep(1)  # Let page load
                             updated_messages = await self.client.get_messages(self.game_chat, limit=5)
                             for updated_msg in updated_messages:
                                 if updated_msg.text and ("Сторінка" in updated_msg.text and "предметів" in updated_msg.text):
@@ -199,13 +216,14 @@ class DisassemblyBot:
         
         # Always retry - no limit
         logger.warning(f"Could not find left arrow button, retrying in 5 seconds... (attempt {retry_count + 1})")
-        await asyncio.sleep(5)
+        await tracing.sleep(5)
         return await self.navigate_to_last_page(retry_count + 1)
     
+    @tracing.traced('find_leather_boots')
     async def find_leather_boots(self):
         """Find leather boots button on current inventory page"""
         logger.info(f"Looking for '{self.item_to_disassemble}' in inventory...")
-        await asyncio.sleep(1)  # Small delay to let page load
+        await tracing.sleep(1)  # Small delay to let page load
         
         messages = await self.client.get_messages(self.game_chat, limit=3)
         
@@ -220,29 +238,32 @@ class DisassemblyBot:
         logger.info(f"No '{self.item_to_disassemble}' found on current page")
         return None, None, None
     
+    @tracing.traced('select_item_for_disassembly')
     async def select_item_for_disassembly(self, msg, row_idx, btn_idx):
         """Select the leather boots item for disassembly"""
         logger.info(f"Selecting '{self.item_to_disassemble}' for disassembly...")
-        await self.human_delay()
+        await self.human_delay(humanize.SHOP_PURCHASE)
         # Fire-and-forget click to avoid API delays
-        asyncio.create_task(msg.click(row_idx, btn_idx))
-        await asyncio.sleep(1)
+        self.click_in_background(msg, row_idx, btn_idx)
+        await tracing.sleep(1)
         logger.info("Item selected, looking for dismantle option...")
     
+    @tracing.traced('click_dismantle_button')
     async def click_dismantle_button(self, retry_count=0):
         """Click the dismantle button (Розібрати на брухт) with unlimited retries"""
         logger.info(f"Looking for dismantle button... (attempt {retry_count + 1})")
-        await self.human_delay()
+        await self.human_delay(humanize.SHOP_PURCHASE)
         
         messages = await self.client.get_messages(self.game_chat, limit=5)
         
         # Check for "don't rush" message (only recent ones)
         for msg in messages:
-            if msg.text and ("Будь ласка, не поспішайте" in msg.text or "не поспішайте" in msg.text):
+            if self.parser.classify(msg) == DONT_RUSH:
                 # Check if message is recent (within last 5 seconds)
                 if msg.date and (datetime.now().timestamp() - msg.date.timestamp()) < 5:
+                    metrics.DONT_RUSH.inc(bot='disassembly')
                     logger.warning("Game says 'don't rush' - waiting 10 seconds...")
-                    await asyncio.sleep(10)
+                    await tracing.sleep(10)
                     # Retry the same action
                     return await self.click_dismantle_button(0)  # Reset retry count
         
@@ -251,19 +272,20 @@ class DisassemblyBot:
                 for row_idx, row in enumerate(msg.buttons):
                     for btn_idx, btn in enumerate(row):
                         if btn.text and ("Розібрати на брухт" in btn.text or "брухт" in btn.text):
-                            await self.human_delay()
+                            await self.human_delay(humanize.SHOP_PURCHASE)
                             # Fire-and-forget click to avoid API delays
-                            asyncio.create_task(msg.click(row_idx, btn_idx))
+                            self.click_in_background(msg, row_idx, btn_idx)
                             logger.info("Clicked dismantle button")
-                            await asyncio.sleep(1)
+                            await tracing.sleep(1)
                             return True
         
         # Always retry - no limit
         logger.warning(f"Could not find dismantle button, retrying in 5 seconds... (attempt {retry_count + 1})")
-        await asyncio.sleep(5)
+        await tracing.sleep(5)
         return await self.click_dismantle_button(retry_count + 1)
     
     
+    @tracing.traced('return_to_inventory_page')
     async def return_to_inventory_page(self):
         """Return to the inventory page by searching for it (no message storage)"""
         logger.info("Returning to inventory page...")
@@ -272,11 +294,12 @@ class DisassemblyBot:
         # Check for "don't rush" message first (only recent ones)
         messages = await self.client.get_messages(self.game_chat, limit=5)
         for msg in messages:
-            if msg.text and ("Будь ласка, не поспішайте" in msg.text or "не поспішайте" in msg.text):
+            if self.parser.classify(msg) == DONT_RUSH:
                 # Check if message is recent (within last 5 seconds)
                 if msg.date and (datetime.now().timestamp() - msg.date.timestamp()) < 5:
+                    metrics.DONT_RUSH.inc(bot='disassembly')
                     logger.warning("Game says 'don't rush' - waiting 10 seconds...")
-                    await asyncio.sleep(10)
+                    await tracing.sleep(10)
                     # Send /start to get back to main menu after wait
                     await self.send_start_command()
                     return False  # Force re-navigation
@@ -294,9 +317,9 @@ class DisassemblyBot:
                         if btn.text and ("⬅️" in btn.text or "←" in btn.text):
                             await self.human_delay()
                             # Fire-and-forget click to avoid API delays
-                            asyncio.create_task(msg.click(row_idx, btn_idx))
+                            self.click_in_background(msg, row_idx, btn_idx)
                             logger.info("Clicked left arrow on inventory page")
-                            await asyncio.sleep(1)
+                            await tracing.sleep(1)
                             return True
                 
                 # If no left arrow, we're already on the right page
@@ -312,8 +335,10 @@ class DisassemblyBot:
             logger.info("=== DISASSEMBLY BOT STARTING ===")
             
             # Connect to game bot
-            self.game_chat = await self.client.get_entity(self.config.GAME_BOT_USERNAME)
-            logger.info(f"Connected to game bot: {self.game_chat.username}")
+            self.game_chat = await self.client.resolve_peer(self.config.GAME_BOT_USERNAME,
+                                                            PeerCache.from_config(self.config))
+            self.client.watch_chat(self.game_chat)
+            logger.info(f"Connected to game bot: {self.config.GAME_BOT_USERNAME}")
             
             # Send /start to refresh menu
             await self.send_start_command()
@@ -347,7 +372,7 @@ class DisassemblyBot:
                     
                     if consecutive_failures < max_consecutive_failures:
                         logger.info(f"Checking again... ({consecutive_failures}/{max_consecutive_failures})")
-                        await asyncio.sleep(2)
+                        await tracing.sleep(2)
                         continue
                     else:
                         # Try complete re-navigation before giving up
@@ -360,7 +385,7 @@ class DisassemblyBot:
                             logger.info("Re-navigation successful, doing final check...")
                             
                             # Do one final check after re-navigation
-                            await asyncio.sleep(2)
+                            await tracing.sleep(2)
                             final_msg, final_row, final_btn = await self.find_leather_boots()
                             
                             if final_msg is not None:
@@ -383,12 +408,12 @@ class DisassemblyBot:
                 # Click dismantle button
                 if not await self.click_dismantle_button():
                     logger.error("Failed to click dismantle button, skipping...")
-                    await asyncio.sleep(1)
+                    await tracing.sleep(1)
                     continue
                 
                 # Wait for confirmation dialog and click "Так"
                 logger.info("Looking for confirmation dialog...")
-                await asyncio.sleep(1)  # Give dialog time to appear
+                await tracing.sleep(1)  # Give dialog time to appear
                 
                 confirmation_clicked = False
                 messages = await self.client.get_messages(self.game_chat, limit=3)
@@ -402,7 +427,7 @@ class DisassemblyBot:
                             for btn_idx, btn in enumerate(row):
                                 if btn.text and "Так" in btn.text:
                                     # Fire off the click without waiting for it to complete
-                                    asyncio.create_task(msg.click(row_idx, btn_idx))
+                                    self.click_in_background(msg, row_idx, btn_idx)
                                     logger.info("Clicked 'Так' confirmation button")
                                     confirmation_clicked = True
                                     break
@@ -414,7 +439,7 @@ class DisassemblyBot:
                     logger.warning("No confirmation dialog found, continuing anyway...")
                 
                 # Brief wait for click to register, then continue
-                await asyncio.sleep(0.5)
+                await tracing.sleep(0.5)
                                 
                 # Count successful disassembly
                 self.items_disassembled += 1
@@ -423,7 +448,7 @@ class DisassemblyBot:
                 # Add extra delay every 10 items to avoid "don't rush" message
                 if self.items_disassembled % 10 == 0:
                     logger.info("Processed 10 items, taking a 15 second break to avoid rate limiting...")
-                    await asyncio.sleep(15)
+                    await tracing.sleep(15)
                 
                 # Return to inventory page to look for more items
                 if not await self.return_to_inventory_page():
@@ -460,6 +485,7 @@ class DisassemblyBot:
             # Stop the process
             self.is_running = False
             logger.info("Disassembly bot finished successfully")
+            self.client.log_summary()
             
         except Exception as e:
             logger.error(f"Error in disassembly process: {e}")
@@ -469,12 +495,15 @@ class DisassemblyBot:
     async def stop(self):
         """Stop the disassembly bot"""
         self.is_running = False
+        humanize.get_humanizer().log_summary()
         logger.info("Disassembly bot stopped")
 
 
 async def main():
     """Main function to run the disassembly bot"""
     config = Config()
+    set_log_context(account=config.SESSION_NAME, bot='disassembly')
+    runtime.setup(config)
     
     # Parse command line arguments for customization
     import argparse
@@ -482,7 +511,8 @@ async def main():
     parser.add_argument('--item', default='Шкіряні Чоботи', help='Item to disassemble (default: Шкіряні Чоботи)')
     args = parser.parse_args()
     
-    # Create client
+    # Create client (Telethon is imported here, after arguments and config are checked)
+    from telethon import TelegramClient
     client = TelegramClient(
         config.SESSION_NAME,
         config.API_ID,
@@ -494,6 +524,8 @@ async def main():
         await client.start()
         logger.info("Client connected successfully")
         
+        await runtime.start_services(config)
+        
         # Initialize disassembly bot
         disassembly_bot = DisassemblyBot(client, config, args.item)
         
@@ -509,9 +541,10 @@ async def main():
     finally:
         await client.disconnect()
         logger.info("Client disconnected")
+        runtime.teardown()
         # Exit the process entirely
         sys.exit(0)
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    loop_monitor.run(main(), Config.USE_UVLOOP)
@@ -4,27 +4,32 @@ AutoGram - Telegram RPG Bot for "Таємниці Королівства Ост
 Main entry point for the bot
 """
 
-import asyncio
 import sys
+import time
 from pathlib import Path
-from telethon import TelegramClient
-from telethon.errors import SessionPasswordNeededError
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from config import Config
 from modules.game_bot import GameBot
-from utils.logger import setup_logger
+from utils import loop_monitor, runtime
+from utils.connection import ConnectionManager
+from utils.logger import setup_logger, set_log_context
 
 logger = setup_logger(__name__)
 
 
 async def main():
     """Main function to run the bot"""
+    started_at = time.monotonic()
     config = Config()
+    set_log_context(account=config.SESSION_NAME, bot='auto')
+    runtime.setup(config)
+    game_bot = None
     
-    # Create client
+    # Create client (Telethon is imported here, after arguments and config are checked)
+    from telethon import TelegramClient
     client = TelegramClient(
         config.SESSION_NAME,
         config.API_ID,
@@ -36,24 +41,27 @@ async def main():
         await client.start()
         logger.info("Client connected successfully")
         
-        # Initialize game bot
-        game_bot = GameBot(client, config)
+        # Metrics, .env watcher (changes are applied by the bot at safe points) and memory snapshots
+        await runtime.start_services(config, watch_config=True)
         
-        # Start the bot
-        await game_bot.start()
+        # Initialize game bot
+        game_bot = GameBot(client, config, started_at)
         
-        # Keep the bot running
+        # Run the bot, reconnecting and catching up on missed messages when the connection drops
         logger.info("Bot is running. Press Ctrl+C to stop.")
-        await client.run_until_disconnected()
+        await ConnectionManager(client, config).run(game_bot)
         
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
     finally:
+        if game_bot:
+            await game_bot.stop()
         await client.disconnect()
         logger.info("Client disconnected")
+        runtime.teardown()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    loop_monitor.run(main(), Config.USE_UVLOOP)
@@ -0,0 +1,225 @@
+"""
+Battle decision policies - pure functions of the parsed battle state, no Telegram I/O.
+GameBot.handle_battle parses each battle message into a BattleState, asks the policy
+for an action and performs the clicks; PolicyRunner replays recorded battles offline.
+"""
+
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass
+from itertools import product
+from typing import FrozenSet, Optional
+
+# Battle actions
+ATTACK = 'attack'
+SKILL = 'skill'
+POTION = 'potion'
+ESCAPE = 'escape'
+
+# Button label fragment -> battle option
+BATTLE_BUTTONS = {
+    "Атака": 'attack',
+    "Прийоми": 'skills',
+    "Зілля": 'potions',
+    "Втеча": 'escape'
+}
+
+# Action -> button label fragment to click
+ACTION_BUTTONS = {
+    ATTACK: "Атака",
+    SKILL: "Прийоми",
+    POTION: "Зілля",
+    ESCAPE: "Втеча"
+}
+
+
+@dataclass(frozen=True)
+class BattleState:
+    """Everything a policy may look at when choosing an action"""
+    round: int
+    hp: Optional[int]
+    max_hp: Optional[int]
+    options: FrozenSet[str]
+    mob: str = "Unknown"
+    should_escape: bool = False
+    escape_attempts: int = 0
+
+
+def parse_battle_options(buttons):
+    """Get available battle options from a button grid (button objects or label strings)"""
+    options = set()
+    for row in buttons or []:
+        for btn in row:
+            label = getattr(btn, 'text', btn)
+            if not label:
+                continue
+            for fragment, option in BATTLE_BUTTONS.items():
+                if fragment in label:
+                    options.add(option)
+                    break
+    return frozenset(options)
+
+
+def parse_battle_state(text, buttons, round_number, mob="Unknown", should_escape=False, escape_attempts=0):
+    """Parse battle message into BattleState, None if it has no battle actions"""
+    options = parse_battle_options(buttons)
+    if 'attack' not in options and 'escape' not in options:
+        return None
+
+    hp, max_hp = None, None
+    hp_match = re.search(r'👤 Ви \((\d+)/(\d+)\)', text or "")
+    if hp_match:
+        hp, max_hp = int(hp_match.group(1)), int(hp_match.group(2))
+
+    return BattleState(round_number, hp, max_hp, options, mob, should_escape, escape_attempts)
+
+
+class BattlePolicy(ABC):
+    """Base battle policy: maps a BattleState to an action (or None to do nothing)"""
+
+    name = "base"
+    max_escape_attempts = 5
+
+    @abstractmethod
+    def decide(self, state):
+        """Choose action for the given battle state"""
+
+
+class DefaultPolicy(BattlePolicy):
+    """
+    Original handle_battle priorities:
+    escape (escape mobs only) -> potion if HP is low -> skills -> attack
+    """
+
+    def __init__(self, potion_threshold=100, use_skills=True, max_escape_attempts=5):
+        """Initialize policy tunables"""
+        self.potion_threshold = potion_threshold
+        self.use_skills = use_skills
+        self.max_escape_attempts = max_escape_attempts
+        self.name = f"default(potion<{potion_threshold}, skills={use_skills}, escapes={max_escape_attempts})"
+
+    def decide(self, state):
+        """Choose action for the given battle state"""
+        options = state.options
+        if state.should_escape and 'escape' in options and state.escape_attempts < self.max_escape_attempts:
+            return ESCAPE
+        if 'potions' in options and state.hp and state.hp < self.potion_threshold:
+            return POTION
+        if self.use_skills and 'skills' in options:
+            return SKILL
+        if 'attack' in options:
+            return ATTACK
+        return None
+
+
+def policy_grid(potion_thresholds=(0, 50, 100, 150, 200), use_skills=(True, False), max_escape_attempts=(0, 1, 3, 5, 10)):
+    """Generate DefaultPolicy variants over a grid of tunables"""
+    return [DefaultPolicy(threshold, skills, escapes)
+            for threshold, skills, escapes in product(potion_thresholds, use_skills, max_escape_attempts)]
+
+
+class PolicyRunner:
+    """Applies policies to recorded battle rounds in bulk"""
+
+    def __init__(self, battles):
+        """battles: list of lists of (BattleState, recorded action) per battle"""
+        self.battles = battles
+        self.state_count = sum(len(rounds) for rounds in battles)
+
+    @classmethod
+    def from_store(cls, store, level=None, limit=None):
+        """Load recorded battles from a BattleStore"""
+        battles = []
+        current_id = None
+        current = None
+        escape_attempts = 0
+        should_escape = False
+
+        for row in store.iter_rounds(level=level, limit=limit):
+            if row['battle_id'] != current_id:
+                current_id = row['battle_id']
+                current = []
+                battles.append(current)
+                escape_attempts = 0
+                # The bot only escapes from mobs it decided to flee
+                should_escape = row['escape_attempts'] > 0
+
+            state = BattleState(
+                round=row['round'],
+                hp=row['hp'],
+                max_hp=row['max_hp'],
+                options=frozenset(row['options']),
+                mob=row['mob'],
+                should_escape=should_escape,
+                escape_attempts=escape_attempts
+            )
+            current.append((state, row['action']))
+            if row['action'] == ESCAPE:
+                escape_attempts += 1
+
+        return cls(battles)
+
+    def run(self, policy, score=None):
+        """Replay all recorded states through a policy, returns summary dict"""
+        actions = Counter()
+        agree = 0
+        total_score = 0.0
+
+        for rounds in self.battles:
+            for state, recorded in rounds:
+                action = policy.decide(state)
+                actions[action] += 1
+                if action == recorded:
+                    agree += 1
+                if score:
+                    total_score += score(state, action, recorded)
+
+        return {
+            'policy': policy.name,
+            'states': self.state_count,
+            'actions': dict(actions),
+            'agreement': agree / self.state_count if self.state_count else 0.0,
+            'score': total_score
+        }
+
+    def run_many(self, policies, score=None):
+        """
+        Replay recorded states through many policies. With a score function the results
+        are ranked best score first; without one they stay in policy order, since agreement
+        with the recorded actions only says how close a policy is to what the bot did,
+        not whether it fights better (modules/battle_sim.py ranks settings by XP/hour).
+        """
+        results = [self.run(policy, score) for policy in policies]
+        if score is None:
+            return results
+        return sorted(results, key=lambda r: r['score'], reverse=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from utils.battle_store import BattleStore
+
+    parser = argparse.ArgumentParser(description='Replay recorded battles through policy variants and show '
+                                                 'how often each one would act as the bot did')
+    parser.add_argument('--db', default='battles.db', help='Battle telemetry database (default: battles.db)')
+    parser.add_argument('--level', type=int, default=None, help='Only battles at this level')
+    parser.add_argument('--top', type=int, default=10, help='Show the first N policies of the grid (default: 10)')
+    args = parser.parse_args()
+
+    runner = PolicyRunner.from_store(BattleStore(args.db), level=args.level)
+    policies = policy_grid()
+    started = time.perf_counter()
+    results = runner.run_many(policies)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(policies)} policies x {runner.state_count} states in {elapsed:.3f}s "
+          f"({len(policies) / elapsed if elapsed else 0:.0f} policies/s)")
+    print("Agreement with the recorded actions (not a ranking, see modules.battle_sim for XP/hour):")
+    for result in results[:args.top]:
+        print(f"{result['agreement']:6.1%} agree  {result['policy']}  {result['actions']}")
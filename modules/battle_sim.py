@@ -0,0 +1,250 @@
+"""
+Monte Carlo battle simulator for tuning handle_battle tunables from recorded data.
+
+Per-mob models are fitted from the battle telemetry store:
+- damage we take per round (empirical HP drops between rounds)
+- "kill units" a mob needs (attacks + skill_power * skills in won battles)
+- escape success probability (successful escapes / escape attempts)
+- potion heal amount
+
+Battles are simulated as NumPy arrays, one element per battle, so a policy
+setting is evaluated over millions of battles with one array step per round.
+"""
+
+from dataclasses import dataclass
+from itertools import product
+
+import numpy as np
+
+from modules.battle_policy import ATTACK, SKILL, POTION, ESCAPE
+
+MAX_ROUNDS = 30
+
+
+@dataclass
+class MobModel:
+    """Fitted per-mob distributions"""
+    mob: str
+    battles: int
+    damage: np.ndarray          # HP lost per mob hit
+    kill_units: np.ndarray      # offensive units needed to win
+    escape_chance: float
+    potion_heal: float
+    xp: float
+    gold: float
+
+
+@dataclass
+class SimSettings:
+    """One setting of handle_battle tunables"""
+    potion_threshold: int = 100
+    use_skills: bool = True
+    max_escape_attempts: int = 5
+    should_escape: bool = False
+
+    @property
+    def name(self):
+        """Readable setting name"""
+        return (f"potion<{self.potion_threshold} skills={self.use_skills} "
+                f"escape={'yes' if self.should_escape else 'no'}/{self.max_escape_attempts}")
+
+
+def fit_models(store, level=None, skill_power=1.5, min_battles=5, default_escape_chance=0.5, default_heal=100.0):
+    """Fit per-mob models from recorded rounds in a BattleStore"""
+    battles = {}
+    for row in store.iter_rounds(level=level):
+        battle = battles.setdefault(row['battle_id'], {'mob': row['mob'], 'outcome': row['outcome'], 'rounds': []})
+        battle['rounds'].append((row['hp'], row['action']))
+
+    # Rewards per mob come from the aggregated stats
+    rewards = {row['mob']: row for row in store.mob_stats(level=level)}
+
+    per_mob = {}
+    for battle in battles.values():
+        data = per_mob.setdefault(battle['mob'], {'damage': [], 'kill_units': [], 'escape_attempts': 0,
+                                                  'escapes': 0, 'heals': [], 'battles': 0})
+        data['battles'] += 1
+        rounds = battle['rounds']
+
+        for (hp, action), (next_hp, _) in zip(rounds, rounds[1:]):
+            if hp is None or next_hp is None:
+                continue
+            if action == POTION:
+                data['heals'].append(next_hp - hp)
+            elif next_hp <= hp:
+                data['damage'].append(hp - next_hp)
+
+        attempts = sum(1 for _, action in rounds if action == ESCAPE)
+        data['escape_attempts'] += attempts
+        if battle['outcome'] == 'escaped':
+            data['escapes'] += 1
+
+        if battle['outcome'] == 'won':
+            attacks = sum(1 for _, action in rounds if action == ATTACK)
+            skills = sum(1 for _, action in rounds if action == SKILL)
+            data['kill_units'].append(attacks + skill_power * skills)
+
+    models = {}
+    for mob, data in per_mob.items():
+        if data['battles'] < min_battles or not data['damage'] or not data['kill_units']:
+            continue
+        damage = np.asarray(data['damage'], dtype=np.float64)
+        # A potion round is also hit by the mob, add the mean hit back to get the heal
+        heal = float(np.mean(data['heals']) + damage.mean()) if data['heals'] else default_heal
+        escape_chance = (data['escapes'] / data['escape_attempts']) if data['escape_attempts'] else default_escape_chance
+        reward = rewards.get(mob, {})
+        models[mob] = MobModel(
+            mob=mob,
+            battles=data['battles'],
+            damage=damage,
+            kill_units=np.asarray(data['kill_units'], dtype=np.float64),
+            escape_chance=escape_chance,
+            potion_heal=max(heal, 0.0),
+            xp=float(reward.get('avg_xp') or 0.0),
+            gold=float(reward.get('avg_gold') or 0.0)
+        )
+    return models
+
+
+def simulate(model, settings, max_hp, n=1_000_000, skill_power=1.5, potions=None, rng=None):
+    """Simulate n battles against one mob, returns per-battle result arrays"""
+    rng = rng or np.random.default_rng()
+
+    hp = np.full(n, float(max_hp))
+    mob_left = rng.choice(model.kill_units, size=n)
+    potions_left = np.full(n, np.inf if potions is None else float(potions))
+    escapes_used = np.zeros(n, dtype=np.int32)
+    rounds = np.zeros(n, dtype=np.int32)
+    active = np.ones(n, dtype=bool)
+    won = np.zeros(n, dtype=bool)
+    lost = np.zeros(n, dtype=bool)
+    escaped = np.zeros(n, dtype=bool)
+
+    for _ in range(MAX_ROUNDS):
+        if not active.any():
+            break
+        rounds += active
+
+        # Same priorities as DefaultPolicy
+        do_escape = active & settings.should_escape & (escapes_used < settings.max_escape_attempts)
+        do_potion = active & ~do_escape & (hp < settings.potion_threshold) & (potions_left > 0)
+        do_skill = active & ~do_escape & ~do_potion & settings.use_skills
+        do_attack = active & ~do_escape & ~do_potion & ~do_skill
+
+        escapes_used += do_escape
+        got_away = do_escape & (rng.random(n) < model.escape_chance)
+        escaped |= got_away
+        active &= ~got_away
+
+        hp = np.where(do_potion, np.minimum(hp + model.potion_heal, max_hp), hp)
+        potions_left -= do_potion
+
+        mob_left -= do_attack * 1.0 + do_skill * skill_power
+        killed = active & (mob_left <= 0)
+        won |= killed
+        active &= ~killed
+
+        # Mob hits everyone still fighting
+        hits = rng.choice(model.damage, size=n)
+        hp = np.where(active, hp - hits, hp)
+        died = active & (hp <= 0)
+        lost |= died
+        active &= ~died
+
+    return {
+        'won': won,
+        'lost': lost,
+        'escaped': escaped,
+        'hp_loss': max_hp - np.maximum(hp, 0.0),
+        'rounds': rounds,
+        'escapes_used': escapes_used
+    }
+
+
+def summarize(model, result, max_hp, hp_per_minute, energy_minutes, round_seconds=6.0, gold_weight=0.0):
+    """Win rate, expected HP loss and XP/hour of a simulated batch"""
+    won = result['won']
+    hp_loss = result['hp_loss']
+    reward = won * (model.xp + gold_weight * model.gold)
+
+    # Wall time per battle: the energy it needs, fighting rounds and regenerating lost HP
+    minutes = energy_minutes + result['rounds'] * round_seconds / 60 + hp_loss / hp_per_minute
+    xp_per_hour = reward.sum() / (minutes.sum() / 60)
+
+    return {
+        'mob': model.mob,
+        'win_rate': float(won.mean()),
+        'defeat_rate': float(result['lost'].mean()),
+        'escape_rate': float(result['escaped'].mean()),
+        'avg_hp_loss': float(hp_loss.mean()),
+        'avg_rounds': float(result['rounds'].mean()),
+        'xp_per_battle': float(reward.mean()),
+        'xp_per_hour': float(xp_per_hour)
+    }
+
+
+def settings_grid(potion_thresholds=(0, 50, 100, 150, 200), use_skills=(True, False),
+                  max_escape_attempts=(1, 3, 5, 10), should_escape=(False, True)):
+    """All tunable combinations to evaluate"""
+    grid = []
+    for threshold, skills, escapes, flee in product(potion_thresholds, use_skills, max_escape_attempts, should_escape):
+        if not flee and escapes != max_escape_attempts[0]:
+            continue  # escape attempts only matter when fleeing
+        grid.append(SimSettings(threshold, skills, escapes, flee))
+    return grid
+
+
+def evaluate(models, grid, max_hp, hp_per_minute, energy_minutes, n=1_000_000, skill_power=1.5,
+             potions=None, seed=None):
+    """Evaluate every setting against every mob, returns list of summary dicts"""
+    rng = np.random.default_rng(seed)
+    results = []
+    for model in models.values():
+        for settings in grid:
+            result = simulate(model, settings, max_hp, n, skill_power, potions, rng)
+            summary = summarize(model, result, max_hp, hp_per_minute, energy_minutes)
+            summary['settings'] = settings.name
+            results.append(summary)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+    from pathlib import Path
+
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from utils.battle_store import BattleStore
+
+    parser = argparse.ArgumentParser(description='Monte Carlo battle strategy simulator')
+    parser.add_argument('--db', default='battles.db', help='Battle telemetry database (default: battles.db)')
+    parser.add_argument('--level', type=int, default=None, help='Fit only battles at this level')
+    parser.add_argument('--battles', type=int, default=1_000_000, help='Simulated battles per setting and mob')
+    parser.add_argument('--max-hp', type=int, required=True, help='Our max HP')
+    parser.add_argument('--hp-per-minute', type=float, default=5.0, help='HP regeneration per minute')
+    parser.add_argument('--energy-minutes', type=float, default=30.0, help='Minutes to regenerate one energy')
+    parser.add_argument('--skill-power', type=float, default=1.5, help='Damage of a skill relative to attack')
+    parser.add_argument('--potions', type=int, default=None, help='Potions available per battle (default: unlimited)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+    args = parser.parse_args()
+
+    models = fit_models(BattleStore(args.db), level=args.level, skill_power=args.skill_power)
+    if not models:
+        print("Not enough recorded battles to fit any mob model")
+        sys.exit(1)
+
+    grid = settings_grid()
+    started = time.perf_counter()
+    results = evaluate(models, grid, args.max_hp, args.hp_per_minute, args.energy_minutes,
+                       args.battles, args.skill_power, args.potions, args.seed)
+    elapsed = time.perf_counter() - started
+    total = len(models) * len(grid) * args.battles
+    print(f"Simulated {total:,} battles in {elapsed:.1f}s ({total / elapsed:,.0f} battles/s)")
+
+    for mob in models:
+        print(f"\n=== {mob} ({models[mob].battles} recorded battles) ===")
+        mob_results = sorted((r for r in results if r['mob'] == mob), key=lambda r: r['xp_per_hour'], reverse=True)
+        for r in mob_results[:5]:
+            print(f"{r['xp_per_hour']:8.1f} XP/h  win {r['win_rate']:6.1%}  lose {r['defeat_rate']:6.1%}  "
+                  f"flee {r['escape_rate']:6.1%}  HP -{r['avg_hp_loss']:.0f}  {r['settings']}")
@@ -0,0 +1,127 @@
+"""
+Explicit state machine for the auto-leveling loop.
+
+GameBot implements one handler per state; a handler does the work of its
+state and returns an event, and TRANSITIONS maps (state, event) to the next
+state. The machine tracks time spent per state so slow phases show up in
+logs and metrics, and keeps the last state so errors resume where they
+happened instead of restarting from the profile check.
+"""
+
+import time
+
+from utils import metrics
+
+# States
+IDLE = 'idle'
+CHECKING_PROFILE = 'checking_profile'
+WAITING_HP = 'waiting_hp'
+WAITING_ENERGY = 'waiting_energy'
+OUTSIDE_WINDOW = 'outside_window'
+EXPLORING = 'exploring'
+IN_ENCOUNTER = 'in_encounter'
+IN_BATTLE = 'in_battle'
+
+STATES = (IDLE, CHECKING_PROFILE, WAITING_HP, WAITING_ENERGY, OUTSIDE_WINDOW,
+          EXPLORING, IN_ENCOUNTER, IN_BATTLE)
+
+# Events returned by state handlers
+READY = 'ready'                    # idle delay passed
+HP_LOW = 'hp_low'                  # profile: HP below max
+NO_ENERGY = 'no_energy'            # profile: no energy left
+RESTRICTED = 'restricted'          # profile: outside window or daily limit reached
+CAN_EXPLORE = 'can_explore'        # profile: everything ready
+WAITED = 'waited'                  # a regeneration/window wait finished
+EXPLORED = 'explored'              # explore command sent
+BATTLE = 'battle'                  # encounter is a battle
+EVENT_HANDLED = 'event_handled'    # camp, player or trap clicked
+NOTHING = 'nothing'                # encounter without anything to do
+BATTLE_OVER = 'battle_over'        # battle finished (any outcome)
+
+TRANSITIONS = {
+    (IDLE, READY): CHECKING_PROFILE,
+    (CHECKING_PROFILE, HP_LOW): WAITING_HP,
+    (CHECKING_PROFILE, NO_ENERGY): WAITING_ENERGY,
+    (CHECKING_PROFILE, RESTRICTED): OUTSIDE_WINDOW,
+    (CHECKING_PROFILE, CAN_EXPLORE): EXPLORING,
+    (WAITING_HP, WAITED): CHECKING_PROFILE,
+    (WAITING_ENERGY, WAITED): CHECKING_PROFILE,
+    (OUTSIDE_WINDOW, WAITED): CHECKING_PROFILE,
+    (EXPLORING, EXPLORED): IN_ENCOUNTER,
+    (IN_ENCOUNTER, BATTLE): IN_BATTLE,
+    (IN_ENCOUNTER, EVENT_HANDLED): IDLE,
+    (IN_ENCOUNTER, NOTHING): IDLE,
+    (IN_BATTLE, BATTLE_OVER): IDLE,
+}
+
+# States a checkpoint can resume straight into (others restart at the profile check)
+RESUMABLE_STATES = (CHECKING_PROFILE, WAITING_HP, WAITING_ENERGY, OUTSIDE_WINDOW, IN_ENCOUNTER, IN_BATTLE)
+
+# States spent waiting for HP, energy or the exploration window (economy waiting share)
+WAITING_STATES = (WAITING_HP, WAITING_ENERGY, OUTSIDE_WINDOW)
+
+# States the loop can be interrupted in (daemon switching jobs) without leaving an encounter half-done
+INTERRUPTIBLE_STATES = (IDLE, CHECKING_PROFILE, WAITING_HP, WAITING_ENERGY, OUTSIDE_WINDOW)
+
+STATE_SECONDS = metrics.Histogram('ostromag_state_seconds', 'Time spent per bot state',
+                                  (0.5, 1, 3, 5, 10, 30, 60, 300, 900, 3600, 14400), ('state',))
+TIME_TO_FIRST_ACTION = metrics.Gauge('ostromag_time_to_first_action_seconds',
+                                     'Seconds from process start to the first state past the profile check')
+STATE_ERRORS = metrics.Counter('ostromag_state_errors_total', 'Errors raised by state handlers', ('state',))
+
+
+class InvalidTransition(Exception):
+    """Handler returned an event its state has no transition for"""
+
+
+class StateMachine:
+    """Current state, transitions and per-state timing"""
+
+    def __init__(self, state=IDLE, on_leave=None):
+        """on_leave(state, seconds) is called whenever a state is left"""
+        self.state = state
+        self.on_leave = on_leave
+        self.entered_at = time.monotonic()
+        self.errors = 0
+        self.totals = {name: [0, 0.0] for name in STATES}  # state -> [visits, seconds]
+
+    def fire(self, event):
+        """Apply event to the current state, returns the new state"""
+        next_state = TRANSITIONS.get((self.state, event))
+        if next_state is None:
+            raise InvalidTransition(f"No transition from '{self.state}' on '{event}'")
+        self._leave()
+        self.state = next_state
+        self.errors = 0
+        return next_state
+
+    def reset(self, state):
+        """Jump to state without an event (error fallback, checkpoint resume)"""
+        self._leave()
+        self.state = state
+        self.errors = 0
+
+    def failed(self):
+        """Count a handler error in the current state, returns consecutive errors"""
+        self.errors += 1
+        STATE_ERRORS.inc(state=self.state)
+        return self.errors
+
+    def _leave(self):
+        now = time.monotonic()
+        elapsed = now - self.entered_at
+        self.entered_at = now
+        visits = self.totals[self.state]
+        visits[0] += 1
+        visits[1] += elapsed
+        STATE_SECONDS.observe(elapsed, state=self.state)
+        if self.on_leave:
+            self.on_leave(self.state, elapsed)
+
+    def summary(self):
+        """One line per visited state: visits and total time"""
+        lines = []
+        for name, (visits, seconds) in sorted(self.totals.items(), key=lambda item: item[1][1], reverse=True):
+            if visits:
+                lines.append(f"  {name:<18} {seconds / 60:8.1f} min  x{visits}")
+        return '\n'.join(lines)
@@ -0,0 +1,192 @@
+"""
+Encounter handlers for the explore reply - a registry instead of hard-coded branches.
+
+Each handler has a priority and a match predicate on (message, parsed kind);
+GameBot.on_in_encounter classifies the latest messages once and runs the first
+handler that matches, newest message first. A handler returns the FSM event
+and the game's outcome message (None if nothing was awaited, NO_ANSWER on
+timeout). Handlers that click await the outcome (a new message or an edit of
+the clicked one) instead of sleeping a fixed time, and per-handler latency,
+timeouts and rewards found in the outcome are kept, so it shows which
+encounters are worth the time.
+
+New encounter types are added without touching the loop:
+
+    @encounters.register('shrine', priority=25, match=lambda msg, kind: "вівтар" in msg.text)
+    async def pray(bot, msg):
+        return bot_fsm.EVENT_HANDLED, await encounters.click_and_await(bot, msg)
+"""
+
+import asyncio
+import time
+
+from modules import bot_fsm
+from utils import metrics, tracing
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Seconds between checks for the game's answer to a click, and how long to wait for it
+OUTCOME_POLL = 1.0
+OUTCOME_TIMEOUT = 10.0
+
+# Outcome of a click the game did not answer in time
+NO_ANSWER = object()
+
+ENCOUNTER_SECONDS = metrics.Histogram('ostromag_encounter_seconds', 'Time from match to outcome per encounter handler',
+                                      (0.5, 1, 2, 3, 5, 10, 20), ('handler',))
+ENCOUNTERS = metrics.Counter('ostromag_encounters_total', 'Encounters handled by handler and outcome',
+                             ('handler', 'outcome'))
+ENCOUNTER_REWARDS = metrics.Counter('ostromag_encounter_rewards_total', 'Gold and XP found in encounter outcomes',
+                                    ('handler', 'reward'))
+
+
+class EncounterHandler:
+    """One encounter type: match predicate, action and its stats"""
+
+    def __init__(self, name, priority, match, action):
+        self.name = name
+        self.priority = priority
+        self.match = match
+        self.action = action
+        self.count = 0
+        self.seconds = 0.0
+        self.timeouts = 0
+        self.gold = 0
+        self.xp = 0
+
+    def record(self, seconds, outcome, rewards):
+        self.count += 1
+        self.seconds += seconds
+        if outcome is NO_ANSWER:
+            self.timeouts += 1
+        self.gold += rewards.get('gold', 0)
+        self.xp += rewards.get('experience', 0)
+        ENCOUNTER_SECONDS.observe(seconds, handler=self.name)
+        ENCOUNTERS.inc(handler=self.name, outcome='timeout' if outcome is NO_ANSWER else 'handled')
+        for reward, key in (('gold', 'gold'), ('xp', 'experience')):
+            if rewards.get(key):
+                ENCOUNTER_REWARDS.inc(rewards[key], handler=self.name, reward=reward)
+
+
+class EncounterRegistry:
+    """Handlers ordered by priority (lower runs first)"""
+
+    def __init__(self):
+        self.handlers = []
+
+    def register(self, name, priority, match):
+        """Decorator adding async action(bot, msg) -> (event, outcome message or None or NO_ANSWER)"""
+        def decorator(action):
+            self.handlers = [handler for handler in self.handlers if handler.name != name]
+            self.handlers.append(EncounterHandler(name, priority, match, action))
+            self.handlers.sort(key=lambda handler: handler.priority)
+            return action
+        return decorator
+
+    def find(self, messages, classify):
+        """(handler, message) for the first match, newest message first"""
+        for msg in messages:
+            if not msg.text:
+                continue
+            kind = classify(msg)
+            for handler in self.handlers:
+                if handler.match(msg, kind):
+                    return handler, msg
+        return None, None
+
+    async def dispatch(self, bot, messages):
+        """Run the matching handler, returns its event (NOTHING if no handler matched)"""
+        handler, msg = self.find(messages, bot.parser.classify)
+        if handler is None:
+            return bot_fsm.NOTHING
+        started = time.monotonic()
+        with tracing.span(f"encounter:{handler.name}"):
+            event, outcome = await handler.action(bot, msg)
+        answered = outcome is not None and outcome is not NO_ANSWER
+        rewards = (bot.parser.battle_rewards(outcome) or {}) if answered else {}
+        handler.record(time.monotonic() - started, outcome, rewards)
+        if rewards:
+            bot.economy.add_rewards(rewards.get('experience', 0), rewards.get('gold', 0))
+        return event
+
+    def summary(self):
+        """One line per handler that ran: count, mean latency, timeouts, rewards"""
+        lines = []
+        for handler in self.handlers:
+            if handler.count:
+                lines.append(f"  {handler.name:<12} x{handler.count:<5} {handler.seconds / handler.count:5.1f}s avg "
+                             f"{handler.timeouts} timeouts, {handler.gold} gold, {handler.xp} XP")
+        return '\n'.join(lines)
+
+
+registry = EncounterRegistry()
+register = registry.register
+
+
+async def click_and_await(bot, msg, timeout=OUTCOME_TIMEOUT):
+    """Click the first button and wait for the game's answer: a newer message or an edit of msg (or NO_ANSWER)"""
+    text, edit_date = msg.text, getattr(msg, 'edit_date', None)  # Stand-in messages are edited in place
+    await bot.human_delay()
+    await bot.client.click(msg, 0, 0)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        await tracing.sleep(OUTCOME_POLL, "await_outcome")
+        for reply in await bot.client.get_messages(bot.game_chat, limit=2):
+            if reply.id > msg.id and not getattr(reply, 'out', False):
+                return reply
+            if reply.id == msg.id and (reply.text != text or getattr(reply, 'edit_date', None) != edit_date):
+                return reply
+    logger.warning(f"No answer to the click on '{text[:40]}' within {timeout:.0f}s")
+    return NO_ANSWER
+
+
+def _has_attack_button(msg):
+    return bool(msg.buttons) and any("Атака" in btn.text for row in msg.buttons for btn in row if btn.text)
+
+
+# ⚔️ Battle started - handled by the IN_BATTLE state
+@register('battle', priority=10, match=lambda msg, kind: "З'явився" in msg.text or _has_attack_button(msg))
+async def start_battle(bot, msg):
+    return bot_fsm.BATTLE, None
+
+
+# ⛺ Camp - first button is usually "Дослідити"
+@register('camp', priority=20,
+          match=lambda msg, kind: bool(msg.buttons) and ("покинутий табір" in msg.text or "табір" in msg.text.lower()))
+async def explore_camp(bot, msg):
+    logger.info(f"Camp found: {msg.text[:80]}...")
+    outcome = await click_and_await(bot, msg)
+    logger.info("Clicked camp exploration button")
+    return bot_fsm.EVENT_HANDLED, outcome
+
+
+# 👋 Other player - first button is usually "Привітати"
+@register('player', priority=30,
+          match=lambda msg, kind: bool(msg.buttons) and ("який подорожує неподалік" in msg.text
+                                                        or "ви бачите" in msg.text.lower()))
+async def greet_player(bot, msg):
+    logger.info(f"Other player found: {msg.text[:80]}...")
+    outcome = await click_and_await(bot, msg)
+    logger.info("Clicked player greeting button")
+    return bot_fsm.EVENT_HANDLED, outcome
+
+
+# 🪤 Guild trap - first button is usually "Встановити пастку"
+@register('trap', priority=40,
+          match=lambda msg, kind: bool(msg.buttons) and ("Ви знайшли стару пастку" in msg.text
+                                                        or "полагодити її?" in msg.text.lower()))
+async def install_trap(bot, msg):
+    logger.info(f"Found oportunity to create a trap: {msg.text[:80]}...")
+    outcome = await click_and_await(bot, msg)
+    logger.info("Clicked trap creation button, trap installed")
+    return bot_fsm.EVENT_HANDLED, outcome
+
+
+# ❌ No energy left
+@register('no_energy', priority=50, match=lambda msg, kind: "Недостатньо енергії" in msg.text)
+async def out_of_energy(bot, msg):
+    logger.info("Out of energy")
+    bot.current_energy = 0
+    return bot_fsm.NOTHING, None
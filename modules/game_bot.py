@@ -5,18 +5,28 @@ Main flow:
 2. Check player profile once  
 3. Start exploring if HP is full and energy > 0
 4. In battle: use skills and potions (if HP < 100)
-5. After battle: check profile and wait for regeneration
+5. After battle: check profile and wait for regeneration (restocking potions meanwhile)
 """
 
-import asyncio
 import re
-from datetime import datetime, timedelta
-from telethon import events, Button
-from telethon.tl.custom import Message
+import time
+from dataclasses import replace
 
+from utils.game_client import GameClient
+from utils.peer_cache import PeerCache
 from utils.logger import setup_logger
 from utils.parser import GameParser
 from utils.energy_tracker import EnergyTracker
+from utils import battle_store, config_reload, economy, humanize, metrics, parse_cache, parser, tracing
+from utils.battle_store import BattleStore, BattleRecorder
+from utils.checkpoint import Checkpoint
+from utils.action_ledger import ActionLedger
+from utils.escape_advisor import EscapeAdvisor
+from utils.potion_stock import PotionStock
+from modules import bot_fsm, encounters
+from modules.bot_fsm import StateMachine
+from modules.battle_policy import (DefaultPolicy, parse_battle_state, ACTION_BUTTONS,
+                                   ATTACK, SKILL, POTION, ESCAPE)
 
 logger = setup_logger(__name__)
 
@@ -26,16 +36,39 @@ class GameBot:
     Simplified game bot controller for auto-leveling
     """
     
-    def __init__(self, client, config):
-        """Initialize bot with client and configuration"""
-        self.client = client
+    # Consecutive handler errors before falling back to a fresh profile check
+    MAX_STATE_ERRORS = 3
+    
+    def __init__(self, client, config, started_at=None):
+        """Initialize bot with client and configuration (started_at: process start, time.monotonic())"""
+        self.client = GameClient.wrap(client)
         self.config = config
-        self.parser = GameParser()
+        self.parser = GameParser(parse_cache.get_cache(config.PARSE_CACHE_SIZE))
         
         # Bot state
         self.game_chat = None
         self.is_running = False
         
+        # XP/gold/energy efficiency over rolling windows (shared across GameBot runs)
+        self.economy = economy.get_tracker()
+        
+        # Main loop state machine and values carried between states
+        self.fsm = StateMachine(on_leave=lambda state, seconds: self.economy.add_time(
+            seconds, waiting=state in bot_fsm.WAITING_STATES))
+        self.idle_delay = 0
+        self.explore_sent = None
+        self.battle_msg_id = None
+        self.wait_until = None  # Wall-clock end of the current HP/energy wait
+        
+        # Checkpoint for resuming after restart (disabled when CHECKPOINT_PATH is empty)
+        self.checkpoint = Checkpoint(config.CHECKPOINT_PATH, config.CHECKPOINT_MAX_AGE) if config.CHECKPOINT_PATH else None
+        self.started_at = started_at if started_at is not None else time.monotonic()
+        self.first_action_logged = False
+        
+        # Set by ConnectionManager; state to switch to after catch-up found something we missed
+        self.connection = None
+        self.pending_state = None
+        
         # Character stats (updated from profile checks)
         self.current_hp = 0
         self.max_hp = 1
@@ -50,16 +83,88 @@ class GameBot:
         
         # Energy tracker for daily limits and time windows
         self.energy_tracker = EnergyTracker(config.DAILY_ENERGY_LIMIT, config.EXPLORATION_START_HOUR)
+        
+        # Battle telemetry (disabled when BATTLE_DB_PATH is empty)
+        self.battle_store = BattleStore(config.BATTLE_DB_PATH) if config.BATTLE_DB_PATH else None
+        
+        # Fight or flee decisions learned from recorded battles
+        self.escape_advisor = EscapeAdvisor(config)
+        
+        # Battle decisions (pure policy, clicks are done in handle_battle)
+        self.battle_policy = DefaultPolicy(config.BATTLE_POTION_THRESHOLD, config.BATTLE_USE_SKILLS,
+                                           config.BATTLE_MAX_ESCAPE_ATTEMPTS)
+        
+        # Clicks already made on a battle message state (no double clicks before the game edits it)
+        self.action_ledger = ActionLedger(config.ACTION_RETRY_SECONDS)
+        
+        # Potions left (from the battle potion menu), restocked during HP waits
+        self.potion_stock = PotionStock(config)
+        self.shopping = False  # A restock trip is under way (not a safe point even while waiting for HP)
+    
+    async def human_delay(self, kind=humanize.MENU_NAV):
+        """Simulate human-like reaction time for this kind of action"""
+        await humanize.delay(self.config, kind)
+    
+    async def click_button(self, msg, label):
+        """Click the first button containing label, returns True if clicked"""
+        for row_idx, row in enumerate(msg.buttons or []):
+            for btn_idx, btn in enumerate(row):
+                if btn.text and label in btn.text:
+                    await self.human_delay(humanize.BATTLE_CLICK)
+                    await self.client.click(msg, row_idx, btn_idx)
+                    return True
+        return False
     
-    async def human_delay(self, min_seconds=None, max_seconds=None):
-        """Simulate human-like reaction time"""
-        import random
-        if min_seconds is None:
-            min_seconds = self.config.HUMAN_DELAY_MIN
-        if max_seconds is None:
-            max_seconds = self.config.HUMAN_DELAY_MAX
-        delay = random.uniform(min_seconds, max_seconds)
-        await asyncio.sleep(delay)
+    def snapshot(self):
+        """Checkpoint data: FSM state, profile, pending timers and battle message"""
+        return {
+            'state': self.fsm.state,
+            'profile': {
+                'level': self.level, 'hp': self.current_hp, 'max_hp': self.max_hp,
+                'energy': self.current_energy, 'max_energy': self.max_energy, 'gold': self.gold,
+                'hp_regen_minutes': self.hp_regen_minutes, 'energy_regen_minutes': self.energy_regen_minutes,
+                'potions': self.potion_stock.count
+            },
+            'wait_until': self.wait_until,
+            'battle_msg_id': self.battle_msg_id,
+            'idle_delay': self.idle_delay
+        }
+    
+    def save_checkpoint(self):
+        if self.checkpoint:
+            self.checkpoint.save_in_background(self.snapshot())
+    
+    def restore(self, data):
+        """Restore state from a checkpoint, returns the state to resume in"""
+        profile = data.get('profile', {})
+        self.level = profile.get('level', self.level)
+        self.current_hp = profile.get('hp', self.current_hp)
+        self.max_hp = profile.get('max_hp', self.max_hp)
+        self.current_energy = profile.get('energy', self.current_energy)
+        self.max_energy = profile.get('max_energy', self.max_energy)
+        self.gold = profile.get('gold', self.gold)
+        self.hp_regen_minutes = profile.get('hp_regen_minutes')
+        self.energy_regen_minutes = profile.get('energy_regen_minutes')
+        self.potion_stock.set(profile.get('potions', self.potion_stock.count))
+        self.wait_until = data.get('wait_until')
+        self.battle_msg_id = data.get('battle_msg_id')
+        self.idle_delay = data.get('idle_delay', 0)
+        
+        state = data.get('state')
+        # Unknown whether explore was sent - the profile check tells
+        if state not in bot_fsm.RESUMABLE_STATES:
+            state = bot_fsm.CHECKING_PROFILE
+        return state
+    
+    def timer(self, seconds):
+        """Seconds left of the current wait, continuing a wait restored from checkpoint"""
+        now = time.time()
+        if self.wait_until is not None:
+            # A restored deadline that already passed means the wait is over, not a new one
+            return max(self.wait_until - now, 0)
+        self.wait_until = now + seconds
+        self.save_checkpoint()
+        return seconds
     
     async def start(self):
         """Initialize bot and start main loop"""
@@ -67,13 +172,26 @@ class GameBot:
             logger.info("=== BOT STARTING ===")
             
             # Connect to game bot
-            self.game_chat = await self.client.get_entity(self.config.GAME_BOT_USERNAME)
-            logger.info(f"Connected to game bot: {self.game_chat.username}")
+            self.game_chat = await self.client.resolve_peer(self.config.GAME_BOT_USERNAME,
+                                                            PeerCache.from_config(self.config))
+            self.client.watch_chat(self.game_chat)
+            logger.info(f"Connected to game bot: {self.config.GAME_BOT_USERNAME}")
+            
+            if self.battle_store:
+                await self.battle_store.start()
             
-            # Send /start to refresh menu
-            await self.human_delay(2, 4)
-            await self.client.send_message(self.game_chat, '/start')
-            await asyncio.sleep(3)
+            saved = self.checkpoint.load() if self.checkpoint else None
+            if saved:
+                # ⏩ Resume straight into the pending battle or wait
+                state = self.restore(saved)
+                self.fsm.reset(state)
+                logger.info(f"Resuming from checkpoint in state {state} "
+                            f"(HP: {self.current_hp}/{self.max_hp}, Energy: {self.current_energy}/{self.max_energy})")
+            else:
+                # Send /start to refresh menu
+                await self.human_delay()
+                await self.client.send_message(self.game_chat, '/start')
+                await tracing.sleep(3)
             
             # Start main loop (it will handle profile check and HP wait)
             self.is_running = True
@@ -83,25 +201,28 @@ class GameBot:
             logger.error(f"Error starting bot: {e}")
             raise
     
+    @tracing.traced('check_profile')
     async def check_character_status(self, retry_count=0):
         """Check character profile and update stats with retry mechanism"""
         max_retries = 3
         
         try:
             logger.info(f"Checking character status... (attempt {retry_count + 1})")
-            await self.human_delay()
-            await self.client.send_message(self.game_chat, "🧍 Персонаж")
-            await asyncio.sleep(3)
+            await self.human_delay(humanize.PROFILE_CHECK)
+            sent = await self.client.send_message(self.game_chat, "🧍 Персонаж")
+            await tracing.sleep(3)
             
             messages = await self.client.get_messages(self.game_chat, limit=2)
+            metrics.observe_reply('profile', sent, messages)
             
             # Check for "don't rush" message indicating we need to wait
             for msg in messages:
-                if msg.text and ("Будь ласка, не поспішайте" in msg.text or "не поспішайте" in msg.text):
+                if self.parser.classify(msg) == parser.DONT_RUSH:
                     logger.warning("Game says 'don't rush' - profile check failed")
+                    metrics.DONT_RUSH.inc(bot='auto')
                     if retry_count < max_retries:
                         logger.info(f"Retrying character status check in 60 seconds... (attempt {retry_count + 2}/{max_retries + 1})")
-                        await asyncio.sleep(60)  # Wait 1 minute before retry
+                        await tracing.sleep(60)  # Wait 1 minute before retry
                         return await self.check_character_status(retry_count + 1)
                     else:
                         logger.error("Max retries reached for character status check")
@@ -110,48 +231,35 @@ class GameBot:
             # Look for actual character profile
             profile_found = False
             for msg in messages:
-                if msg.text and "Рівень" in msg.text and "Здоров'я:" in msg.text:
+                profile = self.parser.profile(msg)
+                if profile:
                     profile_found = True
-                    # ✨ Parse level
-                    level_match = re.search(r'Рівень (\d+)', msg.text)
-                    if level_match:
-                        self.level = int(level_match.group(1))
-                    
-                    # ❤️ Parse HP
-                    hp_match = re.search(r'Здоров\'я: (\d+)/(\d+)', msg.text)
-                    if hp_match:
-                        self.current_hp = int(hp_match.group(1))
-                        self.max_hp = int(hp_match.group(2))
+                    # ✨ Level, ❤️ HP, ⚡ energy, 💰 gold
+                    self.level = profile.get('level', self.level)
+                    self.current_hp = profile.get('hp', self.current_hp)
+                    self.max_hp = profile.get('max_hp', self.max_hp)
+                    self.current_energy = profile.get('energy', self.current_energy)
+                    self.max_energy = profile.get('max_energy', self.max_energy)
+                    self.gold = profile.get('gold', self.gold)
                     
-                    # ⚡ Parse energy
-                    energy_match = re.search(r'Енергія: (\d+)/(\d+)', msg.text)
-                    if energy_match:
-                        self.current_energy = int(energy_match.group(1))
-                        self.max_energy = int(energy_match.group(2))
-                    
-                    # 💰 Parse gold
-                    gold_match = re.search(r'Золото: (\d+)', msg.text)
-                    if gold_match:
-                        self.gold = int(gold_match.group(1))
-                    
-                    # ❤️ Parse HP regeneration time
-                    hp_regen_match = re.search(r'(\d+)хв до повного відновлення здоров\'я', msg.text)
-                    if hp_regen_match:
-                        self.hp_regen_minutes = int(hp_regen_match.group(1))
+                    # ❤️ HP regeneration time
+                    self.hp_regen_minutes = profile['hp_regen_minutes']
+                    if self.hp_regen_minutes:
                         logger.info(f"HP will be full in {self.hp_regen_minutes} minutes")
-                    else:
-                        self.hp_regen_minutes = None
                     
-                    # ⚡ Parse energy regeneration time
-                    energy_regen_match = re.search(r'(\d+)хв до відновлення енергії', msg.text)
-                    if energy_regen_match:
-                        self.energy_regen_minutes = int(energy_regen_match.group(1))
+                    # ⚡ Energy regeneration time
+                    self.energy_regen_minutes = profile['energy_regen_minutes']
+                    if self.energy_regen_minutes:
                         logger.info(f"New energy will be restored in {self.energy_regen_minutes} minutes")
-                    else:
-                        self.energy_regen_minutes = None
                     
                     logger.info(f"Status - Level: {self.level}, HP: {self.current_hp}/{self.max_hp}, "
                               f"Energy: {self.current_energy}/{self.max_energy}, Gold: {self.gold}")
+                    
+                    # 📊 Keep escape table in sync with level and regeneration rates
+                    self.escape_advisor.observe_regen(self.current_hp, self.max_hp,
+                                                      self.hp_regen_minutes, self.energy_regen_minutes)
+                    if self.escape_advisor.level != self.level:
+                        await self.escape_advisor.refresh(self.battle_store, self.level)
                     break
             
             # If no profile found, retry
@@ -159,7 +267,7 @@ class GameBot:
                 logger.warning("Character profile not found in messages")
                 if retry_count < max_retries:
                     logger.info(f"Retrying character status check in 30 seconds... (attempt {retry_count + 2}/{max_retries + 1})")
-                    await asyncio.sleep(30)
+                    await tracing.sleep(30)
                     return await self.check_character_status(retry_count + 1)
                 else:
                     logger.error("Max retries reached - could not get character profile")
@@ -168,17 +276,18 @@ class GameBot:
         except Exception as e:
             if retry_count < max_retries:
                 logger.warning(f"Error checking character status: {e}. Retrying in 30 seconds...")
-                await asyncio.sleep(30)
+                await tracing.sleep(30)
                 return await self.check_character_status(retry_count + 1)
             else:
                 logger.error(f"Error checking character status after {max_retries + 1} attempts: {e}")
                 raise
     
+    @tracing.traced('wait_hp')
     async def wait_for_full_hp(self):
         """Wait for HP to fully regenerate with manual healing detection"""
         if self.hp_regen_minutes:
-            wait_seconds = ((self.hp_regen_minutes - 1) * 60) + 30  # Add 30s buffer
-            logger.info(f"Waiting {self.hp_regen_minutes} minutes for full HP...")
+            wait_seconds = int(self.timer(self.hp_wait_seconds()))
+            logger.info(f"Waiting {wait_seconds / 60:.0f} minutes for full HP...")
             
             # Check for manual healing every 30 seconds
             check_interval = 30
@@ -190,23 +299,22 @@ class GameBot:
                 if time_to_wait <= 0:
                     break
                     
-                await asyncio.sleep(time_to_wait)
+                await tracing.sleep(time_to_wait, "wait_for_full_hp")
                 elapsed += time_to_wait
                 
                 # Check recent messages for profile updates
                 messages = await self.client.get_messages(self.game_chat, limit=3)
                 for msg in messages:
-                    if msg.text and "Здоров'я:" in msg.text and "Енергія:" in msg.text:
-                        # Parse HP from profile message
-                        hp_match = re.search(r'Здоров\'я: (\d+)/(\d+)', msg.text)
-                        if hp_match:
-                            current_hp = int(hp_match.group(1))
-                            max_hp = int(hp_match.group(2))
-                            if current_hp >= max_hp:
-                                logger.info("Manual healing detected! HP is now full!")
-                                self.current_hp = current_hp
-                                self.max_hp = max_hp
-                                return
+                    # Parse HP from profile message
+                    profile = self.parser.profile(msg)
+                    if profile and 'hp' in profile:
+                        current_hp = profile['hp']
+                        max_hp = profile['max_hp']
+                        if current_hp >= max_hp:
+                            logger.info("Manual healing detected! HP is now full!")
+                            self.current_hp = current_hp
+                            self.max_hp = max_hp
+                            return
                 
                 # Show progress
                 remaining = max(0, wait_seconds - elapsed)
@@ -216,365 +324,453 @@ class GameBot:
             # Check every minute until full
             logger.info("Waiting for full HP (checking every minute)...")
             while self.current_hp < self.max_hp:
-                await asyncio.sleep(60)
+                await tracing.sleep(60)
                 await self.check_character_status()
                 if self.current_hp >= self.max_hp:
                     logger.info("HP is now full!")
                     break
     
+    def hp_wait_seconds(self):
+        """Seconds until HP is full according to the last profile check"""
+        return ((self.hp_regen_minutes - 1) * 60) + 30  # Add 30s buffer
+    
+    @tracing.traced('restock_potions')
+    async def restock_potions(self):
+        """Buy potions up to POTION_RESTOCK_TARGET with the buying bot's shop navigation"""
+        from buying_bot import BuyingBot
+        item = self.config.POTION_RESTOCK_ITEM
+        wanted = self.potion_stock.wanted()
+        logger.info(f"🛒 {self.potion_stock.count} potions left - buying {wanted} '{item}' while HP regenerates")
+        buyer = BuyingBot(self.client, self.config, shopping_list=[(item, wanted, self.config.POTION_RESTOCK_MAX_PRICE)])
+        buyer.game_chat = self.game_chat
+        buyer.gold = self.gold
+        bought = 0
+        self.shopping = True
+        try:
+            await buyer.send_start_command()
+            if await buyer.run_shopping_list():
+                bought = buyer.purchases.get(item, 0)
+            else:
+                logger.warning("Potion restock failed: could not open the shop catalog")
+        finally:
+            self.shopping = False
+            _, entry = buyer.catalog.find(item)
+            self.potion_stock.restocked(bought, entry['price'] if entry else None)
+        if buyer.gold is not None:
+            self.gold = buyer.gold
+    
+    @tracing.traced('wait_energy')
     async def wait_for_energy(self):
         """Wait for energy to regenerate"""
         if self.energy_regen_minutes:
-            wait_seconds = (self.energy_regen_minutes * 60) + 30  # Add 30s buffer
-            logger.info(f"Waiting {self.energy_regen_minutes} minutes for next energy...")
-            await asyncio.sleep(wait_seconds)
+            wait_seconds = self.timer((self.energy_regen_minutes * 60) + 30)  # Add 30s buffer
+            logger.info(f"Waiting {wait_seconds / 60:.0f} minutes for next energy...")
+            await tracing.sleep(wait_seconds, "wait_for_energy")
         else:
             # Wait 5 minutes as default
             logger.info("Waiting 5 minutes for energy...")
-            await asyncio.sleep(300)
+            await tracing.sleep(300)
     
+    @tracing.traced('explore')
     async def explore(self):
         """Send explore command"""
-        logger.info(f"Exploring... (HP: {self.current_hp}/{self.max_hp}, Energy: {self.current_energy}/{self.max_energy})")
+        logger.info("Exploring... (HP: %s/%s, Energy: %s/%s)", self.current_hp, self.max_hp, self.current_energy, self.max_energy)
         await self.human_delay()
-        await self.client.send_message(self.game_chat, "🗺️ Досліджувати (⚡1)")
-        await asyncio.sleep(3)
+        sent = await self.client.send_message(self.game_chat, "🗺️ Досліджувати (⚡1)")
+        await tracing.sleep(3)
+        return sent
     
+    @tracing.traced('battle')
     async def handle_battle(self):
         """Handle battle with simple logic"""
         battle_ended = False
         rounds = 0
         should_escape = False
         escape_attempts = 0
-        max_escape_attempts = 5
+        max_escape_attempts = self.battle_policy.max_escape_attempts
         mob_name = "Unknown"
         
         logger.info("Battle started!")
         
         # Check if we should escape from this mob and extract mob name
-        messages = await self.client.get_messages(self.game_chat, limit=2)
+        if self.battle_msg_id:
+            # Resumed battle - the encounter message may be older than the last two
+            messages = [await self.client.get_messages(self.game_chat, ids=self.battle_msg_id)]
+        else:
+            messages = await self.client.get_messages(self.game_chat, limit=2)
         for msg in messages:
-            if msg.text and "З'явився" in msg.text:
+            if msg and msg.text and "З'явився" in msg.text:
+                self.battle_msg_id = msg.id
+                self.save_checkpoint()
                 # Extract mob name from message
                 mob_match = re.search(r'З\'явився (.+?)!', msg.text)
                 if mob_match:
                     mob_name = mob_match.group(1)
                 
-                for escape_mob in self.config.ESCAPE_MOBS:
-                    if escape_mob in msg.text:
-                        should_escape = True
-                        logger.warning(f"Encountered escape mob: {escape_mob} - will attempt to run away!")
-                        break
+                should_escape, reason = self.escape_advisor.should_escape(mob_name)
+                if should_escape:
+                    logger.warning("Encountered escape mob: %s (%s) - will attempt to run away!", mob_name, reason)
                 break
         
+        battle = BattleRecorder(mob_name, self.level, hp_start=self.current_hp, max_hp=self.max_hp)
+        self.action_ledger.reset()
+        
         if should_escape:
-            logger.info(f"Trying to escape from: {mob_name}")
+            logger.info("Trying to escape from: %s", mob_name)
         else:
-            logger.info(f"Fighting against: {mob_name}")
+            logger.info("Fighting against: %s", mob_name)
         
         while not battle_ended and rounds < 30:
-            rounds += 1
-            await asyncio.sleep(3)
+            with tracing.span('battle_round', round=rounds + 1):
+                rounds += 1
+                await tracing.sleep(3)
             
-            # If we've exceeded max escape attempts for an escape mob, fight normally
-            if should_escape and escape_attempts >= max_escape_attempts:
-                logger.warning(f"Max escape attempts ({max_escape_attempts}) exceeded, will fight normally")
-                should_escape = False
+                # If we've exceeded max escape attempts for an escape mob, fight normally
+                if should_escape and escape_attempts >= max_escape_attempts:
+                    logger.warning("Max escape attempts (%s) exceeded, will fight normally", max_escape_attempts)
+                    should_escape = False
             
-            # Get latest messages
-            messages = await self.client.get_messages(self.game_chat, limit=2)
+                # Get latest messages
+                messages = await self.client.get_messages(self.game_chat, limit=2)
             
-            for msg in messages:
-                if not msg.text:
-                    continue
+                for msg in messages:
+                    if not msg.text:
+                        continue
                 
-                # Check if battle ended
-                if "Ви отримали:" in msg.text:
-                    logger.info("Battle won!")
-                    battle_ended = True
-                    break
-                elif "Ви зазнали поразки!" in msg.text:
-                    logger.warning(f"Battle lost against {mob_name}!")
-                    battle_ended = True
-                    break
-                elif "Ви не перебуваєте в бою" in msg.text:
-                    logger.info("Not in battle - enemy fled or battle ended")
-                    battle_ended = True
-                    break
-                elif "занудьгував і втік" in msg.text or "втік" in msg.text:
-                    logger.info("Enemy fled!")
-                    battle_ended = True
-                    break
-                elif "Вам вдалося втекти!" in msg.text:
-                    logger.info("Successfully escaped!")
-                    battle_ended = True
-                    break
-                elif "Втеча не вдалася!" in msg.text:
-                    if should_escape:  # Only process if we're still trying to escape
-                        if escape_attempts < max_escape_attempts:
-                            logger.warning(f"Escape failed! Will try again... (attempt {escape_attempts}/{max_escape_attempts})")
-                        else:
-                            logger.warning(f"Escape failed! Max attempts reached ({escape_attempts}/{max_escape_attempts})")
-                            should_escape = False
-                    continue
+                    # 🧪 Game says there are no potions left
+                    if self.parser.potion_menu(msg) == {}:
+                        self.potion_stock.set(0)
                 
-                # Handle battle actions
-                if msg.buttons and not battle_ended:
-                    # Extract current HP from message
-                    current_hp = None
-                    hp_match = re.search(r'👤 Ви \((\d+)/(\d+)\)', msg.text)
-                    if hp_match:
-                        current_hp = int(hp_match.group(1))
-                    
-                    # Check for action buttons
-                    has_attack = False
-                    has_skills = False
-                    has_potions = False
-                    has_escape = False
-                    
-                    for row_idx, row in enumerate(msg.buttons):
-                        for btn_idx, btn in enumerate(row):
-                            if btn.text:
-                                if "Атака" in btn.text:
-                                    has_attack = True
-                                elif "Прийоми" in btn.text:
-                                    has_skills = True
-                                elif "Зілля" in btn.text:
-                                    has_potions = True
-                                elif "Втеча" in btn.text:
-                                    has_escape = True
+                    # Check if battle ended
+                    kind = self.parser.classify(msg)
+                    if kind == parser.BATTLE_WON:
+                        logger.info("Battle won!")
+                        battle.finish(battle_store.WON, self.parser.battle_rewards(msg))
+                        battle_ended = True
+                        break
+                    elif kind == parser.BATTLE_LOST:
+                        logger.warning("Battle lost against %s!", mob_name)
+                        battle.finish(battle_store.LOST)
+                        battle_ended = True
+                        break
+                    elif kind == parser.NOT_IN_BATTLE:
+                        logger.info("Not in battle - enemy fled or battle ended")
+                        battle.finish(battle_store.ENDED)
+                        battle_ended = True
+                        break
+                    elif kind == parser.ENEMY_FLED:
+                        logger.info("Enemy fled!")
+                        battle.finish(battle_store.ENEMY_FLED)
+                        battle_ended = True
+                        break
+                    elif kind == parser.ESCAPED:
+                        logger.info("Successfully escaped!")
+                        battle.finish(battle_store.ESCAPED)
+                        battle_ended = True
+                        break
+                    elif kind == parser.ESCAPE_FAILED:
+                        if should_escape:  # Only process if we're still trying to escape
+                            if escape_attempts < max_escape_attempts:
+                                logger.warning("Escape failed! Will try again... (attempt %s/%s)", escape_attempts, max_escape_attempts)
+                            else:
+                                logger.warning("Escape failed! Max attempts reached (%s/%s)", escape_attempts, max_escape_attempts)
+                                should_escape = False
+                        continue
+                
+                    # Handle battle actions
+                    if msg.buttons and not battle_ended:
+                        state = self.battle_state(msg, rounds, mob_name, should_escape, escape_attempts)
                     
-                    # If this is a battle message with actions
-                    if has_attack or has_escape:
-                        clicked = False
+                        # If this is a battle message with actions
+                        if state is not None:
+                            if self.potion_stock.empty():
+                                state = replace(state, options=state.options - {'potions'})
+                            action = self.battle_policy.decide(state)
+                            current_hp = state.hp
+                        
+                            # 🔁 Already acted on this message state - wait for the game's edit
+                            if action and not self.action_ledger.allow(msg, action):
+                                logger.debug("Skipping %s - battle message not updated yet", action)
+                                break
                         
-                        # Priority 1: Try to escape if this is an escape mob and we haven't exceeded max attempts
-                        if should_escape and has_escape and escape_attempts < max_escape_attempts:
-                            for row_idx, row in enumerate(msg.buttons):
-                                for btn_idx, btn in enumerate(row):
-                                    if btn.text and "Втеча" in btn.text:
-                                        escape_attempts += 1  # Increment before clicking
-                                        await self.human_delay()
-                                        await msg.click(row_idx, btn_idx)
-                                        logger.info(f"Clicking escape button (attempt {escape_attempts}/{max_escape_attempts})")
-                                        clicked = True
-                                        break
-                                if clicked:
-                                    break
+                            if action == ESCAPE:
+                                escape_attempts += 1  # Increment before clicking
+                                if await self.click_button(msg, ACTION_BUTTONS[ESCAPE]):
+                                    logger.info("Clicking escape button (attempt %s/%s)", escape_attempts, max_escape_attempts)
                         
-                        # Priority 2: Use potion if HP < 100 (and we're not escaping)
-                        if has_potions and current_hp and current_hp < 100 and not clicked:
-                            for row_idx, row in enumerate(msg.buttons):
-                                for btn_idx, btn in enumerate(row):
-                                    if btn.text and "Зілля" in btn.text:
-                                        await self.human_delay()
-                                        await msg.click(row_idx, btn_idx)
-                                        logger.info(f"Clicked potions button (HP: {current_hp})")
-                                        clicked = True
-                                        
-                                        # Wait and select first potion
-                                        await asyncio.sleep(3)
-                                        potion_msgs = await self.client.get_messages(self.game_chat, limit=2)
-                                        for pmsg in potion_msgs:
-                                            if pmsg.text and "Оберіть зілля" in pmsg.text and pmsg.buttons:
-                                                await self.human_delay()
-                                                await pmsg.click(0, 0)
+                            elif action == POTION:
+                                if await self.click_button(msg, ACTION_BUTTONS[POTION]):
+                                    logger.info("Clicked potions button (HP: %s)", current_hp)
+                                
+                                    # Wait and select first potion, counting what is left
+                                    await tracing.sleep(3)
+                                    potion_msgs = await self.client.get_messages(self.game_chat, limit=2)
+                                    for pmsg in potion_msgs:
+                                        potions = self.parser.potion_menu(pmsg)
+                                        if (potions is not None and pmsg.buttons
+                                                and self.action_ledger.allow(pmsg, 'select_potion')):
+                                            self.potion_stock.observe_menu(potions)
+                                            await self.human_delay(humanize.BATTLE_CLICK)
+                                            await self.client.click(pmsg, 0, 0)
+                                            if potions:
+                                                self.potion_stock.used()
                                                 logger.info("Selected first potion")
-                                                break
-                                        break
-                                if clicked:
-                                    break
+                                            else:
+                                                logger.warning("No potions left - back to battle")
+                                            break
                         
-                        # Priority 3: Use skills if available
-                        elif has_skills and not clicked:
-                            for row_idx, row in enumerate(msg.buttons):
-                                for btn_idx, btn in enumerate(row):
-                                    if btn.text and "Прийоми" in btn.text:
-                                        await self.human_delay()
-                                        await msg.click(row_idx, btn_idx)
-                                        logger.info("Clicked skills button")
-                                        clicked = True
-                                        
-                                        # Wait and select last skill (button before the "back" button)
-                                        await asyncio.sleep(3)
-                                        skill_msgs = await self.client.get_messages(self.game_chat, limit=2)
-                                        for smsg in skill_msgs:
-                                            if smsg.text and "Оберіть прийом" in smsg.text and smsg.buttons:
-                                                # Skills are placed vertically, last button is "back"
-                                                # So we need to click the button before the last one
-                                                num_buttons = len(smsg.buttons)
-                                                if num_buttons >= 2:
-                                                    # Click the second-to-last button (last skill)
-                                                    skill_index = num_buttons - 2
-                                                    await self.human_delay()
-                                                    await smsg.click(skill_index, 0)
-                                                    logger.info(f"Selected last skill (button {skill_index})")
-                                                else:
-                                                    # Fallback: if only 1 button, click it
-                                                    await self.human_delay()
-                                                    await smsg.click(0, 0)
-                                                    logger.info("Selected only available skill")
-                                                break
-                                        break
-                                if clicked:
-                                    break
+                            elif action == SKILL:
+                                if await self.click_button(msg, ACTION_BUTTONS[SKILL]):
+                                    logger.info("Clicked skills button")
+                                
+                                    # Wait and select last skill (button before the "back" button)
+                                    await tracing.sleep(3)
+                                    skill_msgs = await self.client.get_messages(self.game_chat, limit=2)
+                                    for smsg in skill_msgs:
+                                        if (smsg.text and "Оберіть прийом" in smsg.text and smsg.buttons
+                                                and self.action_ledger.allow(smsg, 'select_skill')):
+                                            # Skills are placed vertically, last button is "back"
+                                            # So we need to click the button before the last one
+                                            num_buttons = len(smsg.buttons)
+                                            if num_buttons >= 2:
+                                                # Click the second-to-last button (last skill)
+                                                skill_index = num_buttons - 2
+                                                await self.human_delay(humanize.BATTLE_CLICK)
+                                                await self.client.click(smsg, skill_index, 0)
+                                                logger.info("Selected last skill (button %s)", skill_index)
+                                            else:
+                                                # Fallback: if only 1 button, click it
+                                                await self.human_delay(humanize.BATTLE_CLICK)
+                                                await self.client.click(smsg, 0, 0)
+                                                logger.info("Selected only available skill")
+                                            break
                         
-                        # Priority 4: Otherwise attack
-                        if not clicked:
-                            for row_idx, row in enumerate(msg.buttons):
-                                for btn_idx, btn in enumerate(row):
-                                    if btn.text and "Атака" in btn.text:
-                                        await self.human_delay()
-                                        await msg.click(row_idx, btn_idx)
-                                        logger.info(f"Clicked attack (round {rounds}, HP: {current_hp})")
-                                        clicked = True
-                                        break
-                                if clicked:
-                                    break
+                            elif action == ATTACK:
+                                if await self.click_button(msg, ACTION_BUTTONS[ATTACK]):
+                                    logger.info("Clicked attack (round %s, HP: %s)", rounds, current_hp)
                         
-                        break  # Only process one battle message
+                            if action:
+                                battle.add_round(rounds, current_hp, action, sorted(state.options))
+                        
+                            break  # Only process one battle message
         
         if should_escape:
-            logger.info(f"Battle ended after {rounds} rounds")
-        await asyncio.sleep(3)
+            logger.info("Battle ended after %s rounds", rounds)
+        
+        suppressed = self.action_ledger.reset()
+        if suppressed:
+            logger.info("Suppressed %s redundant clicks on unchanged battle messages", suppressed)
+        
+        metrics.BATTLES.inc(outcome=battle.outcome)
+        self.economy.add_battle(battle.xp, battle.gold)
+        metrics.BATTLE_ROUNDS.observe(len(battle.rounds))
+        metrics.ESCAPE_ATTEMPTS.inc(battle.escape_attempts)
+        
+        # 📝 Record battle telemetry (queued, written in background)
+        if self.battle_store:
+            self.battle_store.record(battle)
+            await self.escape_advisor.battle_finished(self.battle_store, self.level)
+        
+        await tracing.sleep(3)
+    
+    async def on_idle(self):
+        """Short pause between exploration cycles"""
+        if self.idle_delay:
+            await tracing.sleep(self.idle_delay, "idle")
+        self.economy.log_if_due()
+        logger.info("=" * 50)  # Separator for new exploration cycle
+        return bot_fsm.READY
+    
+    async def on_checking_profile(self):
+        """Check profile and decide what the character can do now"""
+        await self.check_character_status()
+        
+        # ❤️ Wait for full HP if needed
+        if self.current_hp < self.max_hp:
+            return bot_fsm.HP_LOW
+        
+        # ⚡ Check if we have energy
+        if self.current_energy < 1:
+            return bot_fsm.NO_ENERGY
+        
+        # 🚫 Check exploration restrictions (time window + energy limit)
+        if not self.energy_tracker.can_explore_now():
+            return bot_fsm.RESTRICTED
+        
+        return bot_fsm.CAN_EXPLORE
+    
+    async def on_waiting_hp(self):
+        if self.potion_stock.restock_due(self.hp_regen_minutes, self.gold):
+            # 🛒 Shop while HP regenerates - the wait timer is already running during the trip
+            self.timer(self.hp_wait_seconds())
+            await self.restock_potions()
+        await self.wait_for_full_hp()
+        self.wait_until = None
+        return bot_fsm.WAITED
+    
+    async def on_waiting_energy(self):
+        await self.wait_for_energy()
+        self.wait_until = None
+        return bot_fsm.WAITED
+    
+    async def on_outside_window(self):
+        """Wait for the exploration window and/or daily energy reset"""
+        if not self.energy_tracker.can_use_energy():
+            time_until_reset = self.energy_tracker.get_time_until_reset()
+            logger.warning(f"Daily energy limit reached ({self.energy_tracker.daily_limit})! "
+                           f"Waiting {time_until_reset} until reset at 12:00")
+            
+            # Wait until energy resets (check every 5 minutes)
+            while not self.energy_tracker.can_use_energy():
+                await tracing.sleep(300)  # 5 minutes
+                logger.info(f"Still waiting for energy reset... {self.energy_tracker.get_time_until_reset()} remaining")
+            
+            logger.info("Daily energy limit reset! Now waiting for exploration window...")
+        
+        if not self.energy_tracker.is_in_exploration_window():
+            time_until_window = self.energy_tracker.get_time_until_exploration_window()
+            start_hour = self.energy_tracker.exploration_start_hour
+            logger.warning(f"Outside exploration window (starts at {start_hour:02d}:00)! "
+                           f"Waiting {time_until_window} until exploration time")
+            
+            # Wait until exploration window opens (check every 10 minutes)
+            while not self.energy_tracker.is_in_exploration_window():
+                await tracing.sleep(600)  # 10 minutes
+                time_remaining = self.energy_tracker.get_time_until_exploration_window()
+                logger.info(f"Still waiting for exploration window... {time_remaining} remaining")
+            
+            logger.info(f"Exploration window opened! ({start_hour:02d}:00 - 12:00)")
+        
+        logger.info("Ready to explore!")
+        return bot_fsm.WAITED
+    
+    async def on_exploring(self):
+        """Send explore and spend one energy"""
+        self.explore_sent = await self.explore()
+        
+        # Track energy usage
+        self.energy_tracker.use_energy(1)
+        self.economy.use_energy(1)
+        return bot_fsm.EXPLORED
+    
+    async def on_in_encounter(self):
+        """Read the explore reply and run the encounter handler matching it (see modules/encounters.py)"""
+        messages = await self.client.get_messages(self.game_chat, limit=2)
+        metrics.observe_reply('explore', self.explore_sent, messages)
+        
+        event = await encounters.registry.dispatch(self, messages)
+        self.idle_delay = 1 if event == bot_fsm.EVENT_HANDLED else 2  # Quick continuation after action
+        return event
+    
+    async def on_in_battle(self):
+        await self.handle_battle()
+        self.battle_msg_id = None
+        self.idle_delay = 1  # Quick continuation after action
+        return bot_fsm.BATTLE_OVER
+    
+    def battle_state(self, msg, round_number, mob="Unknown", should_escape=False, escape_attempts=0):
+        """BattleState of a battle message for this round (message part parsed once per edit)"""
+        state = self.parser.cached(msg, 'battle', lambda m: parse_battle_state(m.text, m.buttons, 0))
+        if state is None:
+            return None
+        return replace(state, round=round_number, mob=mob, should_escape=should_escape,
+                       escape_attempts=escape_attempts)
+    
+    def on_reconnect(self, missed):
+        """Check game chat messages missed while disconnected (oldest first)"""
+        if not missed:
+            return
+        latest = missed[-1]
+        if self.fsm.state == bot_fsm.IN_BATTLE or not latest.text:
+            return  # handle_battle re-reads the latest messages itself
+        
+        # ⚔️ A battle prompt arrived while we were offline
+        state = self.battle_state(latest, 0) if latest.buttons else None
+        if state is not None or "З'явився" in latest.text:
+            for msg in reversed(missed):
+                if msg.text and "З'явився" in msg.text:
+                    self.battle_msg_id = msg.id
+                    break
+            logger.warning("Missed battle prompt while disconnected - switching to battle")
+            self.pending_state = bot_fsm.IN_BATTLE
+    
+    async def apply_config(self, changes):
+        """Rebuild what was derived from config values that were just reloaded"""
+        config = self.config
+        if 'ESCAPE_MOBS_FROM_FILE' in changes:
+            self.escape_advisor.set_manual_escape(config.ESCAPE_MOBS + config.ESCAPE_MOBS_FROM_FILE)
+        if any(name.startswith('BATTLE_') for name in changes):
+            self.battle_policy = DefaultPolicy(config.BATTLE_POTION_THRESHOLD, config.BATTLE_USE_SKILLS,
+                                               config.BATTLE_MAX_ESCAPE_ATTEMPTS)
+        if 'ACTION_RETRY_SECONDS' in changes:
+            self.action_ledger.retry_after = config.ACTION_RETRY_SECONDS
+        self.energy_tracker.daily_limit = config.DAILY_ENERGY_LIMIT
+        self.energy_tracker.exploration_start_hour = config.EXPLORATION_START_HOUR
+        if any(name.startswith('ESCAPE_') and name != 'ESCAPE_MOBS_FROM_FILE' for name in changes):
+            await self.escape_advisor.refresh(self.battle_store, self.level)  # Decisions use the new thresholds
+    
+    def at_safe_point(self):
+        """True when the loop can be interrupted without abandoning an encounter, battle or shop trip"""
+        return self.fsm.state in bot_fsm.INTERRUPTIBLE_STATES and not self.shopping
+    
+    def log_time_to_first_action(self, state):
+        """Startup cost: from process start until the bot gets to real work"""
+        self.first_action_logged = True
+        seconds = time.monotonic() - self.started_at
+        bot_fsm.TIME_TO_FIRST_ACTION.set(seconds)
+        logger.info(f"Time to first action: {seconds:.1f}s ({state})")
     
     async def main_loop(self):
-        """Main bot loop"""
+        """Main bot loop - runs the state machine until stopped"""
         logger.info("=== MAIN LOOP STARTED ===")
+        handlers = {state: getattr(self, f"on_{state}") for state in bot_fsm.STATES}
         
         while self.is_running:
+            if self.pending_state:
+                self.fsm.reset(self.pending_state)
+                self.pending_state = None
+            state = self.fsm.state
+            if self.at_safe_point():
+                changes = config_reload.apply_pending()
+                if changes:
+                    await self.apply_config(changes)
+            if not self.first_action_logged and state not in (bot_fsm.IDLE, bot_fsm.CHECKING_PROFILE):
+                self.log_time_to_first_action(state)
             try:
-                logger.info("=" * 50)  # Separator for new exploration cycle
-                
-                # 🧍 Check character status
-                await self.check_character_status()
-                
-                # ❤️ Wait for full HP if needed
-                if self.current_hp < self.max_hp:
-                    await self.wait_for_full_hp()
-                    continue
-                
-                # ⚡ Check if we have energy
-                if self.current_energy < 1:
-                    await self.wait_for_energy()
+                with tracing.span(state):
+                    event = await handlers[state]()
+                self.fsm.fire(event)
+                self.save_checkpoint()
+            
+            except Exception as e:
+                if isinstance(e, ConnectionError) and self.connection:
+                    # 🔌 Not the state's fault - wait for ConnectionManager and retry the same state
+                    logger.warning(f"Disconnected in state {state}: {e} - waiting for reconnect")
+                    await tracing.sleep(1)  # Let the manager notice the disconnect
+                    await self.connection.wait_connected()
                     continue
                 
-                # 🚫 Check exploration restrictions (time window + energy limit)
-                if not self.energy_tracker.can_explore_now():
-                    # Check what's preventing exploration
-                    if not self.energy_tracker.is_in_exploration_window():
-                        time_until_window = self.energy_tracker.get_time_until_exploration_window()
-                        start_hour = self.energy_tracker.exploration_start_hour
-                        logger.warning(f"Outside exploration window (starts at {start_hour:02d}:00)! "
-                                     f"Waiting {time_until_window} until exploration time")
-                        
-                        # Wait until exploration window opens (check every 10 minutes)
-                        while not self.energy_tracker.is_in_exploration_window():
-                            await asyncio.sleep(600)  # 10 minutes
-                            time_remaining = self.energy_tracker.get_time_until_exploration_window()
-                            logger.info(f"Still waiting for exploration window... {time_remaining} remaining")
-                        
-                        logger.info(f"Exploration window opened! ({start_hour:02d}:00 - 12:00)")
-                        continue
-                    
-                    elif not self.energy_tracker.can_use_energy():
-                        remaining_energy = self.energy_tracker.get_remaining_energy()
-                        time_until_reset = self.energy_tracker.get_time_until_reset()
-                        logger.warning(f"Daily energy limit reached ({self.energy_tracker.daily_limit})! "
-                                     f"Waiting {time_until_reset} until reset at 12:00")
-                        
-                        # Wait until energy resets (check every 5 minutes)
-                        while not self.energy_tracker.can_use_energy():
-                            await asyncio.sleep(300)  # 5 minutes
-                            logger.info(f"Still waiting for energy reset... {self.energy_tracker.get_time_until_reset()} remaining")
-                        
-                        logger.info("Daily energy limit reset! Now waiting for exploration window...")
-                        
-                        # After reset, check if we need to wait for exploration window
-                        if not self.energy_tracker.is_in_exploration_window():
-                            time_until_window = self.energy_tracker.get_time_until_exploration_window()
-                            start_hour = self.energy_tracker.exploration_start_hour
-                            logger.info(f"Waiting {time_until_window} until exploration window opens at {start_hour:02d}:00")
-                            
-                            while not self.energy_tracker.is_in_exploration_window():
-                                await asyncio.sleep(600)  # 10 minutes
-                                time_remaining = self.energy_tracker.get_time_until_exploration_window()
-                                logger.info(f"Still waiting for exploration window... {time_remaining} remaining")
-                        
-                        logger.info("Ready to explore!")
-                        continue
-                
-                # 🗺️ Explore
-                await self.explore()
-                
-                # Track energy usage
-                self.energy_tracker.use_energy(1)
-                
-                # Check response
-                messages = await self.client.get_messages(self.game_chat, limit=2)
-                
-                battle_started = False
-                camp_found = False
-                
-                for msg in messages:
-                    if msg.text:
-                        # ⚔️ Check if battle started
-                        if "З'явився" in msg.text or (msg.buttons and any("Атака" in btn.text for row in msg.buttons for btn in row if btn.text)):
-                            battle_started = True
-                            break
-                        # ⛺ Check for camp opportunity
-                        elif ("покинутий табір" in msg.text or "табір" in msg.text.lower()) and msg.buttons:
-                            logger.info(f"Camp found: {msg.text[:80]}...")
-                            # Click the first available button (usually "Дослідити")
-                            await self.human_delay()
-                            await msg.click(0, 0)
-                            logger.info("Clicked camp exploration button")
-                            camp_found = True
-                            await asyncio.sleep(3)
-                            break
-                        # 👋 Check for player greeting
-                        elif ("який подорожує неподалік" in msg.text or "ви бачите" in msg.text.lower()) and msg.buttons:
-                            logger.info(f"Other player found: {msg.text[:80]}...")
-                            # Click the first available button (usually "Привітати")
-                            await self.human_delay()
-                            await msg.click(0, 0)
-                            logger.info("Clicked player greeting button")
-                            camp_found = True
-                            await asyncio.sleep(3)
-                            break
-                        # 🪤 Check for guild trap
-                        elif ("Ви знайшли стару пастку" in msg.text or "полагодити її?" in msg.text.lower()) and msg.buttons:
-                            logger.info(f"Found oportunity to create a trap: {msg.text[:80]}...")
-                            # Click the first available button (usually "Встановити пастку")
-                            await self.human_delay()
-                            await msg.click(0, 0)
-                            logger.info("Clicked trap creation button, trap installed")
-                            camp_found = True
-                            await asyncio.sleep(3)
-                            break
-                        # ❌ Check if no energy
-                        elif "Недостатньо енергії" in msg.text:
-                            logger.info("Out of energy")
-                            self.current_energy = 0
-                            break
-                
-                # ⚔️ Handle battle if started (either from exploration or camp)
-                if battle_started:
-                    await self.handle_battle()
-                elif camp_found:
-                    logger.info("Camp exploration completed")
-                
-                # 🕑 Small delay before next iteration (shorter if we found something interesting)
-                if battle_started or camp_found:
-                    await asyncio.sleep(1)  # Quick continuation after action
+                errors = self.fsm.failed()
+                if errors >= self.MAX_STATE_ERRORS:
+                    logger.error(f"Error in state {state} ({errors} in a row): {e} - restarting from profile check")
+                    self.fsm.reset(bot_fsm.CHECKING_PROFILE)
                 else:
-                    await asyncio.sleep(2)  # Normal delay
-                
-            except Exception as e:
-                logger.error(f"Error in main loop: {e}")
-                await asyncio.sleep(10)
+                    logger.error(f"Error in state {state}: {e} - resuming in 10s")
+                await tracing.sleep(10)
     
     async def stop(self):
         """Stop the bot"""
         self.is_running = False
+        logger.info(f"Time per state:\n{self.fsm.summary()}")
+        self.economy.log_summary()
+        humanize.get_humanizer().log_summary()
+        handled = encounters.registry.summary()
+        if handled:
+            logger.info(f"Encounters:\n{handled}")
+        self.client.log_summary()
+        self.save_checkpoint()
+        if self.checkpoint:
+            await self.checkpoint.close()
+        if self.battle_store:
+            await self.battle_store.close()
         logger.info("Bot stopped")
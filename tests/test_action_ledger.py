@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from utils import action_ledger
+from utils.action_ledger import ActionLedger
+
+
+def message(msg_id=1, edit_date=None):
+    return SimpleNamespace(id=msg_id, edit_date=edit_date)
+
+
+def test_repeat_on_unchanged_message_is_suppressed(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(action_ledger.time, 'monotonic', lambda: now[0])
+    ledger = ActionLedger(retry_after=10)
+
+    assert ledger.allow(message(), 'attack')
+    assert not ledger.allow(message(), 'attack')
+    assert ledger.allow(message(), 'escape')  # Another action on the same state
+    assert ledger.allow(message(edit_date=5), 'attack')  # The game edited the message
+    assert ledger.allow(message(msg_id=2), 'attack')
+    now[0] += 10
+    assert ledger.allow(message(), 'attack')  # Deliberate retry once retry_after passed
+    assert ledger.suppressed == 1
+
+
+def test_reset_starts_a_new_battle():
+    ledger = ActionLedger(retry_after=10)
+    ledger.allow(message(), 'attack')
+    ledger.allow(message(), 'attack')
+    assert ledger.reset() == 1
+    assert ledger.suppressed == 0 and ledger.allow(message(), 'attack')
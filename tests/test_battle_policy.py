@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import pytest
+
+from modules.battle_policy import (ATTACK, ESCAPE, POTION, SKILL, BattlePolicy, BattleState, DefaultPolicy,
+                                   PolicyRunner, parse_battle_state, policy_grid)
+
+ALL_OPTIONS = frozenset({'attack', 'skills', 'potions', 'escape'})
+
+
+def state(hp=300, options=ALL_OPTIONS, should_escape=False, escape_attempts=0):
+    return BattleState(1, hp, 300, options, "Вовк", should_escape, escape_attempts)
+
+
+def test_base_policy_is_abstract():
+    with pytest.raises(TypeError):
+        BattlePolicy()
+
+
+@pytest.mark.parametrize('battle_state, action', [
+    (state(), SKILL),
+    (state(hp=80), POTION),
+    (state(hp=80, options=frozenset({'attack', 'escape'})), ATTACK),
+    (state(should_escape=True), ESCAPE),
+    (state(should_escape=True, escape_attempts=5), SKILL),
+    (state(options=frozenset({'escape'})), None),
+])
+def test_default_policy_decide(battle_state, action):
+    assert DefaultPolicy(potion_threshold=100).decide(battle_state) == action
+
+
+def test_parse_battle_state():
+    buttons = [[SimpleNamespace(text="⚔️ Атака"), SimpleNamespace(text="✨ Прийоми")],
+               [SimpleNamespace(text="🧪 Зілля"), SimpleNamespace(text="🏃 Втеча")]]
+    parsed = parse_battle_state("👤 Ви (120/300)\nВовк (40/90)", buttons, 3)
+    assert parsed.hp == 120 and parsed.max_hp == 300 and parsed.round == 3
+    assert parsed.options == ALL_OPTIONS
+    assert parse_battle_state("Бій закінчено", [["Повернутися"]], 4) is None
+
+
+def test_run_many_ranks_only_by_score():
+    runner = PolicyRunner([[(state(), SKILL), (state(hp=80), POTION)]])
+    policies = policy_grid(potion_thresholds=(0, 100), use_skills=(True,), max_escape_attempts=(5,))
+
+    unscored = runner.run_many(policies)
+    assert [r['agreement'] for r in unscored] == [0.5, 1.0]  # Policy order, not best agreement first
+
+    def potion_score(battle_state, action, recorded):
+        return 1.0 if action == POTION else 0.0
+
+    scored = runner.run_many(policies, potion_score)
+    assert scored[0]['policy'] == policies[1].name and scored[0]['score'] == 1.0
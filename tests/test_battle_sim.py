@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from modules.battle_policy import ATTACK, ESCAPE, POTION, BattleState, DefaultPolicy
+from modules.battle_sim import MAX_ROUNDS, MobModel, SimSettings, fit_models, simulate
+from utils.battle_store import ESCAPED, WON, BattleRecorder, BattleStore
+
+ALL_OPTIONS = frozenset({'attack', 'skills', 'potions', 'escape'})
+
+
+def battle(outcome, rounds):
+    recorder = BattleRecorder("Вовк", 5, hp_start=100, max_hp=100)
+    for number, (hp, action) in enumerate(rounds, 1):
+        recorder.add_round(number, hp, action)
+    recorder.finish(outcome, {'experience': 10 if outcome == WON else 0})
+    return recorder
+
+
+def test_fit_models(tmp_path):
+    store = BattleStore(tmp_path / 'battles.db')
+    store.write_batch([battle(WON, [(100, 'attack'), (90, 'skill'), (80, 'attack')]) for _ in range(3)] + [
+        battle(WON, [(100, 'attack'), (80, 'potion'), (90, 'attack')]),
+        battle(ESCAPED, [(100, 'escape'), (90, 'escape'), (80, 'escape')]),
+    ])
+    [model] = fit_models(store).values()
+
+    assert model.mob == "Вовк" and model.battles == 5
+    assert sorted(model.damage) == [10] * 8 + [20]
+    assert sorted(model.kill_units) == [2, 3.5, 3.5, 3.5]  # attacks + 1.5 per skill in won battles
+    assert model.escape_chance == pytest.approx(1 / 3)
+    assert model.potion_heal == pytest.approx(10 + 100 / 9)  # HP gained plus the mean hit taken that round
+    assert fit_models(store, min_battles=6) == {}
+
+
+def model(damage=(30.0,), kill_units=(6.0,), escape_chance=0.0, potion_heal=50.0):
+    return MobModel("Вовк", 10, np.asarray(damage), np.asarray(kill_units), escape_chance, potion_heal, 10.0, 0.0)
+
+
+def policy_battle(model, settings, max_hp, skill_power=1.5):
+    """One battle against a constant model, actions chosen by DefaultPolicy"""
+    policy = DefaultPolicy(settings.potion_threshold, settings.use_skills, settings.max_escape_attempts)
+    hp, mob_left, escapes = float(max_hp), model.kill_units[0], 0
+    for round_number in range(1, MAX_ROUNDS + 1):
+        action = policy.decide(BattleState(round_number, hp, max_hp, ALL_OPTIONS, model.mob,
+                                           settings.should_escape, escapes))
+        if action == ESCAPE:
+            escapes += 1
+            if model.escape_chance >= 1:
+                return 'escaped', round_number, escapes, max_hp - hp
+        elif action == POTION:
+            hp = min(hp + model.potion_heal, max_hp)
+        else:
+            mob_left -= 1.0 if action == ATTACK else skill_power
+            if mob_left <= 0:
+                return 'won', round_number, escapes, max_hp - hp
+        hp -= model.damage[0]
+        if hp <= 0:
+            return 'lost', round_number, escapes, max_hp
+    return 'timeout', MAX_ROUNDS, escapes, max_hp - hp
+
+
+@pytest.mark.parametrize('mob_model, settings', [
+    (model(), SimSettings(potion_threshold=0, use_skills=True)),
+    (model(), SimSettings(potion_threshold=0, use_skills=False)),
+    (model(), SimSettings(potion_threshold=50, use_skills=False)),
+    (model(damage=(45.0,), kill_units=(9.0,)), SimSettings(potion_threshold=80, use_skills=True)),
+    (model(), SimSettings(should_escape=True, max_escape_attempts=2)),
+    (model(escape_chance=1.0), SimSettings(should_escape=True, max_escape_attempts=2)),
+])
+def test_simulate_follows_default_policy(mob_model, settings):
+    result = simulate(mob_model, settings, 100, n=4, rng=np.random.default_rng(1))
+    outcomes = [name for name in ('won', 'lost', 'escaped') if result[name][0]] or ['timeout']
+    simulated = (outcomes[0], int(result['rounds'][0]), int(result['escapes_used'][0]),
+                 float(result['hp_loss'][0]))
+    assert simulated == policy_battle(mob_model, settings, 100)
+
+
+def test_simulate_is_deterministic_for_a_seed():
+    mob_model = model(damage=(5.0, 10.0, 40.0), kill_units=(3.0, 6.0, 12.0), escape_chance=0.4)
+    settings = SimSettings(potion_threshold=50, should_escape=True, max_escape_attempts=1)
+    first = simulate(mob_model, settings, 100, n=1000, rng=np.random.default_rng(7))
+    second = simulate(mob_model, settings, 100, n=1000, rng=np.random.default_rng(7))
+    assert all(np.array_equal(first[name], second[name]) for name in first)
+    assert not (first['won'] & first['lost']).any() and first['won'].any() and first['escaped'].any()
@@ -0,0 +1,45 @@
+import asyncio
+
+from utils.battle_store import LOST, WON, BattleRecorder, BattleStore
+
+
+def battle(mob, outcome, hp_end=50):
+    recorder = BattleRecorder(mob, 5, hp_start=100, max_hp=100)
+    recorder.add_round(1, 80, 'attack', ['attack', 'escape'])
+    recorder.add_round(2, hp_end, 'skill')
+    recorder.finish(outcome, {'experience': 10, 'gold': 3})
+    return recorder
+
+
+def test_reads_use_their_own_connection(tmp_path):
+    store = BattleStore(tmp_path / 'battles.db')
+    store.write_batch([battle("Вовк", WON)])
+    assert store.mob_stats()[0]['battles'] == 1
+    assert store.read_conn is not None and store.read_conn is not store.conn
+
+
+def test_reads_alongside_background_writes(tmp_path):
+    store = BattleStore(tmp_path / 'battles.db', batch_size=5, flush_interval=0.01)
+
+    async def run():
+        await store.start()
+        loop = asyncio.get_running_loop()
+        for i in range(200):
+            store.record(battle("Вовк", WON if i % 4 else LOST))
+            if i % 20 == 0:
+                # Same pattern as EscapeAdvisor.refresh: stats read in the default executor
+                await loop.run_in_executor(None, store.mob_stats, 5)
+        await store.close()
+
+    asyncio.run(run())
+    [row] = BattleStore(tmp_path / 'battles.db').mob_stats(level=5)
+    assert row['battles'] == 200 and row['defeats'] == 50
+
+
+def test_iter_rounds(tmp_path):
+    store = BattleStore(tmp_path / 'battles.db')
+    store.write_batch([battle("Вовк", WON), battle("Слиз", LOST)])
+    rounds = list(store.iter_rounds(level=5))
+    assert [(r['battle_id'], r['round']) for r in rounds] == [(1, 1), (1, 2), (2, 1), (2, 2)]
+    assert rounds[0]['options'] == ['attack', 'escape'] and rounds[1]['options'] == []
+    assert rounds[3]['outcome'] == LOST
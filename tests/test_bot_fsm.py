@@ -0,0 +1,54 @@
+import pytest
+
+from modules import bot_fsm
+from modules.bot_fsm import (BATTLE, BATTLE_OVER, CAN_EXPLORE, CHECKING_PROFILE, EXPLORED, EXPLORING, HP_LOW, IDLE,
+                             IN_BATTLE, IN_ENCOUNTER, READY, STATES, TRANSITIONS, WAITED, WAITING_HP,
+                             InvalidTransition, StateMachine)
+from modules.game_bot import GameBot
+
+
+def test_transition_table_is_closed():
+    for (state, _), next_state in TRANSITIONS.items():
+        assert state in STATES and next_state in STATES
+    # Every state can be left, and GameBot has a handler for each
+    assert {state for state, _ in TRANSITIONS} == set(STATES)
+    for state in STATES:
+        assert callable(getattr(GameBot, f"on_{state}"))
+
+
+def test_battle_cycle():
+    fsm = StateMachine()
+    path = [fsm.fire(event) for event in (READY, CAN_EXPLORE, EXPLORED, BATTLE, BATTLE_OVER, READY, HP_LOW, WAITED)]
+    assert path == [CHECKING_PROFILE, EXPLORING, IN_ENCOUNTER, IN_BATTLE, IDLE, CHECKING_PROFILE, WAITING_HP,
+                    CHECKING_PROFILE]
+    assert fsm.totals[IDLE][0] == 2 and fsm.totals[CHECKING_PROFILE][0] == 2
+
+
+def test_invalid_event_keeps_state():
+    fsm = StateMachine(IN_BATTLE)
+    with pytest.raises(InvalidTransition):
+        fsm.fire(READY)
+    assert fsm.state == IN_BATTLE
+
+
+def test_errors_count_until_the_state_moves_on():
+    fsm = StateMachine(CHECKING_PROFILE)
+    assert fsm.failed() == 1 and fsm.failed() == 2
+    fsm.fire(HP_LOW)
+    assert fsm.errors == 0
+    fsm.failed()
+    fsm.reset(CHECKING_PROFILE)
+    assert fsm.errors == 0 and fsm.state == CHECKING_PROFILE
+
+
+def test_on_leave_reports_each_state(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(bot_fsm.time, 'monotonic', lambda: now[0])
+    left = []
+    fsm = StateMachine(on_leave=lambda state, seconds: left.append((state, seconds)))
+    now[0] = 2.0
+    fsm.fire(READY)
+    now[0] = 5.0
+    fsm.reset(WAITING_HP)
+    assert left == [(IDLE, 2.0), (CHECKING_PROFILE, 3.0)]
+    assert "idle" in fsm.summary() and "checking_profile" in fsm.summary()
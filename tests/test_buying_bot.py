@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+from buying_bot import BuyingBot
+from utils import tracing
+
+
+def shop_bot(gold, succeed):
+    """BuyingBot with the shop screens stubbed out, the purchase after the first succeed ones fails"""
+    client = SimpleNamespace(clicks=0, last_seen_id=0)
+
+    async def click(*args):
+        client.clicks += 1
+
+    client.click = click
+    bot = BuyingBot(client, SimpleNamespace(PARSE_CACHE_SIZE=16, SHOP_CATALOG_TTL=600), "Зілля", 3)
+    bot.client = client
+    bot.catalog.update(1, {"Зілля здоров'я": {'row': 0, 'button': 0, 'price': 10}})
+    bot.gold = gold
+    bot.is_running = True
+    results = iter([True] * succeed + [False])
+
+    async def select_item_to_buy(item_name):
+        return True
+
+    async def find_buying_message(name):
+        return SimpleNamespace(), 0, 0
+
+    async def check_purchase_success(clicked_after):
+        return next(results)
+
+    bot.select_item_to_buy = select_item_to_buy
+    bot.find_buying_message = find_buying_message
+    bot.check_purchase_success = check_purchase_success
+    bot.parser = SimpleNamespace(item_price=lambda message: None)
+    return bot
+
+
+def test_buy_item_spends_known_gold():
+    bot = shop_bot(gold=100, succeed=3)
+    assert asyncio.run(bot.buy_item("Зілля", 3)) == 3
+    assert bot.gold == 70
+
+
+def test_failed_purchase_makes_gold_unknown():
+    bot = shop_bot(gold=100, succeed=1)
+    assert asyncio.run(bot.buy_item("Зілля", 3)) == 1
+    assert bot.gold is None
+    # Unknown gold does not limit the next item
+    assert bot.affordable_quantity("Інше", 5, 500, None) == 5
+
+
+def test_quantity_is_shopping_list_total():
+    bot = BuyingBot(SimpleNamespace(), SimpleNamespace(PARSE_CACHE_SIZE=16, SHOP_CATALOG_TTL=600),
+                    shopping_list=[("A", 2, None), ("B", 3, 40)])
+    assert bot.quantity == 5
+
+
+def button(text):
+    return SimpleNamespace(text=text)
+
+
+def chat_bot(messages, monkeypatch):
+    """BuyingBot reading a fixed chat history (newest first, like get_messages)"""
+    async def get_messages(chat, limit=None):
+        return messages[:limit]
+
+    async def sleep(seconds, name=None):
+        pass
+
+    monkeypatch.setattr(tracing, 'sleep', sleep)
+    client = SimpleNamespace(get_messages=get_messages)
+    bot = BuyingBot(client, SimpleNamespace(PARSE_CACHE_SIZE=16, SHOP_CATALOG_TTL=600))
+    bot.client = client
+    return bot
+
+
+def test_details_of_an_earlier_item_are_not_bought(monkeypatch):
+    buy = [[button("💰 Купити за 40")]]
+    boots = SimpleNamespace(id=5, text="Шкіряні Чоботи\nХарактеристики: ...\nЦіна: 40", buttons=buy)
+    bot = chat_bot([boots], monkeypatch)
+    bot.selected_after = 5  # Potion clicked after the boots details arrived
+    assert asyncio.run(bot.find_buying_message("Зілля здоров'я")) == (None, None, None)
+
+    details = SimpleNamespace(id=6, text="🧪 Характеристики: +100 HP\nЦіна: 40", buttons=buy)
+    bot = chat_bot([details, boots], monkeypatch)
+    bot.selected_after = 5
+    assert asyncio.run(bot.find_buying_message("Зілля здоров'я")) == (details, 0, 0)
+
+
+def test_purchase_checks_only_replies_after_the_click(monkeypatch):
+    old_success = SimpleNamespace(id=3, text="✅ Успішно придбано за 40 золота")
+    no_gold = SimpleNamespace(id=8, text="❌ Недостатньо золота")
+    bot = chat_bot([no_gold, old_success], monkeypatch)
+    assert not asyncio.run(bot.check_purchase_success(clicked_after=7))
+
+    new_success = SimpleNamespace(id=9, text="✅ Успішно придбано за 40 золота")
+    bot = chat_bot([new_success, no_gold], monkeypatch)
+    assert asyncio.run(bot.check_purchase_success(clicked_after=8)) and bot.purchases_made == 1
@@ -0,0 +1,46 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+from modules.game_bot import GameBot
+from utils.checkpoint import Checkpoint
+
+
+def waiting_bot(wait_until):
+    return SimpleNamespace(wait_until=wait_until, save_checkpoint=lambda: None)
+
+
+def test_timer_starts_new_wait():
+    bot = waiting_bot(None)
+    assert GameBot.timer(bot, 600) == 600
+    assert bot.wait_until > time.time() + 590
+
+
+def test_timer_continues_restored_wait():
+    bot = waiting_bot(time.time() + 120)
+    assert 110 < GameBot.timer(bot, 600) <= 120
+
+
+def test_timer_restored_deadline_passed():
+    bot = waiting_bot(time.time() - 30)
+    assert GameBot.timer(bot, 600) == 0
+
+
+def test_save_in_background_keeps_order(tmp_path):
+    checkpoint = Checkpoint(tmp_path / 'checkpoint.json')
+
+    async def run():
+        for state in ('idle', 'checking_profile', 'waiting_hp'):
+            checkpoint.save_in_background({'state': state})
+        await checkpoint.close()
+
+    asyncio.run(run())
+    assert json.loads((tmp_path / 'checkpoint.json').read_text())['state'] == 'waiting_hp'
+    assert checkpoint.load()['state'] == 'waiting_hp'
+
+
+def test_stale_checkpoint_ignored(tmp_path):
+    path = tmp_path / 'checkpoint.json'
+    path.write_text(json.dumps({'state': 'idle', 'saved_at': time.time() - 3600}))
+    assert Checkpoint(path, max_age=1800).load() is None
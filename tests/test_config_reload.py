@@ -0,0 +1,69 @@
+import os
+
+from config import RELOADABLE, Config, reloadable_setting
+from utils.config_reload import ConfigWatcher, validate
+
+
+def defaults(**overrides):
+    values = {name: reloadable_setting(name, {}) for name in RELOADABLE}
+    values.update(overrides)
+    return values
+
+
+def touch(path, text):
+    path.write_text(text, encoding='utf-8')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))  # mtime moves even within a tick
+
+
+def test_defaults_are_valid():
+    assert validate(defaults()) == []
+
+
+def test_validate_reports_each_problem():
+    problems = validate(defaults(HUMAN_DELAY_MENU_NAV=(1.0, 0.4, 2.0, 4.0), HUMAN_DELAY_BUDGET=0,
+                                 EXPLORATION_START_HOUR=24, POTION_RESTOCK_BELOW=10, POTION_RESTOCK_TARGET=5))
+    assert len(problems) == 4
+    assert any('HUMAN_DELAY_MENU_NAV' in problem for problem in problems)
+
+
+def watcher(tmp_path, env_text, mobs_text=""):
+    config = Config()
+    config.ESCAPE_MOBS_FILE = str(tmp_path / 'escape_mobs.txt')
+    touch(tmp_path / 'escape_mobs.txt', mobs_text)
+    touch(tmp_path / '.env', env_text)
+    return config, ConfigWatcher(config, env_path=str(tmp_path / '.env'))
+
+
+def test_changes_wait_for_apply(tmp_path):
+    config, config_watcher = watcher(tmp_path, "DAILY_ENERGY_LIMIT=0\n")
+    config.DAILY_ENERGY_LIMIT = 0
+    config.ESCAPE_MOBS_FROM_FILE = []
+    assert not config_watcher.check()  # Nothing changed on disk
+
+    touch(tmp_path / '.env', "DAILY_ENERGY_LIMIT=40\n")
+    touch(tmp_path / 'escape_mobs.txt', "Павук  # bites\n\nВедмідь\n")
+    assert config_watcher.check()
+    assert config.DAILY_ENERGY_LIMIT == 0  # Not applied before a safe point
+
+    changes = config_watcher.apply_pending()
+    assert changes['DAILY_ENERGY_LIMIT'] == (0, 40)
+    assert config.DAILY_ENERGY_LIMIT == 40 and config.ESCAPE_MOBS_FROM_FILE == ["Павук", "Ведмідь"]
+    assert config_watcher.apply_pending() == {}
+
+
+def test_invalid_change_is_ignored(tmp_path):
+    config, config_watcher = watcher(tmp_path, "")
+    config.DAILY_ENERGY_LIMIT = 0
+    for text in ("DAILY_ENERGY_LIMIT=lots\n", "DAILY_ENERGY_LIMIT=-5\n"):
+        touch(tmp_path / '.env', text)
+        config_watcher.check()
+        assert 'DAILY_ENERGY_LIMIT' not in config_watcher.pending
+    assert config.DAILY_ENERGY_LIMIT == 0
+
+
+def test_legacy_delay_range_bounds_unset_profiles():
+    env = {'HUMAN_DELAY_MIN': '2', 'HUMAN_DELAY_MAX': '4', 'HUMAN_DELAY_MENU_NAV': '1.2,0.4,0.5,4.0'}
+    assert reloadable_setting('HUMAN_DELAY_BATTLE_CLICK', env) == (3.0, 0.35, 2.0, 4.0)
+    assert reloadable_setting('HUMAN_DELAY_MENU_NAV', env) == (1.2, 0.4, 0.5, 4.0)
+    assert validate(defaults(**{name: reloadable_setting(name, env) for name in RELOADABLE})) == []
@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+from modules import bot_fsm
+from modules.game_bot import GameBot
+from utils import connection
+from utils.connection import ConnectionManager
+from utils.game_client import GameClient
+from utils.traffic_log import StandInClient
+
+CONFIG = SimpleNamespace(RECONNECT_MIN_DELAY=1, RECONNECT_MAX_DELAY=5, CATCHUP_LIMIT=50)
+
+
+class FlakyClient:
+    """Client whose connect() fails the given number of times"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.attempts = 0
+
+    async def connect(self):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise OSError("network unreachable")
+
+    def is_connected(self):
+        return self.attempts > self.failures
+
+
+def test_reconnect_backs_off_exponentially_up_to_max(monkeypatch):
+    slept = []
+
+    async def sleep(seconds):
+        slept.append(seconds)
+
+    monkeypatch.setattr(connection.asyncio, 'sleep', sleep)
+    monkeypatch.setattr(connection.random, 'uniform', lambda low, high: high)  # Largest jitter
+    client = FlakyClient(failures=5)
+    asyncio.run(ConnectionManager(client, CONFIG).reconnect())
+    assert client.attempts == 6
+    assert slept == [1.2, 2.4, 4.8, 6.0, 6.0]
+
+
+def test_catch_up_after_reconnect_switches_to_pending_battle():
+    bot = SimpleNamespace(fsm=SimpleNamespace(state=bot_fsm.WAITING_HP), battle_state=lambda msg, round_num: None,
+                          game_chat='game', pending_state=None, battle_msg_id=None)
+    missed = []
+
+    def on_reconnect(messages):
+        missed.extend(messages)
+        GameBot.on_reconnect(bot, messages)
+
+    bot.on_reconnect = on_reconnect
+
+    async def run():
+        client = StandInClient()
+        await client.start()
+        bot.client = GameClient(client)
+        bot.client.seen([client.add_message("⚡ Енергія: 10/10")])
+        manager = ConnectionManager(client, CONFIG)
+        manager.attach(bot)
+        watchdog = asyncio.create_task(manager.watch())
+        await asyncio.sleep(0)
+
+        await client.disconnect()  # Offline while the game sends an update and a battle prompt
+        client.add_message("❤️ Здоров'я відновлено")
+        prompt = client.add_message("🐺 З'явився Вовк (40/40)", [["⚔️ Атака", "🏃 Втеча"]])
+        async def caught_up():
+            while not missed or not manager.connected.is_set():
+                await asyncio.sleep(0)
+
+        await asyncio.wait_for(caught_up(), 1)
+        manager.stopping = True
+        watchdog.cancel()
+        return prompt
+
+    prompt = asyncio.run(run())
+    assert [msg.text for msg in missed] == ["❤️ Здоров'я відновлено", "🐺 З'явився Вовк (40/40)"]  # Oldest first
+    assert bot.pending_state == bot_fsm.IN_BATTLE and bot.battle_msg_id == prompt.id
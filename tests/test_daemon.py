@@ -0,0 +1,61 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from daemon import BUY, DISASSEMBLE, FAILED, RUNNING, Daemon, Job, validate_args
+from modules import bot_fsm
+from modules.game_bot import GameBot
+
+
+def test_validate_args_normalizes_buy():
+    args = validate_args(BUY, {'quantity': '5', 'list': [["Чоботи", 2], ["Шолом", "3", 40]]})
+    assert args == {'quantity': 5, 'list': [["Чоботи", 2, None], ["Шолом", 3, 40]]}
+
+
+@pytest.mark.parametrize('args', [
+    {'quantity': 'x'},
+    {'quantity': 0},
+    {'list': [["Чоботи"]]},
+    {'list': [["Чоботи", "two"]]},
+    {'item': 5},
+])
+def test_validate_args_rejects(args):
+    with pytest.raises(ValueError):
+        validate_args(BUY, args)
+
+
+def test_validate_args_passes_disassemble():
+    assert validate_args(DISASSEMBLE, None) == {}
+
+
+def test_run_job_fails_when_bot_cannot_be_created():
+    def create_bot(job):
+        raise KeyError('list')
+
+    daemon = SimpleNamespace(create_bot=create_bot)
+    job = Job(1, BUY, {})
+    asyncio.run(Daemon.run_job(daemon, job))
+    assert job.status == FAILED
+    assert 'list' in job.error and job.finished
+
+
+def test_no_preempt_during_restock_trip():
+    bot = SimpleNamespace(fsm=SimpleNamespace(state=bot_fsm.WAITING_HP), shopping=True)
+    bot.at_safe_point = lambda: GameBot.at_safe_point(bot)
+
+    async def run():
+        job = Job(1, 'auto')
+        job.status = RUNNING
+        job.bot = bot
+        job.task = asyncio.create_task(asyncio.sleep(10))
+        preempt = asyncio.create_task(Daemon.preempt(SimpleNamespace(), job))
+        await asyncio.sleep(0.7)
+        cancelled_while_shopping = job.task.cancelled() or job.task.cancelling()
+        bot.shopping = False  # Trip done, back to the HP wait
+        await preempt
+        await asyncio.sleep(0)
+        return cancelled_while_shopping, job.task.cancelled()
+
+    cancelled_while_shopping, cancelled = asyncio.run(run())
+    assert not cancelled_while_shopping and cancelled
@@ -0,0 +1,34 @@
+import pytest
+
+from utils.economy import ACTING, BATTLES, ENERGY, GOLD, WAITING, XP, RollingWindow
+
+
+def test_rates_over_covered_part_of_window():
+    window = RollingWindow(3600, buckets=60, now=0.0)
+    window.add(XP, 100, 600.0)
+    window.add(GOLD, 30, 900.0)
+    window.add(ENERGY, 4, 900.0)
+    stats = window.stats(1800.0)  # Half an hour since start
+    assert stats['xp_per_hour'] == pytest.approx(200)
+    assert stats['gold_per_hour'] == pytest.approx(60)
+    assert stats['xp_per_energy'] == 25
+
+
+def test_old_slots_expire():
+    window = RollingWindow(3600, buckets=60, now=0.0)
+    window.add(XP, 100, 30.0)
+    window.add(XP, 50, 1800.0)
+    assert window.stats(3599.0)['xp'] == 150
+    assert window.stats(3600.0 + 60)['xp'] == 50  # The first minute's slot fell out
+    assert window.stats(3 * 3600.0)['xp'] == 0  # Jump past the whole ring
+    assert window.stats(3 * 3600.0)['xp_per_hour'] == 0
+
+
+def test_waiting_share_and_battles():
+    window = RollingWindow(86400, now=0.0)
+    window.add(WAITING, 300, 300.0)
+    window.add(ACTING, 100, 400.0)
+    window.add(BATTLES, 1, 400.0)
+    stats = window.stats(400.0)
+    assert stats['waiting_share'] == 0.75 and stats['battles'] == 1
+    assert RollingWindow(3600, now=0.0).stats(0.0)['waiting_share'] == 0.0
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from modules import bot_fsm, encounters
+from modules.encounters import NO_ANSWER, EncounterRegistry, click_and_await
+from utils.game_client import GameClient
+from utils.traffic_log import StandInClient
+
+
+def message(msg_id, text):
+    return SimpleNamespace(id=msg_id, text=text)
+
+
+def registry_of(*handlers):
+    """Registry with (name, priority, word) handlers matching messages that contain word"""
+    registry = EncounterRegistry()
+    for name, priority, word in handlers:
+        @registry.register(name, priority, match=lambda msg, kind, word=word: word in msg.text)
+        async def action(bot, msg, name=name):
+            return bot_fsm.EVENT_HANDLED, message(msg.id + 1, f"{name}: +5 золота")
+    return registry
+
+
+def test_find_runs_lowest_priority_on_newest_message():
+    registry = registry_of(('camp', 20, "табір"), ('battle', 10, "З'явився"))
+    assert [handler.name for handler in registry.handlers] == ['battle', 'camp']
+
+    both = message(2, "Табір... З'явився Вовк! табір")
+    handler, msg = registry.find([both], lambda msg: None)
+    assert handler.name == 'battle' and msg is both
+
+    older_battle = message(1, "З'явився Вовк")
+    newer_camp = message(3, "покинутий табір")
+    handler, msg = registry.find([newer_camp, message(2, ""), older_battle], lambda msg: None)
+    assert handler.name == 'camp' and msg is newer_camp  # Newest message wins over priority
+
+    assert registry.find([message(4, "Нічого")], lambda msg: None) == (None, None)
+
+
+def test_registering_a_name_again_replaces_the_handler():
+    registry = registry_of(('camp', 20, "табір"), ('camp', 5, "вогнище"))
+    assert [(handler.name, handler.priority) for handler in registry.handlers] == [('camp', 5)]
+
+
+def test_dispatch_records_outcome_and_rewards():
+    registry = registry_of(('camp', 20, "табір"))
+    added = []
+    bot = SimpleNamespace(parser=SimpleNamespace(classify=lambda msg: None,
+                                                 battle_rewards=lambda msg: {'gold': 5, 'experience': 0}),
+                          economy=SimpleNamespace(add_rewards=lambda xp, gold: added.append((xp, gold))))
+
+    assert asyncio.run(registry.dispatch(bot, [message(1, "покинутий табір")])) == bot_fsm.EVENT_HANDLED
+    assert asyncio.run(registry.dispatch(bot, [message(2, "Нічого")])) == bot_fsm.NOTHING
+    [camp] = registry.handlers
+    assert camp.count == 1 and camp.gold == 5 and camp.timeouts == 0
+    assert added == [(0, 5)]
+
+
+class AnsweringGame(StandInClient):
+    """Stand-in game answering clicks with answer(client, msg)"""
+
+    def __init__(self, answer):
+        super().__init__()
+        self.answer = answer
+
+    def on_click(self, msg, label):
+        self.answer(self, msg)
+
+
+@pytest.fixture
+def fast_polls(monkeypatch):
+    monkeypatch.setattr(encounters, 'OUTCOME_POLL', 0.01)
+
+
+def click(answer):
+    """click_and_await on a camp message of a stand-in game, returns (camp message, outcome)"""
+    async def run():
+        client = AnsweringGame(answer)
+        await client.start()
+        camp = client.add_message("Ви бачите покинутий табір", [["Дослідити"]])
+
+        async def human_delay():
+            pass
+
+        bot = SimpleNamespace(client=GameClient(client), game_chat='game', human_delay=human_delay)
+        return camp, await click_and_await(bot, camp, timeout=0.1)
+
+    return asyncio.run(run())
+
+
+def test_click_and_await_returns_new_reply(fast_polls):
+    def answer(client, msg):
+        client.add_message("Ви знайшли 5 золота")
+        client.add_message("Дослідити", out=True)  # Our own newer message is not an answer
+
+    camp, outcome = click(answer)
+    assert outcome.id == camp.id + 1 and outcome.text == "Ви знайшли 5 золота"
+
+
+def test_click_and_await_detects_edit_of_clicked_message(fast_polls):
+    def answer(client, msg):
+        msg.update("Табір порожній", None, datetime.now(timezone.utc))
+
+    camp, outcome = click(answer)
+    assert outcome is camp and outcome.text == "Табір порожній"
+
+
+def test_click_and_await_times_out(fast_polls):
+    camp, outcome = click(lambda client, msg: None)
+    assert outcome is NO_ANSWER
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+from utils.battle_store import ESCAPED, WON, BattleRecorder, BattleStore
+from utils.escape_advisor import EscapeAdvisor, normalize_mob_name
+
+
+def advisor_config(tmp_path, **overrides):
+    settings = dict(
+        ESCAPE_TABLE_PATH=str(tmp_path / 'escape_table.json'),
+        ESCAPE_MOBS=[],
+        ESCAPE_MOBS_FROM_FILE=[],
+        ESCAPE_MIN_BATTLES=3,
+        ESCAPE_MAX_DEFEAT_RATE=0.2,
+        ESCAPE_GOLD_WEIGHT=0.0,
+        ESCAPE_DEFAULT_HP_PER_MINUTE=1.0,
+        ESCAPE_DEFAULT_ENERGY_MINUTES=30.0
+    )
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+
+def battle(mob, outcome, hp_end, xp=0, gold=0):
+    recorder = BattleRecorder(mob, 5, hp_start=100, max_hp=100)
+    recorder.add_round(1, hp_end, 'escape' if outcome == ESCAPED else 'attack')
+    recorder.finish(outcome, {'experience': xp, 'gold': gold})
+    return recorder
+
+
+def test_mob_stats_averages_fought_battles_only(tmp_path):
+    store = BattleStore(tmp_path / 'battles.db')
+    store.write_batch([
+        battle("Вовк", WON, 80, xp=10, gold=4),
+        battle("Вовк", WON, 60, xp=20, gold=6),
+        battle("Вовк", ESCAPED, 95),
+        battle("Вовк", ESCAPED, 100),
+    ])
+    [row] = store.mob_stats(level=5)
+    assert row['battles'] == 4 and row['escapes'] == 2
+    assert row['avg_xp'] == 15 and row['avg_gold'] == 5 and row['avg_hp_loss'] == 30
+
+
+def test_build_table_escapes_costly_and_deadly_mobs(tmp_path):
+    advisor = EscapeAdvisor(advisor_config(tmp_path))
+    stats = [
+        {'mob': "🐺 Вовк", 'battles': 10, 'escapes': 0, 'defeats': 0, 'avg_xp': 20, 'avg_gold': 0,
+         'avg_hp_loss': 10},
+        {'mob': "Ведмідь", 'battles': 10, 'escapes': 2, 'defeats': 4, 'avg_xp': 50, 'avg_gold': 0,
+         'avg_hp_loss': 60},
+        {'mob': "Слиз", 'battles': 10, 'escapes': 0, 'defeats': 0, 'avg_xp': 2, 'avg_gold': 0,
+         'avg_hp_loss': 40},
+        {'mob': "Рідкісний", 'battles': 2, 'escapes': 0, 'defeats': 2, 'avg_xp': 0, 'avg_gold': 0,
+         'avg_hp_loss': 100},
+    ]
+    table, farm_rate = advisor.build_table(stats, 5)
+
+    assert farm_rate > 0
+    assert set(table) == {"Вовк", "Ведмідь", "Слиз"}  # Below ESCAPE_MIN_BATTLES is left out
+    assert not table["Вовк"]['escape']
+    assert table["Ведмідь"]['escape'] and table["Ведмідь"]['defeat_rate'] == 0.5
+    assert table["Слиз"]['escape'] and table["Слиз"]['value'] < 0
+
+
+def test_should_escape_uses_manual_list_and_table(tmp_path):
+    advisor = EscapeAdvisor(advisor_config(tmp_path, ESCAPE_MOBS=["Павук"]))
+    advisor.table = {"Вовк": {'escape': False, 'reason': "worth it"}}
+    assert advisor.should_escape("🕷 Павук (рівень 5)") == (True, "in ESCAPE_MOBS list")
+    assert advisor.should_escape("Вовк") == (False, "worth it")
+    assert advisor.should_escape("Невідомий")[1] == "no statistics yet"
+    assert normalize_mob_name("  🐺 Сірий  Вовк [5]") == "Сірий Вовк"
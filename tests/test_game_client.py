@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from utils import metrics
+from utils.game_client import GameClient
+
+
+class FloodWaitError(Exception):
+    """Same name and seconds attribute as telethon.errors.FloodWaitError"""
+
+    def __init__(self, seconds):
+        super().__init__(f"A wait of {seconds} seconds is required")
+        self.seconds = seconds
+
+
+class FloodedClient:
+    """Client whose history reads raise the given FloodWaits before succeeding"""
+
+    def __init__(self, waits):
+        self.flood_sleep_threshold = 60
+        self.waits = list(waits)
+        self.calls = 0
+
+    async def get_messages(self, entity, limit=None):
+        self.calls += 1
+        if self.waits:
+            raise FloodWaitError(self.waits.pop(0))
+        return [SimpleNamespace(id=self.calls)]
+
+
+@pytest.fixture
+def metrics_on(monkeypatch):
+    monkeypatch.setattr(metrics.registry, 'enabled', True)
+
+
+def test_flood_wait_is_counted_and_raised(metrics_on):
+    client = FloodedClient([300])
+    wrapped = GameClient(client)
+    before = metrics.FLOOD_WAIT_SECONDS.get()
+    with pytest.raises(FloodWaitError):
+        asyncio.run(wrapped.get_messages('game', limit=2))
+    assert client.flood_sleep_threshold == 60 and client.calls == 1  # Shared client left as it was
+    assert wrapped.flood_waits == 1 and wrapped.flood_wait_seconds == 300
+    assert metrics.FLOOD_WAIT_SECONDS.get() - before == 300
+
+
+class SlowHistory:
+    """Client whose history reads wait for release(), newest message (id 10) first"""
+
+    def __init__(self, error=None):
+        self.released = asyncio.Event()
+        self.error = error
+        self.limits = []
+
+    def release(self):
+        self.released.set()
+
+    async def get_messages(self, entity, limit=None):
+        self.limits.append(limit)
+        await self.released.wait()
+        if self.error:
+            raise self.error
+        return [SimpleNamespace(id=msg_id) for msg_id in range(10, 10 - limit, -1)]
+
+
+def read_concurrently(client, *limits):
+    """Results (or exceptions) of get_messages calls started together, in order"""
+    wrapped = GameClient(client)
+
+    async def run():
+        tasks = [asyncio.create_task(wrapped.get_messages('game', limit=limit)) for limit in limits]
+        await asyncio.sleep(0)
+        client.release()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    return wrapped, asyncio.run(run())
+
+
+def test_smaller_read_joins_larger_one_in_flight():
+    client = SlowHistory()
+    wrapped, (five, two) = read_concurrently(client, 5, 2)
+    assert client.limits == [5]
+    assert [msg.id for msg in five] == [10, 9, 8, 7, 6] and [msg.id for msg in two] == [10, 9]
+    assert wrapped.history_fetches == 1 and wrapped.history_coalesced == 1 and not wrapped.history_in_flight
+
+
+def test_larger_read_does_not_join_smaller_one():
+    client = SlowHistory()
+    wrapped, (two, five) = read_concurrently(client, 2, 5)
+    assert client.limits == [2, 5]
+    assert len(two) == 2 and len(five) == 5 and wrapped.history_coalesced == 0
+
+
+def test_error_reaches_every_joined_caller():
+    error = ConnectionError("connection lost")
+    client = SlowHistory(error)
+    wrapped, results = read_concurrently(client, 5, 3, 1)
+    assert client.limits == [5] and results == [error, error, error]
+    assert not wrapped.history_in_flight
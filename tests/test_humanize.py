@@ -0,0 +1,49 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from utils import humanize
+from utils.humanize import BATTLE_CLICK, PROFILE_CHECK, DelayBudget, Humanizer, draw
+
+
+def test_draw_respects_floor_and_cap():
+    rng = random.Random(1)
+    draws = [draw((2.0, 1.5, 0.5, 4.0), rng) for _ in range(1000)]
+    assert min(draws) == 0.5 and max(draws) == 4.0
+    assert draw((0, 0.5, 0.3, 1.0), rng) == 0.3
+
+
+def test_first_delays_are_not_trimmed():
+    budget = DelayBudget(now=0.0)
+    # 10% budget of a 600 s window leaves 60 s at start, as if the bot had been idle
+    assert budget.grant(5.0, 0.2, 0.1, 600, now=0.0) == 5.0
+    assert budget.grant(5.0, 0.2, 0.1, 600, now=1.0) == 5.0
+
+
+def test_sustained_delays_are_held_to_the_share():
+    budget = DelayBudget(now=0.0)
+    now = 0.0
+    for _ in range(2000):
+        now += budget.grant(10.0, 0.0, 0.25, 600, now=now) + 1.0  # 1 s of work between delays
+    assert budget.share(600, now=now) == pytest.approx(0.25, abs=0.02)
+
+
+def test_floor_beats_budget():
+    budget = DelayBudget(now=0.0)
+    budget.delayed = 1000.0
+    assert budget.grant(3.0, 0.5, 0.1, 600, now=0.0) == 0.5
+
+
+def test_humanizer_stats_per_kind():
+    config = SimpleNamespace(HUMAN_DELAY_BATTLE_CLICK=(0.5, 0.3, 0.2, 1.0), HUMAN_DELAY_MENU_NAV=(1, 0.3, 0.5, 2),
+                             HUMAN_DELAY_SHOP_PURCHASE=(1, 0.3, 0.5, 2), HUMAN_DELAY_PROFILE_CHECK=(3.0, 0.3, 2.0, 6.0),
+                             HUMAN_DELAY_BUDGET=0.3, HUMAN_DELAY_BUDGET_WINDOW=600)
+    humanizer = Humanizer(random.Random(2))
+    for _ in range(5):
+        assert 0.2 <= humanizer.next_delay(config, BATTLE_CLICK) <= 1.0
+    assert 2.0 <= humanizer.next_delay(config, PROFILE_CHECK) <= 6.0
+    totals = humanizer.totals(600)
+    assert totals['count'] == 6 and totals['trimmed'] == 0.0
+    assert set(humanizer.stats) == {BATTLE_CLICK, PROFILE_CHECK}
+    assert humanize.PROFILE_SETTINGS[PROFILE_CHECK] == 'HUMAN_DELAY_PROFILE_CHECK'
@@ -0,0 +1,34 @@
+import json
+import logging
+
+from utils import logger as log_module
+
+
+def test_queued_record_keeps_values_at_call_time(tmp_path):
+    log_file = tmp_path / 'bot.log'
+    log_module.configure_logging(json_output=True, log_file=str(log_file), level=logging.INFO)
+    try:
+        logger = log_module.setup_logger('tests.logger')
+        log_module.set_log_context(bot='auto')
+        state = {'hp': 100}
+        logger.info("State: %s", state)
+        state['hp'] = 0  # Changed before the listener formats the record
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.exception("Failed in round %d", 3)
+        logger.debug("Below the level: %s", state)
+    finally:
+        log_module.configure_logging(log_file='')
+
+    lines = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [line['msg'] for line in lines] == ["State: {'hp': 100}", "Failed in round 3"]
+    assert lines[0]['bot'] == 'auto'
+    assert 'ValueError: boom' in lines[1]['exc']
+
+
+def test_prepare_leaves_caller_record_alone():
+    record = logging.LogRecord('tests', logging.INFO, __file__, 1, "HP: %s", (5,), None)
+    prepared = log_module.ContextQueueHandler(None).prepare(record)
+    assert prepared.msg == "HP: 5" and prepared.args is None
+    assert record.args == (5,)
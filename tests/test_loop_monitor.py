@@ -0,0 +1,74 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from utils import loop_monitor
+from utils.loop_monitor import LoopMonitor, percentile
+
+_original_run = asyncio.events.Handle._run
+
+
+async def block(seconds):
+    await asyncio.sleep(0)
+    time.sleep(seconds)
+
+
+def run_monitor(monitor, during):
+    async def run():
+        monitor.start()
+        patched = asyncio.events.Handle._run is not _original_run
+        await asyncio.sleep(0.03)
+        await during()
+        await asyncio.sleep(0.03)
+        monitor.stop()
+        return patched
+
+    return asyncio.run(run())
+
+
+def test_lag_only_by_default():
+    monitor = LoopMonitor(interval=0.01, slow_callback=0.05)
+    patched = run_monitor(monitor, lambda: block(0.08))
+    assert not patched and not monitor.callbacks_timed
+    assert monitor.slow_callbacks >= 1 and monitor.max_lag >= 0.05
+    assert asyncio.events.Handle._run is _original_run
+
+
+def test_callback_timing_is_opt_in_and_restored():
+    async def run():
+        monitor = loop_monitor.start(interval=0.01, slow_callback=0.05, time_callbacks=True)
+        patched = asyncio.events.Handle._run is not _original_run
+        await block(0.08)
+        await asyncio.sleep(0.03)
+        loop_monitor.stop()
+        return monitor, patched
+
+    monitor, patched = asyncio.run(run())
+    assert patched and monitor.slow_callbacks >= 1
+    assert asyncio.events.Handle._run is _original_run
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([1, 2, 3, 4], 0.5) == 3
+    assert percentile([1, 2, 3, 4], 0.99) == 4
+
+
+def test_slow_warnings_are_aggregated_per_interval(monkeypatch):
+    warnings = []
+    now = [100.0]
+    monkeypatch.setattr(loop_monitor, 'logger', SimpleNamespace(warning=warnings.append))
+    monkeypatch.setattr(loop_monitor.time, 'monotonic', lambda: now[0])
+    monitor = LoopMonitor(slow_callback=0.1, report_interval=60)
+
+    for lag in [0.2] * 48 + [0.5]:
+        monitor.observe(lag)
+    assert warnings == ["Event loop blocked for 200ms"]
+
+    now[0] += 60
+    monitor.observe(0.3)
+    monitor.observe(0.05)  # Below the threshold
+    monitor.stop()
+    assert warnings[1:] == ["Event loop blocked 48 more times since the last warning, longest 500ms",
+                            "Event loop blocked for 300ms"]
+    assert monitor.slow_callbacks == 50
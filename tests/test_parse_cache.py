@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+from utils.parse_cache import ParseCache
+
+
+def message(text, msg_id=1, edit_date=None):
+    return SimpleNamespace(text=text, id=msg_id, chat_id=42, edit_date=edit_date)
+
+
+def test_parses_each_version_once():
+    cache = ParseCache(16)
+    calls = []
+
+    def parse(msg):
+        calls.append(msg.text)
+        return len(msg.text)
+
+    assert cache.get(message("abc"), 'len', parse) == 3
+    assert cache.get(message("abc"), 'len', parse) == 3
+    assert cache.get(message("abcd", edit_date=1), 'len', parse) == 4
+    # Same edit_date but new text (edited twice within a second) is parsed again
+    assert cache.get(message("abcde", edit_date=1), 'len', parse) == 5
+    assert calls == ["abc", "abcd", "abcde"]
+    assert cache.stats()['hits'] == 1
+
+
+def test_results_are_not_shared():
+    cache = ParseCache(16)
+
+    def parse(msg):
+        return {"Зілля": {'price': 10, 'rows': [0, 1]}}
+
+    first = cache.get(message("shop"), 'catalog', parse)
+    first["Зілля"]['price'] = 12
+    first["Зілля"]['rows'].append(2)
+    assert cache.get(message("shop"), 'catalog', parse) == {"Зілля": {'price': 10, 'rows': [0, 1]}}
+
+
+def test_evicts_least_recently_used():
+    cache = ParseCache(2)
+    for msg_id in (1, 2, 1, 3):
+        cache.get(message("x", msg_id), 'len', lambda m: len(m.text))
+    assert [key[1] for key in cache.entries] == [1, 3]
@@ -0,0 +1,59 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from utils.game_client import GameClient
+from utils.peer_cache import PeerCache
+
+
+class PeerIdInvalidError(Exception):
+    """Same name as telethon.errors.PeerIdInvalidError"""
+
+
+def test_put_get_invalidate_per_session(tmp_path):
+    path = tmp_path / 'peers.json'
+    cache = PeerCache(path, 'main')
+    cache.put('@Ostromag_Game_Bot', SimpleNamespace(id=42, access_hash=777))
+    cache.put('@no_hash', SimpleNamespace(id=43))
+
+    reloaded = PeerCache(path, 'main')
+    peer = reloaded.get('ostromag_game_bot')
+    assert (peer.user_id, peer.access_hash) == (42, 777)
+    assert reloaded.get('@no_hash') is None
+    assert PeerCache(path, 'other').get('@ostromag_game_bot') is None  # Access hashes are per account
+
+    reloaded.invalidate('@ostromag_game_bot')
+    assert PeerCache(path, 'main').get('@ostromag_game_bot') is None
+
+
+class RejectingClient:
+    """Client that resolves the game bot but rejects messages to it"""
+
+    def __init__(self):
+        self.resolved = 0
+
+    async def get_entity(self, username):
+        self.resolved += 1
+        return SimpleNamespace(id=42, access_hash=888)
+
+    async def send_message(self, entity, message, **kwargs):
+        raise PeerIdInvalidError("An invalid Peer was used")
+
+
+def test_rejected_cached_peer_is_dropped(tmp_path):
+    cache = PeerCache(tmp_path / 'peers.json', 'main')
+    cache.put('@game', SimpleNamespace(id=42, access_hash=777))
+    client = RejectingClient()
+    wrapped = GameClient(client)
+
+    async def run():
+        peer = await wrapped.resolve_peer('@game', cache)
+        assert peer.access_hash == 777 and client.resolved == 0
+        with pytest.raises(PeerIdInvalidError):
+            await wrapped.send_message(peer, "/start")
+        return await wrapped.resolve_peer('@game', cache)
+
+    peer = asyncio.run(run())
+    assert client.resolved == 1 and peer.access_hash == 888  # Resolved again and re-cached
+    assert PeerCache(tmp_path / 'peers.json', 'main').get('@game').access_hash == 888
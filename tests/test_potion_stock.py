@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+
+from config import reloadable_setting
+from utils import potion_stock
+from utils.parser import GameParser
+from utils.potion_stock import PotionStock
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(potion_stock.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def restock_config(**overrides):
+    settings = dict(POTION_RESTOCK_BELOW=3, POTION_RESTOCK_TARGET=10, POTION_RESTOCK_MIN_WAIT=15,
+                    POTION_RESTOCK_COOLDOWN=3600)
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+
+@pytest.mark.parametrize('text, buttons, expected', [
+    ("Оберіть зілля:", [["🧪 Мале зілля здоров'я (3)", "🧪 Зілля здоров'я x2"], ["Велике зілля 1 шт"], ["⬅️ Назад"]],
+     {"Мале зілля здоров'я": 3, "Зілля здоров'я": 2, "Велике зілля": 1}),
+    ("Оберіть зілля:", [["🧪 Мале зілля здоров'я"]], {"Мале зілля здоров'я": None}),
+    ("У вас немає зілля!", None, {}),
+    ("👤 Ви (120/300)", [["⚔️ Атака"]], None),
+])
+def test_parse_potion_menu(text, buttons, expected):
+    assert GameParser().parse_potion_menu(text, buttons) == expected
+
+
+def test_menu_updates_count(clock):
+    stock = PotionStock(restock_config())
+    stock.observe_menu({"Мале зілля": 3, "Зілля": 2})
+    assert stock.count == 5
+    stock.used()
+    assert stock.count == 4
+    stock.observe_menu({"Мале зілля": None})
+    assert stock.count == 4  # Counts not shown, keep what we know
+    stock.observe_menu(None)
+    assert stock.count == 4
+
+
+def test_empty_until_cooldown(clock):
+    stock = PotionStock(restock_config(), count=1)
+    stock.used()
+    assert stock.count == 0 and stock.empty()
+    clock[0] += 3600
+    assert not stock.empty() and stock.count is None  # Look at the menu again
+
+
+def test_restock_due(clock):
+    config = restock_config()
+    assert not PotionStock(config).restock_due(60)  # Count unknown
+    stock = PotionStock(config, count=2)
+    assert stock.restock_due(60, gold=100)
+    assert not stock.restock_due(10)  # HP wait too short to shop
+    assert not PotionStock(config, count=3).restock_due(60)
+    assert not PotionStock(restock_config(POTION_RESTOCK_BELOW=0), count=0).restock_due(60)
+
+    assert stock.wanted() == 8
+    stock.restocked(0, price=40)
+    assert not stock.restock_due(60, gold=100)  # Cooldown after a trip
+    clock[0] += 3600
+    assert not stock.restock_due(60, gold=30)  # Cannot afford one
+    assert stock.restock_due(60, gold=40)
+
+
+def test_restocked_adds_bought(clock):
+    stock = PotionStock(restock_config(), count=0)
+    stock.restocked(8, price=40)
+    assert stock.count == 8 and stock.bought == 8 and stock.restocks == 1 and stock.price == 40
+
+
+def test_starts_empty(clock):
+    stock = PotionStock(restock_config(), count=0)
+    assert stock.empty()
+    clock[0] += 3600
+    assert not stock.empty()
+
+
+def test_restock_is_opt_in():
+    config = restock_config(POTION_RESTOCK_BELOW=reloadable_setting('POTION_RESTOCK_BELOW', {}))
+    assert config.POTION_RESTOCK_BELOW == 0
+    assert not PotionStock(config, count=0).restock_due(60, gold=1000)
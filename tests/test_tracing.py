@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+import pytest
+
+from utils import tracing
+from utils.tracing import NETWORK, PHASE, SLEEP, Tracer
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    tracer = tracing.enable_tracing(str(tmp_path / 'trace.json'))
+    yield tracer
+    tracing.finish_tracing()
+
+
+def spans(tracer):
+    """name -> (category, depth) of recorded spans"""
+    return {name: (cat, depth) for name, cat, start, end, depth, tid, args in tracer.events}
+
+
+def test_nested_spans_record_depth(tracer):
+    with tracing.span('explore'):
+        with tracing.span('get_messages', NETWORK, limit=5):
+            pass
+        with tracing.span('parse'):
+            pass
+    with tracing.span('rest'):
+        pass
+    assert spans(tracer) == {'explore': (PHASE, 0), 'get_messages': (NETWORK, 1), 'parse': (PHASE, 1),
+                             'rest': (PHASE, 0)}
+    assert tracer.events[0][-1] == {'limit': 5}
+
+
+def test_traced_async_function(tracer):
+    @tracing.traced('battle')
+    async def battle():
+        await tracing.sleep(0.01, "await_outcome")
+        return 'won'
+
+    assert asyncio.iscoroutinefunction(battle) and battle.__name__ == 'battle'
+    assert asyncio.run(battle()) == 'won'
+    assert spans(tracer) == {'await_outcome': (SLEEP, 1), 'battle': (PHASE, 0)}
+    name, cat, start, end, depth, tid, args = tracer.events[1]
+    assert end - start >= 0.01
+
+
+def test_disabled_tracing_records_nothing():
+    @tracing.traced()
+    async def explore():
+        with tracing.span('inner'):
+            return 1
+
+    assert asyncio.run(explore()) == 1 and tracing.span('x') is tracing._NOOP
+
+
+def test_summary_splits_wall_time_by_category(tmp_path):
+    tracer = Tracer(str(tmp_path / 'trace.json'))
+    tracer.add('main_loop', PHASE, 0.0, 10.0, 0)
+    tracer.add('wait_hp', SLEEP, 0.0, 3.0, 1)
+    tracer.add('human_delay', SLEEP, 3.0, 4.0, 1)
+    tracer.add('get_messages', NETWORK, 4.0, 6.0, 1)
+
+    lines = tracer.summary().splitlines()
+    assert lines[0] == "Traced wall time: 10.0s - sleeping 40.0%, network 20.0%, compute 40.0%"
+    sleeps = lines[lines.index("Sleeps (by total time):") + 1:]
+    assert [line.split()[0] for line in sleeps] == ['wait_hp', 'human_delay']
+
+    tracer.save()
+    events = json.loads((tmp_path / 'trace.json').read_text())['traceEvents']
+    assert [(event['name'], event['ph'], event['dur']) for event in events][:2] == [
+        ('main_loop', 'X', 10e6), ('wait_hp', 'X', 3e6)]
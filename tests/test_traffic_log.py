@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+from utils import traffic_log
+from utils.traffic_log import NEW, TrafficLog, TrafficRecorder, replay_config
+
+
+def record_log(path, texts):
+    recorder = TrafficRecorder(path)
+    for msg_id, text in enumerate(texts, 1):
+        recorder.write({'t': time.time() + msg_id, 'k': NEW, 'id': msg_id, 'date': time.time(), 'edit': None,
+                        'out': False, 'text': text, 'btn': [["⚔️ Атака"]]})
+    recorder.close()
+
+
+def test_log_index(tmp_path):
+    record_log(tmp_path / 'traffic.log', ["один", "два", "три"])
+    traffic = TrafficLog(tmp_path / 'traffic.log')
+    assert len(traffic) == 3
+    assert traffic[-1]['text'] == "три" and [r['id'] for r in traffic] == [1, 2, 3]
+
+
+def test_replay_config_keeps_state_in_directory(tmp_path):
+    config = replay_config(tmp_path)
+    for path in (config.BATTLE_DB_PATH, config.CHECKPOINT_PATH, config.ESCAPE_TABLE_PATH):
+        assert path.startswith(str(tmp_path))
+    assert config.TRAFFIC_LOG == '' and config.PEER_CACHE_PATH == ''
+
+
+def test_replay_leaves_working_directory_alone(tmp_path, monkeypatch):
+    record_log(tmp_path / 'traffic.log', ["👤 Ви (100/100)"])
+    workdir = tmp_path / 'work'
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+
+    client = asyncio.run(traffic_log.replay(tmp_path / 'traffic.log', speed=100, grace=0.2))
+    assert client.exhausted.is_set()
+    assert list(workdir.iterdir()) == []
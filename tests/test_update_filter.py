@@ -0,0 +1,88 @@
+import asyncio
+import inspect
+from types import SimpleNamespace
+
+from telethon import TelegramClient
+from telethon.sessions import StringSession
+from telethon.tl import types
+
+from utils.update_filter import UpdateFilter, update_peer_id
+
+GAME_BOT = 42
+SELF = 7
+
+
+def message_update(user_id, msg_id=1):
+    return types.UpdateNewMessage(types.Message(msg_id, types.PeerUser(user_id), None, "text"), 1, 1)
+
+
+def user(user_id):
+    return types.User(user_id, access_hash=user_id * 10)
+
+
+class ListClient:
+    """Client with the pre-1.40 Telethon signature: synchronous, returns a list"""
+
+    def __init__(self):
+        self._mb_entity_cache = SimpleNamespace(self_id=SELF, extended=[], extend=self.extend)
+        self.preprocessed = []
+
+    def extend(self, users, chats):
+        self._mb_entity_cache.extended.append(([u.id for u in users], chats))
+
+    def _preprocess_updates(self, updates, users, chats):
+        self._mb_entity_cache.extend(users, chats)
+        self.preprocessed.append((updates, users, chats))
+        return updates
+
+    async def _dispatch_update(self, update):
+        return update
+
+
+def test_update_peer_id():
+    assert update_peer_id(message_update(GAME_BOT)) == GAME_BOT
+    assert update_peer_id(SimpleNamespace()) is None
+
+
+def test_sync_preprocess_returns_list():
+    client = ListClient()
+    UpdateFilter(client, GAME_BOT)
+    updates = [message_update(GAME_BOT), message_update(99)]
+
+    result = client._preprocess_updates(updates, [user(GAME_BOT), user(99), user(SELF)], [])
+
+    assert isinstance(result, list)
+    assert result == updates[:1]
+    # Every entity is cached once: filtered ones by the filter, kept ones by the original
+    cached = sorted(uid for ids, _ in client._mb_entity_cache.extended for uid in ids)
+    assert cached == [SELF, GAME_BOT, 99]
+
+
+def test_sync_preprocess_drops_everything():
+    client = ListClient()
+    update_filter = UpdateFilter(client, GAME_BOT)
+
+    assert client._preprocess_updates([message_update(99)], [user(99)], []) == []
+    assert update_filter.dropped == 1 and update_filter.processed == 0
+
+
+def test_real_telethon_signature():
+    client = TelegramClient(StringSession(), 1, 'hash')
+    original = client._preprocess_updates
+    update_filter = UpdateFilter(client, GAME_BOT)
+    assert not inspect.iscoroutinefunction(client._preprocess_updates)
+
+    async def run():
+        # Call it the way the installed Telethon does (awaited or not)
+        result = client._preprocess_updates([message_update(GAME_BOT), message_update(99)], [user(GAME_BOT)], [])
+        if inspect.iscoroutinefunction(original):
+            result = await result
+        dropped = client._preprocess_updates([message_update(99)], [], [])
+        if inspect.iscoroutinefunction(original):
+            dropped = await dropped
+        return list(result), list(dropped)
+
+    kept, dropped = asyncio.run(run())
+    assert [update_peer_id(update) for update in kept] == [GAME_BOT]
+    assert dropped == []
+    assert update_filter.processed == 1 and update_filter.dropped == 2
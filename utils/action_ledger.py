@@ -0,0 +1,45 @@
+"""
+Ledger of clicks already made on a message state.
+
+A battle message is edited by the game after each action; until that edit
+arrives, the message (same id, same edit_date) still shows the old state and
+clicking again only wastes a rate-limit slot. The ledger remembers
+(message id, edit_date, action) and refuses to repeat it until retry_after
+seconds have passed, which allows deliberate retries when the game ignored
+a click.
+"""
+
+import time
+
+from utils import metrics
+
+SUPPRESSED = metrics.Counter('ostromag_clicks_suppressed_total', 'Repeated clicks on an unchanged message skipped',
+                             ('action',))
+
+
+class ActionLedger:
+    """(message id, edit_date, action) -> time of the click"""
+
+    def __init__(self, retry_after=10.0):
+        self.retry_after = retry_after
+        self.actions = {}
+        self.suppressed = 0
+
+    def allow(self, msg, action):
+        """True (and recorded) if action was not done on this message state recently"""
+        key = (msg.id, getattr(msg, 'edit_date', None), action)
+        now = time.monotonic()
+        done_at = self.actions.get(key)
+        if done_at is not None and now - done_at < self.retry_after:
+            self.suppressed += 1
+            SUPPRESSED.inc(action=action)
+            return False
+        self.actions[key] = now
+        return True
+
+    def reset(self):
+        """Start a new battle, returns clicks suppressed in the previous one"""
+        suppressed = self.suppressed
+        self.actions.clear()
+        self.suppressed = 0
+        return suppressed
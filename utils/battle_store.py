@@ -0,0 +1,283 @@
+"""
+Battle telemetry storage - every battle is recorded into a local SQLite database
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS battles (
+    id INTEGER PRIMARY KEY,
+    started_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    mob TEXT NOT NULL,
+    level INTEGER NOT NULL,
+    rounds INTEGER NOT NULL,
+    escape_attempts INTEGER NOT NULL,
+    outcome TEXT NOT NULL,
+    gold INTEGER NOT NULL DEFAULT 0,
+    xp INTEGER NOT NULL DEFAULT 0,
+    hp_start INTEGER,
+    hp_end INTEGER,
+    max_hp INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS battle_rounds (
+    battle_id INTEGER NOT NULL REFERENCES battles(id),
+    round INTEGER NOT NULL,
+    hp INTEGER,
+    action TEXT NOT NULL,
+    options TEXT,
+    PRIMARY KEY (battle_id, round)
+) WITHOUT ROWID;
+
+-- Covering indexes: per-mob and per-level aggregates never touch the table itself
+CREATE INDEX IF NOT EXISTS idx_battles_level_mob
+    ON battles(level, mob, outcome, rounds, escape_attempts, gold, xp, hp_start, hp_end);
+CREATE INDEX IF NOT EXISTS idx_battles_mob_level
+    ON battles(mob, level, outcome, rounds, escape_attempts, gold, xp, hp_start, hp_end);
+"""
+
+# Battle outcomes
+WON = 'won'
+LOST = 'lost'
+ESCAPED = 'escaped'
+ENEMY_FLED = 'enemy_fled'
+ENDED = 'ended'
+TIMEOUT = 'timeout'
+
+# HP loss and rewards are averaged over fought (not escaped) battles, like the defeat rate
+_STATS_COLUMNS = """
+    COUNT(*) AS battles,
+    SUM(outcome = 'won') AS wins,
+    SUM(outcome = 'lost') AS defeats,
+    SUM(outcome = 'escaped') AS escapes,
+    SUM(escape_attempts) AS escape_attempts,
+    AVG(rounds) AS avg_rounds,
+    AVG(CASE WHEN outcome != 'escaped' THEN COALESCE(hp_start - hp_end, 0) END) AS avg_hp_loss,
+    AVG(CASE WHEN outcome != 'escaped' THEN gold END) AS avg_gold,
+    AVG(CASE WHEN outcome != 'escaped' THEN xp END) AS avg_xp
+"""
+
+
+class BattleRecorder:
+    """Collects one battle's data while it is being fought"""
+
+    def __init__(self, mob, level, hp_start=None, max_hp=None):
+        """Start recording a battle"""
+        self.started_at = time.time()
+        self.mob = mob
+        self.level = level
+        self.hp_start = hp_start
+        self.hp_end = hp_start
+        self.max_hp = max_hp
+        self.rounds = []
+        self.escape_attempts = 0
+        self.outcome = TIMEOUT
+        self.gold = 0
+        self.xp = 0
+
+    def add_round(self, round_number, hp, action, options=None):
+        """Record our HP and the action taken in a round"""
+        if hp is not None:
+            self.hp_end = hp
+            if self.hp_start is None:
+                self.hp_start = hp
+        if action == 'escape':
+            self.escape_attempts += 1
+        self.rounds.append((round_number, hp, action, json.dumps(options) if options else None))
+
+    def finish(self, outcome, rewards=None):
+        """Mark battle as finished with outcome and parsed rewards"""
+        self.outcome = outcome
+        if rewards:
+            self.gold = rewards.get('gold', 0)
+            self.xp = rewards.get('experience', 0)
+        if outcome == LOST:
+            self.hp_end = 0
+
+    def as_row(self, round_count):
+        """Battle row for the battles table"""
+        return (self.started_at, time.time() - self.started_at, self.mob, self.level,
+                round_count, self.escape_attempts, self.outcome, self.gold, self.xp,
+                self.hp_start, self.hp_end, self.max_hp)
+
+
+class BattleStore:
+    """
+    SQLite battle store with batched writes from an asyncio queue.
+    Writes and reads use separate connections (WAL lets readers run alongside the
+    writer): the write connection is only used by one batch at a time, the read
+    connection is shared by executor threads under a lock, and iter_rounds streams
+    through a connection of its own.
+    """
+
+    def __init__(self, db_path="battles.db", batch_size=50, flush_interval=5.0):
+        """Initialize store; the database is opened on start()"""
+        self.db_path = Path(db_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = None
+        self.read_conn = None
+        self.read_lock = threading.Lock()
+        self.queue = None
+        self.writer_task = None
+        self.battles_written = 0
+
+    def open(self):
+        """Open database and create schema"""
+        if self.conn is None:
+            self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def connect_reader(self):
+        """New read-only connection (schema created by open() first)"""
+        self.open()
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    async def start(self):
+        """Open database and start the background writer"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.open)
+        self.queue = asyncio.Queue()
+        self.writer_task = asyncio.create_task(self._writer())
+        logger.info(f"Battle telemetry enabled: {self.db_path}")
+
+    def record(self, battle):
+        """Queue a finished BattleRecorder for writing (never blocks)"""
+        if self.queue is None:
+            logger.warning("Battle store not started - battle not recorded")
+            return
+        self.queue.put_nowait(battle)
+
+    async def _writer(self):
+        """Drain the queue in batches and write them off the event loop"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.flush_interval
+
+            # Collect more battles until the batch is full or flush interval passes
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await loop.run_in_executor(None, self.write_batch, batch)
+            except Exception as e:
+                logger.error(f"Error writing battle telemetry: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def write_batch(self, batch):
+        """Write battles and their rounds in a single transaction"""
+        conn = self.open()
+        with conn:
+            for battle in batch:
+                cursor = conn.execute(
+                    "INSERT INTO battles (started_at, duration, mob, level, rounds, escape_attempts, "
+                    "outcome, gold, xp, hp_start, hp_end, max_hp) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    battle.as_row(len(battle.rounds))
+                )
+                battle_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT OR REPLACE INTO battle_rounds (battle_id, round, hp, action, options) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(battle_id,) + round_row for round_row in battle.rounds]
+                )
+        self.battles_written += len(batch)
+        logger.debug(f"Wrote {len(batch)} battles to telemetry store")
+
+    async def close(self):
+        """Flush pending battles and close database"""
+        if self.writer_task:
+            await self.queue.join()
+            self.writer_task.cancel()
+            try:
+                await self.writer_task
+            except asyncio.CancelledError:
+                pass
+            self.writer_task = None
+        with self.read_lock:
+            if self.read_conn:
+                self.read_conn.close()
+                self.read_conn = None
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def _query(self, sql, params=()):
+        """Run a read query on the read connection and return rows as dicts"""
+        with self.read_lock:
+            if self.read_conn is None:
+                self.read_conn = self.connect_reader()
+            cursor = self.read_conn.execute(sql, params)
+            columns = [col[0] for col in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def mob_stats(self, level=None, mob=None):
+        """Aggregated stats per mob, optionally limited to a level and/or mob"""
+        conditions, params = [], []
+        if level is not None:
+            conditions.append("level = ?")
+            params.append(level)
+        if mob is not None:
+            conditions.append("mob = ?")
+            params.append(mob)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._query(f"SELECT mob, {_STATS_COLUMNS} FROM battles {where} GROUP BY mob ORDER BY battles DESC",
+                           params)
+
+    def level_stats(self):
+        """Aggregated stats per character level"""
+        return self._query(f"SELECT level, {_STATS_COLUMNS} FROM battles GROUP BY level ORDER BY level")
+
+    def battle_rounds(self, battle_id):
+        """Recorded rounds of a single battle"""
+        return self._query("SELECT round, hp, action, options FROM battle_rounds WHERE battle_id = ? ORDER BY round",
+                           (battle_id,))
+
+    def iter_rounds(self, level=None, limit=None):
+        """Stream recorded rounds joined with their battle, ordered by battle and round"""
+        sql = ("SELECT r.battle_id, r.round, r.hp, r.action, r.options, "
+               "b.mob, b.level, b.max_hp, b.escape_attempts, b.outcome "
+               "FROM battle_rounds r JOIN battles b ON b.id = r.battle_id")
+        params = []
+        if level is not None:
+            sql += " WHERE b.level = ?"
+            params.append(level)
+        sql += " ORDER BY r.battle_id, r.round"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        conn = self.connect_reader()
+        try:
+            cursor = conn.execute(sql, params)
+            columns = [col[0] for col in cursor.description]
+            for row in cursor:
+                record = dict(zip(columns, row))
+                record['options'] = json.loads(record['options']) if record['options'] else []
+                yield record
+        finally:
+            conn.close()
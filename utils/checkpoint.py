@@ -0,0 +1,80 @@
+"""
+Atomic JSON checkpoint of bot state for fast resume after a restart.
+
+Bots save on every state transition; save_in_background() hands the write
+(with its fsync) to a single writer thread so the event loop never blocks on
+the disk and writes land in the order they were queued.
+"""
+
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class Checkpoint:
+    """Small state file written with write-to-temp, fsync and rename"""
+
+    def __init__(self, path, max_age=1800):
+        """Checkpoints older than max_age seconds are ignored on load"""
+        self.path = Path(path)
+        self.max_age = max_age
+        self.executor = None
+        self.pending = None  # Future of the last queued write
+
+    def save(self, data):
+        """Atomically replace the checkpoint with data (plus save time)"""
+        data = dict(data, saved_at=time.time())
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving checkpoint: {e}")
+
+    def save_in_background(self, data):
+        """Queue a save on the writer thread (data must not be changed afterwards)"""
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='checkpoint')
+        self.pending = asyncio.get_running_loop().run_in_executor(self.executor, self.save, data)
+        return self.pending
+    
+    async def close(self):
+        """Wait for queued writes and stop the writer thread"""
+        if self.pending is not None:
+            await self.pending
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+    
+    def load(self):
+        """Last checkpoint, or None if missing, unreadable or stale"""
+        if not self.path.exists():
+            return None
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+        age = time.time() - data.get('saved_at', 0)
+        if age > self.max_age:
+            logger.info(f"Ignoring checkpoint from {age / 60:.0f} minutes ago")
+            return None
+        return data
+
+    def clear(self):
+        """Remove the checkpoint"""
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
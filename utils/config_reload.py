@@ -0,0 +1,153 @@
+"""
+Hot reload of configuration without reconnecting.
+
+A watcher task checks the modification times of .env and ESCAPE_MOBS_FILE
+every CONFIG_RELOAD_SECONDS. On a change it reads the reloadable settings
+(config.RELOADABLE) and the escape mob list, validates them as a whole and
+keeps the differences as pending. Nothing is applied until a bot reaches a
+safe point (GameBot.main_loop outside encounters and battles, the daemon
+between jobs) and calls apply_pending(), which sets all values at once on
+the shared Config, logs what changed and returns it so the bot can rebuild
+objects derived from it (escape matcher, battle policy, ...).
+
+Values in .env win over variables exported in the shell for reloaded keys.
+"""
+
+import asyncio
+import os
+
+from dotenv import dotenv_values, find_dotenv
+
+from config import RELOADABLE, read_escape_mobs_file, reloadable_setting
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def validate(values):
+    """Problems with a set of reloadable values (empty list if they can be applied)"""
+    problems = []
+    for name in ('HUMAN_DELAY_BATTLE_CLICK', 'HUMAN_DELAY_MENU_NAV', 'HUMAN_DELAY_SHOP_PURCHASE',
+                 'HUMAN_DELAY_PROFILE_CHECK'):
+        median, sigma, floor, cap = values[name]
+        if sigma < 0 or not 0 <= floor <= median <= cap:
+            problems.append(f"{name} needs sigma >= 0 and 0 <= floor <= median <= cap")
+    if not 0 < values['HUMAN_DELAY_BUDGET'] <= 1 or values['HUMAN_DELAY_BUDGET_WINDOW'] <= 0:
+        problems.append("HUMAN_DELAY_BUDGET must be in (0, 1] and HUMAN_DELAY_BUDGET_WINDOW > 0")
+    if values['DAILY_ENERGY_LIMIT'] < 0:
+        problems.append("DAILY_ENERGY_LIMIT must be >= 0")
+    if not -1 <= values['EXPLORATION_START_HOUR'] <= 23:
+        problems.append("EXPLORATION_START_HOUR must be -1 or 0-23")
+    if values['BATTLE_MAX_ESCAPE_ATTEMPTS'] < 0 or values['ACTION_RETRY_SECONDS'] < 0:
+        problems.append("BATTLE_MAX_ESCAPE_ATTEMPTS and ACTION_RETRY_SECONDS must be >= 0")
+    if not 0 <= values['ESCAPE_MAX_DEFEAT_RATE'] <= 1:
+        problems.append("ESCAPE_MAX_DEFEAT_RATE must be between 0 and 1")
+    if not 0 <= values['POTION_RESTOCK_BELOW'] <= values['POTION_RESTOCK_TARGET']:
+        problems.append("POTION_RESTOCK_BELOW must be >= 0 and <= POTION_RESTOCK_TARGET")
+    return problems
+
+
+class ConfigWatcher:
+    """Detects changes of .env and the escape mob list, applies them on request"""
+
+    def __init__(self, config, env_path=None, interval=5.0):
+        self.config = config
+        self.env_path = env_path if env_path is not None else (find_dotenv(usecwd=True) or '.env')
+        self.interval = interval
+        self.mtimes = self.stat()
+        self.pending = {}  # name -> new value
+        self.task = None
+
+    def sources(self):
+        return [self.env_path, self.config.ESCAPE_MOBS_FILE]
+
+    def stat(self):
+        mtimes = []
+        for path in self.sources():
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return mtimes
+
+    def read(self):
+        """Reloadable values from the current sources (raises ValueError on bad values)"""
+        env = dict(os.environ)
+        env.update({key: value for key, value in dotenv_values(self.env_path).items() if value is not None})
+        values = {}
+        for name in RELOADABLE:
+            try:
+                values[name] = reloadable_setting(name, env)
+            except ValueError:
+                raise ValueError(f"{name}={env.get(name)!r} is not a valid {RELOADABLE[name][1].__name__}")
+        values['ESCAPE_MOBS_FROM_FILE'] = read_escape_mobs_file(self.config.ESCAPE_MOBS_FILE)
+        return values
+
+    def check(self):
+        """Re-read the sources if they changed; returns True when changes are pending"""
+        mtimes = self.stat()
+        if mtimes == self.mtimes:
+            return bool(self.pending)
+        self.mtimes = mtimes
+        try:
+            values = self.read()
+            problems = validate(values)
+        except (OSError, ValueError) as e:
+            problems = [str(e)]
+        if problems:
+            logger.error(f"Config change ignored: {'; '.join(problems)}")
+            return bool(self.pending)
+        self.pending = {name: value for name, value in values.items() if getattr(self.config, name) != value}
+        if self.pending:
+            logger.info(f"Config change detected ({', '.join(self.pending)}), applying at the next safe point")
+        return bool(self.pending)
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.check()
+
+    def apply_pending(self):
+        """Set all pending values on the config, returns {name: (old, new)}"""
+        if not self.pending:
+            return {}
+        changes = {name: (getattr(self.config, name), value) for name, value in self.pending.items()}
+        self.pending = {}
+        for name, (old, new) in changes.items():
+            setattr(self.config, name, new)
+        logger.info("Config reloaded: " + ', '.join(describe(name, old, new) for name, (old, new) in changes.items()))
+        return changes
+
+
+def describe(name, old, new):
+    if isinstance(new, list):
+        added = [item for item in new if item not in old]
+        removed = [item for item in old if item not in new]
+        return f"{name} " + ' '.join([f"+{item}" for item in added] + [f"-{item}" for item in removed])
+    return f"{name} {old} -> {new}"
+
+
+_watcher = None
+
+
+def start(config):
+    """Start watching config sources (no-op when CONFIG_RELOAD_SECONDS is 0)"""
+    global _watcher
+    if _watcher is None and config.CONFIG_RELOAD_SECONDS > 0:
+        _watcher = ConfigWatcher(config, interval=config.CONFIG_RELOAD_SECONDS)
+        _watcher.task = asyncio.create_task(_watcher.watch(), name='config_reload')
+    return _watcher
+
+
+def apply_pending():
+    """Apply pending config changes now (call at a safe point), returns {name: (old, new)}"""
+    if _watcher is None:
+        return {}
+    return _watcher.apply_pending()
+
+
+def stop():
+    global _watcher
+    if _watcher is not None:
+        _watcher.task.cancel()
+        _watcher = None
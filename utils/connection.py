@@ -0,0 +1,115 @@
+"""
+Connection manager - keeps a bot running across Telegram disconnects.
+
+Telethon retries a dropped connection a few times on its own; when it gives
+up, the client's `disconnected` future resolves and every request raises
+ConnectionError. The manager then reconnects with exponential backoff,
+fetches the game chat messages missed since the last seen id in one request
+and hands them to the bot before letting it continue.
+"""
+
+import asyncio
+import random
+import time
+
+from utils import metrics
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+RECONNECTS = metrics.Counter('ostromag_reconnects_total', 'Reconnects after the connection was lost')
+DISCONNECTED_SECONDS = metrics.Counter('ostromag_disconnected_seconds_total', 'Time spent without a connection')
+CATCHUP_MESSAGES = metrics.Counter('ostromag_catchup_messages_total', 'Game chat messages fetched after reconnect')
+
+
+class ConnectionManager:
+    """Runs a bot and reconnects the client whenever the connection drops"""
+
+    def __init__(self, client, config):
+        """client: TelegramClient (the bot wraps it in GameClient itself)"""
+        self.client = client
+        self.min_delay = config.RECONNECT_MIN_DELAY
+        self.max_delay = config.RECONNECT_MAX_DELAY
+        self.catchup_limit = config.CATCHUP_LIMIT
+        self.connected = asyncio.Event()
+        self.connected.set()
+        self.bot = None
+        self.stopping = False
+
+    async def wait_connected(self):
+        """Block until the connection is back (returns at once when connected)"""
+        await self.connected.wait()
+
+    def attach(self, bot):
+        """Make bot the one that gets missed messages after a reconnect"""
+        self.bot = bot
+        bot.connection = self
+
+    async def run(self, bot):
+        """Run bot.start() to completion, reconnecting underneath it as needed"""
+        self.attach(bot)
+        watchdog = asyncio.create_task(self.watch())
+        try:
+            await bot.start()
+        finally:
+            self.stopping = True
+            watchdog.cancel()
+
+    async def watch(self):
+        """Wait for disconnects and restore the connection"""
+        while not self.stopping:
+            try:
+                await self.client.disconnected
+            except Exception as e:
+                logger.warning(f"Connection lost: {e}")
+            else:
+                logger.warning("Connection lost")
+            if self.stopping:
+                return
+
+            self.connected.clear()
+            lost_at = time.monotonic()
+            await self.reconnect()
+            DISCONNECTED_SECONDS.inc(time.monotonic() - lost_at)
+            RECONNECTS.inc()
+            await self.catch_up()
+            self.connected.set()
+
+    async def reconnect(self):
+        """connect() with exponential backoff and jitter until it succeeds"""
+        delay = self.min_delay
+        attempt = 0
+        while not self.stopping:
+            attempt += 1
+            try:
+                await self.client.connect()
+                if self.client.is_connected():
+                    logger.info(f"Reconnected after {attempt} attempt(s)")
+                    return
+            except (OSError, ConnectionError) as e:
+                logger.warning(f"Reconnect attempt {attempt} failed: {e}")
+            sleep_for = delay * random.uniform(0.8, 1.2)
+            logger.info(f"Retrying connection in {sleep_for:.1f}s...")
+            await asyncio.sleep(sleep_for)
+            delay = min(delay * 2, self.max_delay)
+
+    async def catch_up(self):
+        """Fetch game chat messages missed while disconnected in one request"""
+        bot = self.bot
+        game_client = getattr(bot, 'client', None)
+        if bot is None or game_client is None or getattr(bot, 'game_chat', None) is None:
+            return
+        last_seen_id = game_client.last_seen_id
+        try:
+            missed = await game_client.get_messages(bot.game_chat, limit=self.catchup_limit, min_id=last_seen_id)
+        except Exception as e:
+            logger.error(f"Error fetching missed messages: {e}")
+            return
+        CATCHUP_MESSAGES.inc(len(missed))
+        logger.info(f"Fetched {len(missed)} game chat messages missed since id {last_seen_id}")
+        handler = getattr(bot, 'on_reconnect', None)
+        if handler:
+            try:
+                handler(list(reversed(missed)))  # Oldest first
+            except Exception as e:
+                logger.error(f"Error handling missed messages: {e}")
@@ -0,0 +1,157 @@
+"""
+Farm economy over rolling windows: XP and gold per hour, XP per energy and
+the share of time spent waiting for HP/energy versus acting.
+
+Each window (1h, 24h, 7d) keeps its sums in a ring of BUCKETS slots plus a
+running total; an update adds to the current slot and expires slots that fell
+out of the window, so updates and reads cost the same whatever the window.
+State time is booked when the state is left, so a long wait lands in one slot.
+
+One process-wide tracker (get_tracker) outlives GameBot instances, so the
+daemon keeps its windows when auto-leveling is interrupted by other jobs.
+"""
+
+import time
+
+from utils import metrics
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+WINDOWS = (('1h', 3600), ('24h', 86400), ('7d', 7 * 86400))
+BUCKETS = 60
+
+# Summed fields per slot
+XP, GOLD, ENERGY, BATTLES, WAITING, ACTING = range(6)
+
+XP_PER_HOUR = metrics.Gauge('ostromag_xp_per_hour', 'XP per hour over a rolling window', ('window',))
+GOLD_PER_HOUR = metrics.Gauge('ostromag_gold_per_hour', 'Gold per hour over a rolling window', ('window',))
+XP_PER_ENERGY = metrics.Gauge('ostromag_xp_per_energy', 'XP per energy spent over a rolling window', ('window',))
+WAITING_SHARE = metrics.Gauge('ostromag_waiting_share', 'Share of time waiting for HP/energy over a rolling window',
+                              ('window',))
+
+
+class RollingWindow:
+    """Sums of the last span seconds in a ring of slots"""
+
+    def __init__(self, span, buckets=BUCKETS, now=None):
+        self.span = span
+        self.width = span / buckets
+        self.slots = [[0.0] * 6 for _ in range(buckets)]
+        self.totals = [0.0] * 6
+        self.started_at = time.monotonic() if now is None else now
+        self.current = int(self.started_at // self.width)
+
+    def advance(self, now):
+        """Expire slots older than the window"""
+        index = int(now // self.width)
+        if index <= self.current:
+            return
+        for step in range(1, min(index - self.current, len(self.slots)) + 1):
+            slot = self.slots[(self.current + step) % len(self.slots)]
+            for field, value in enumerate(slot):
+                self.totals[field] -= value
+                slot[field] = 0.0
+        self.current = index
+
+    def add(self, field, amount, now):
+        self.advance(now)
+        self.slots[self.current % len(self.slots)][field] += amount
+        self.totals[field] += amount
+
+    def stats(self, now):
+        """Rates over the covered part of the window (less than span right after start)"""
+        self.advance(now)
+        xp, gold, energy, battles, waiting, acting = self.totals
+        hours = max(min(now - self.started_at, self.span), 1) / 3600
+        tracked = waiting + acting
+        return {
+            'xp': int(xp),
+            'gold': int(gold),
+            'energy': int(energy),
+            'battles': int(battles),
+            'xp_per_hour': xp / hours,
+            'gold_per_hour': gold / hours,
+            'xp_per_energy': xp / energy if energy else 0.0,
+            'waiting_share': waiting / tracked if tracked else 0.0
+        }
+
+
+class EconomyTracker:
+    """Rolling windows fed by battle rewards, energy use and state time"""
+
+    def __init__(self, log_interval=3600):
+        now = time.monotonic()
+        self.windows = {name: RollingWindow(span, now=now) for name, span in WINDOWS}
+        self.log_interval = log_interval
+        self.last_logged = now
+
+    def add(self, field, amount):
+        now = time.monotonic()
+        for window in self.windows.values():
+            window.add(field, amount, now)
+
+    def add_battle(self, xp, gold):
+        """Rewards of one finished battle (0/0 for lost or escaped ones)"""
+        self.add(BATTLES, 1)
+        self.add_rewards(xp, gold)
+
+    def add_rewards(self, xp, gold):
+        """XP and gold from a battle or an encounter (camp, trap, ...)"""
+        if xp:
+            self.add(XP, xp)
+        if gold:
+            self.add(GOLD, gold)
+        self.publish()
+
+    def use_energy(self, amount=1):
+        self.add(ENERGY, amount)
+        self.publish()
+
+    def add_time(self, seconds, waiting):
+        """Time spent in a bot state, waiting for HP/energy/window or acting"""
+        self.add(WAITING if waiting else ACTING, seconds)
+
+    def stats(self):
+        now = time.monotonic()
+        return {name: window.stats(now) for name, window in self.windows.items()}
+
+    def publish(self):
+        """Update the rolling-window gauges"""
+        if not metrics.registry.enabled:
+            return
+        for name, stats in self.stats().items():
+            XP_PER_HOUR.set(stats['xp_per_hour'], window=name)
+            GOLD_PER_HOUR.set(stats['gold_per_hour'], window=name)
+            XP_PER_ENERGY.set(stats['xp_per_energy'], window=name)
+            WAITING_SHARE.set(stats['waiting_share'], window=name)
+
+    def summary(self):
+        lines = []
+        for name, stats in self.stats().items():
+            lines.append(f"  {name:<4} {stats['xp_per_hour']:7.1f} XP/h {stats['gold_per_hour']:7.1f} gold/h "
+                         f"{stats['xp_per_energy']:5.1f} XP/energy {stats['waiting_share']:4.0%} waiting "
+                         f"({stats['battles']} battles, {stats['energy']} energy)")
+        return '\n'.join(lines)
+
+    def log_if_due(self):
+        """Log the summary every log_interval seconds"""
+        now = time.monotonic()
+        if now - self.last_logged >= self.log_interval:
+            self.last_logged = now
+            self.log_summary()
+
+    def log_summary(self):
+        if self.windows['7d'].totals[BATTLES] or self.windows['7d'].totals[ENERGY]:
+            logger.info(f"Economy:\n{self.summary()}")
+
+
+_tracker = None
+
+
+def get_tracker():
+    """Process-wide tracker shared by GameBot runs"""
+    global _tracker
+    if _tracker is None:
+        _tracker = EconomyTracker()
+    return _tracker
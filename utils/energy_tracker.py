@@ -7,6 +7,7 @@ import os
 from datetime import datetime, time
 from pathlib import Path
 
+from utils import metrics
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -53,6 +54,8 @@ class EnergyTracker:
             }
             with open(self.data_file, 'w') as f:
                 json.dump(data, f)
+            metrics.ENERGY_USED.set(self.energy_used)
+            metrics.ENERGY_LIMIT.set(self.daily_limit)
         except Exception as e:
             logger.error(f"Error saving energy data: {e}")
     
@@ -0,0 +1,185 @@
+"""
+Data-driven fight or flee decisions from recorded battle outcomes
+"""
+
+import asyncio
+import json
+import re
+from pathlib import Path
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def normalize_mob_name(name):
+    """Normalize mob name for lookups (drop emoji, level suffix and extra spaces)"""
+    if not name:
+        return ""
+    name = re.sub(r'\s*[\(\[].*?[\)\]]\s*$', '', name)
+    name = re.sub(r'^[^\w]+|[^\w]+$', '', name)
+    return ' '.join(name.split())
+
+
+class EscapeAdvisor:
+    """
+    Decides whether to fight or flee a mob using per-mob statistics at the current level.
+
+    Energy is already spent when a mob appears, so a fight is worth it when its expected
+    reward beats what the HP regeneration time it causes would earn at the farm's average
+    rate (reward per hour of energy + HP regeneration):
+        value = xp + gold_weight * gold - farm_rate * hp_loss / hp_regen_per_hour
+    Mobs that defeat us too often are always fled.
+    """
+
+    def __init__(self, config, table_path=None):
+        """Initialize advisor with manual escape list and saved decision table"""
+        self.config = config
+        self.table_path = Path(table_path or config.ESCAPE_TABLE_PATH)
+        self.manual_escape = frozenset()
+        self.set_manual_escape(config.ESCAPE_MOBS + config.ESCAPE_MOBS_FROM_FILE)
+        self.level = None
+        self.table = {}  # normalized mob name -> stats and decision
+        self.farm_xp_per_hour = 0.0
+
+        # Regeneration rates observed from profile, used to price HP loss in time
+        self.hp_per_minute = None
+        self.energy_minutes = None
+
+        self.battles_since_refresh = 0
+        self.load()
+
+    def set_manual_escape(self, mobs):
+        """Replace the manual escape list (config.py ESCAPE_MOBS plus ESCAPE_MOBS_FILE)"""
+        self.manual_escape = frozenset(normalize_mob_name(mob) for mob in mobs)
+
+    def load(self):
+        """Load learned decision table from file"""
+        if not self.table_path.exists():
+            return
+        try:
+            with open(self.table_path, 'r') as f:
+                data = json.load(f)
+            self.level = data.get('level')
+            self.table = data.get('mobs', {})
+            self.farm_xp_per_hour = data.get('farm_xp_per_hour', 0.0)
+            self.hp_per_minute = data.get('hp_per_minute')
+            self.energy_minutes = data.get('energy_minutes')
+            logger.info(f"Loaded escape table: {len(self.table)} mobs (level {self.level})")
+        except Exception as e:
+            logger.error(f"Error loading escape table: {e}")
+
+    def save(self):
+        """Save learned decision table to file"""
+        try:
+            data = {
+                'level': self.level,
+                'farm_xp_per_hour': self.farm_xp_per_hour,
+                'hp_per_minute': self.hp_per_minute,
+                'energy_minutes': self.energy_minutes,
+                'mobs': self.table
+            }
+            tmp_path = self.table_path.with_suffix('.tmp')
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            tmp_path.replace(self.table_path)
+        except Exception as e:
+            logger.error(f"Error saving escape table: {e}")
+
+    def observe_regen(self, current_hp, max_hp, hp_regen_minutes, energy_regen_minutes):
+        """Update regeneration rate estimates from a profile check"""
+        if hp_regen_minutes and max_hp > current_hp:
+            self.hp_per_minute = (max_hp - current_hp) / hp_regen_minutes
+        if energy_regen_minutes:
+            self.energy_minutes = max(self.energy_minutes or 0, energy_regen_minutes)
+
+    def should_escape(self, mob_name):
+        """O(1) fight or flee decision, returns (escape, reason)"""
+        name = normalize_mob_name(mob_name)
+        if name in self.manual_escape:
+            return True, "in ESCAPE_MOBS list"
+        entry = self.table.get(name)
+        if entry is None:
+            return False, "no statistics yet"
+        if entry['escape']:
+            return True, entry['reason']
+        return False, entry['reason']
+
+    def build_table(self, stats, level):
+        """Build decision table from BattleStore.mob_stats() rows for one level"""
+        hp_per_minute = self.hp_per_minute or self.config.ESCAPE_DEFAULT_HP_PER_MINUTE
+        energy_minutes = self.energy_minutes or self.config.ESCAPE_DEFAULT_ENERGY_MINUTES
+        gold_weight = self.config.ESCAPE_GOLD_WEIGHT
+
+        # Farm average rate: reward per hour of energy + HP regeneration over all fought battles
+        total_reward = 0.0
+        total_minutes = 0.0
+        for row in stats:
+            fought = row['battles'] - (row['escapes'] or 0)
+            if fought <= 0:
+                continue
+            total_reward += fought * ((row['avg_xp'] or 0) + gold_weight * (row['avg_gold'] or 0))
+            total_minutes += fought * (energy_minutes + max(row['avg_hp_loss'] or 0, 0) / hp_per_minute)
+        farm_rate = total_reward / (total_minutes / 60) if total_minutes else 0.0
+
+        table = {}
+        for row in stats:
+            battles = row['battles']
+            if battles < self.config.ESCAPE_MIN_BATTLES:
+                continue
+            fought = battles - (row['escapes'] or 0)
+            defeat_rate = (row['defeats'] or 0) / fought if fought else 0.0
+            reward = (row['avg_xp'] or 0) + gold_weight * (row['avg_gold'] or 0)
+            hp_loss = max(row['avg_hp_loss'] or 0, 0)
+            regen_hours = hp_loss / hp_per_minute / 60
+            value = reward - farm_rate * regen_hours
+
+            if defeat_rate > self.config.ESCAPE_MAX_DEFEAT_RATE:
+                escape, reason = True, f"defeat rate {defeat_rate:.0%}"
+            elif value < 0:
+                escape, reason = True, f"costs more regen than it pays ({value:.1f} XP)"
+            else:
+                escape, reason = False, f"worth {value:.1f} XP after regen cost"
+
+            table[normalize_mob_name(row['mob'])] = {
+                'battles': battles,
+                'defeat_rate': round(defeat_rate, 4),
+                'avg_hp_loss': round(hp_loss, 1),
+                'avg_xp': round(row['avg_xp'] or 0, 2),
+                'avg_gold': round(row['avg_gold'] or 0, 2),
+                'value': round(value, 2),
+                'escape': escape,
+                'reason': reason
+            }
+
+        return table, farm_rate
+
+    async def refresh(self, store, level):
+        """Recompute decision table from recorded battles at the given level"""
+        if store is None:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            stats = await loop.run_in_executor(None, store.mob_stats, level)
+        except Exception as e:
+            logger.error(f"Error reading battle statistics: {e}")
+            return
+
+        previous = self.table if self.level == level else {}
+        self.table, self.farm_xp_per_hour = self.build_table(stats, level)
+        self.level = level
+        self.battles_since_refresh = 0
+
+        for mob, entry in self.table.items():
+            old = previous.get(mob)
+            if old is None or old['escape'] != entry['escape']:
+                action = "FLEE" if entry['escape'] else "FIGHT"
+                logger.info(f"Escape table: {mob} -> {action} ({entry['reason']}, {entry['battles']} battles)")
+
+        await loop.run_in_executor(None, self.save)
+
+    async def battle_finished(self, store, level):
+        """Count a finished battle and refresh the table periodically or on level change"""
+        self.battles_since_refresh += 1
+        if level != self.level or self.battles_since_refresh >= self.config.ESCAPE_REFRESH_BATTLES:
+            await self.refresh(store, level)
@@ -0,0 +1,198 @@
+"""
+Thin wrapper around TelegramClient used by all bots.
+Every game API call (messages, commands, button clicks) goes through here,
+so metrics, network tracing spans and traffic recording are added in one
+place instead of at every call site. Calls wait while the client is paused
+(daemon pause command), so any running bot stops at its next API call.
+
+History reads are single-flight: a get_messages(chat, limit=N) issued while
+another one for the same chat with limit >= N is in flight waits for that
+request and gets the first N messages of its result instead of going to the
+network again.
+
+Telethon sleeps through FloodWaits up to its flood_sleep_threshold (and logs
+them itself); the client may be shared, so that setting is left alone. The
+longer ones it raises are counted here on their way out, in
+ostromag_flood_wait_seconds_total and in flood_waits/flood_wait_seconds for the
+exit summary and the daemon status.
+"""
+
+import asyncio
+
+from utils import metrics, tracing, traffic_log, update_filter
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+def _peer_key(entity):
+    """Same key for every form of one chat (entity, input peer, username)"""
+    return getattr(entity, 'user_id', None) or getattr(entity, 'id', None) or entity
+
+
+class GameClient:
+    """Delegates to the Telethon client and counts/times game API calls"""
+
+    def __init__(self, client):
+        """Wrap a TelegramClient (or a stand-in with the same methods)"""
+        self.client = client
+        self.last_seen_id = 0  # Newest game chat message id seen, for catch-up after reconnect
+        self.peer_cache = None
+        self.cached_username = None
+        self.peers = {}  # username -> resolved peer, shared by every bot using this client
+        self.watching = False
+        self.history_in_flight = {}  # chat key -> (limit, future) of the history read on the wire
+        self.history_fetches = 0
+        self.history_coalesced = 0
+        self.flood_waits = 0  # FloodWaits raised by Telethon and the seconds they asked for
+        self.flood_wait_seconds = 0
+        self.resumed = asyncio.Event()
+        self.resumed.set()
+
+    @classmethod
+    def wrap(cls, client):
+        """GameClient for client, reusing it if it already is one (daemon shares one between bots)"""
+        return client if isinstance(client, cls) else cls(client)
+
+    def pause(self):
+        self.resumed.clear()
+
+    def resume(self):
+        self.resumed.set()
+
+    @property
+    def paused(self):
+        return not self.resumed.is_set()
+
+    def __getattr__(self, name):
+        """Anything not wrapped goes straight to the underlying client"""
+        return getattr(self.client, name)
+
+    async def _call(self, kind, call):
+        """Await call() through metrics.track_api, counting the FloodWaits it raises"""
+        try:
+            return await metrics.track_api(kind, call())
+        except Exception as e:
+            seconds = getattr(e, 'seconds', None)
+            if type(e).__name__ == 'FloodWaitError' and seconds:
+                self.flood_waits += 1
+                self.flood_wait_seconds += seconds
+                metrics.FLOOD_WAIT_SECONDS.inc(seconds)
+                logger.warning(f"FloodWait on {kind}: {seconds}s required")
+            raise
+
+    async def get_entity(self, entity):
+        """Resolve a peer"""
+        await self.resumed.wait()
+        with tracing.span('get_entity', tracing.NETWORK):
+            return await self._call('get_entity', lambda: self.client.get_entity(entity))
+
+    async def resolve_peer(self, username, peer_cache=None):
+        """Game bot peer from the local cache, or get_entity (then cached)"""
+        if username in self.peers:
+            return self.peers[username]
+        self.peer_cache = peer_cache
+        if peer_cache:
+            peer = peer_cache.get(username)
+            if peer is not None:
+                self.cached_username = username
+                self.peers[username] = peer
+                return peer
+        entity = await self.get_entity(username)
+        if peer_cache:
+            peer_cache.put(username, entity)
+        self.peers[username] = entity
+        return entity
+
+    def _check_peer(self, error):
+        """Drop a cached peer Telegram no longer accepts, the next start resolves it again"""
+        if self.cached_username and type(error).__name__ in ('PeerIdInvalidError', 'UserIdInvalidError'):
+            self.peer_cache.invalidate(self.cached_username)
+            self.peers.pop(self.cached_username, None)
+            self.cached_username = None
+
+    async def send_message(self, entity, message, **kwargs):
+        """Send a text command"""
+        await self.resumed.wait()
+        with tracing.span('send_message', tracing.NETWORK):
+            try:
+                sent = await self._call('send_message', lambda: self.client.send_message(entity, message, **kwargs))
+            except Exception as e:
+                self._check_peer(e)
+                raise
+        recorder = traffic_log.get_recorder()
+        if recorder:
+            recorder.record_send(message, sent)
+        self.seen([sent])
+        return sent
+
+    async def get_messages(self, entity, *args, **kwargs):
+        """Fetch chat history, latest-messages reads of one chat share a request in flight"""
+        await self.resumed.wait()
+        limit = kwargs.get('limit')
+        if args or list(kwargs) != ['limit'] or not isinstance(limit, int):
+            return await self._fetch_messages(entity, *args, **kwargs)  # ids=, min_id=, ... go straight out
+        
+        key = _peer_key(entity)
+        flight = self.history_in_flight.get(key)
+        if flight and flight[0] >= limit:
+            self.history_coalesced += 1
+            metrics.API_COALESCED.inc(kind='get_messages')
+            with tracing.span('get_messages', tracing.NETWORK, coalesced=True):
+                result = await asyncio.shield(flight[1])
+            return result[:limit]
+        
+        self.history_fetches += 1
+        future = asyncio.ensure_future(self._fetch_messages(entity, limit=limit))
+        self.history_in_flight[key] = (limit, future)
+        future.add_done_callback(lambda done: self._landed(key, done))
+        return await asyncio.shield(future)  # Joined callers still get it if this one is cancelled
+
+    def _landed(self, key, future):
+        if self.history_in_flight.get(key, (None, None))[1] is future:
+            del self.history_in_flight[key]
+        if not future.cancelled():
+            future.exception()  # Retrieved here too, so an error nobody awaits is not logged as lost
+
+    async def _fetch_messages(self, entity, *args, **kwargs):
+        with tracing.span('get_messages', tracing.NETWORK):
+            try:
+                result = await self._call('get_messages', lambda: self.client.get_messages(entity, *args, **kwargs))
+            except Exception as e:
+                self._check_peer(e)
+                raise
+        self.seen(result if isinstance(result, list) else [result])
+        return result
+
+    def log_summary(self):
+        if self.flood_waits:
+            logger.info(f"FloodWaits: {self.flood_waits}, {self.flood_wait_seconds}s required")
+        if self.history_coalesced:
+            total = self.history_fetches + self.history_coalesced
+            logger.info(f"History reads: {total}, {self.history_coalesced} served by a request already in flight "
+                        f"({self.history_coalesced / total:.0%} duplicates)")
+
+    def seen(self, messages):
+        """Advance last_seen_id past fetched or sent messages"""
+        for msg in messages:
+            msg_id = getattr(msg, 'id', None)
+            if msg_id and msg_id > self.last_seen_id:
+                self.last_seen_id = msg_id
+
+    async def click(self, msg, *args, **kwargs):
+        """Click an inline button on a message"""
+        await self.resumed.wait()
+        recorder = traffic_log.get_recorder()
+        if recorder:
+            recorder.record_click(msg, args)
+        with tracing.span('click', tracing.NETWORK):
+            return await self._call('click', lambda: msg.click(*args, **kwargs))
+
+    def watch_chat(self, chat):
+        """Game chat resolved: filter updates to it and record its traffic, if enabled (once per client)"""
+        if self.watching:
+            return
+        self.watching = True
+        update_filter.install(self.client, chat)
+        recorder = traffic_log.get_recorder()
+        if recorder:
+            recorder.attach(self.client, chat)
@@ -0,0 +1,151 @@
+"""
+Human-like delays per action kind, held to a share of wall time.
+
+Every deliberate pause before a click or command goes through delay(config, kind).
+Each kind has its own profile HUMAN_DELAY_<KIND> = "median,sigma,floor,cap":
+a log-normal draw around median (sigma is the spread of its logarithm), clamped
+to [floor, cap]. Battle clicks are quick and frequent, profile checks slow and
+rare, so one uniform range no longer taxes every click alike.
+
+HUMAN_DELAY_BUDGET is the largest share of wall time the delays may take over
+the last HUMAN_DELAY_BUDGET_WINDOW seconds. Delay and wall time are kept as
+exponentially decayed sums, wall time starting from one full window (as if
+the bot had been idle before it started, so the first delays are not cut); a
+draw that would push the share over the budget is cut to what is left, but
+never below the profile floor. Trimmed time is counted, so the summary shows
+both what the delays cost and what the budget saved.
+
+Profiles and budget are read from the config on every call, so hot reloads
+(utils/config_reload.py) take effect on the next delay.
+"""
+
+import math
+import random
+import time
+
+from utils import metrics, tracing
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Action kinds, each with a HUMAN_DELAY_<KIND> profile in the config
+BATTLE_CLICK = 'battle_click'
+MENU_NAV = 'menu_nav'
+SHOP_PURCHASE = 'shop_purchase'
+PROFILE_CHECK = 'profile_check'
+KINDS = (BATTLE_CLICK, MENU_NAV, SHOP_PURCHASE, PROFILE_CHECK)
+
+DELAY_SECONDS = metrics.Counter('ostromag_human_delay_seconds_total', 'Seconds spent in human-like delays',
+                                ('profile',))
+DELAY_TRIMMED = metrics.Counter('ostromag_human_delay_trimmed_seconds_total',
+                                'Seconds cut from human-like delays by the budget', ('profile',))
+DELAY_SHARE = metrics.Gauge('ostromag_human_delay_share', 'Share of recent wall time spent in human-like delays')
+
+
+# Config attribute of each kind's profile
+PROFILE_SETTINGS = {kind: f"HUMAN_DELAY_{kind.upper()}" for kind in KINDS}
+
+
+def draw(profile, rng=random):
+    """Seconds for one action from a (median, sigma, floor, cap) profile"""
+    median, sigma, floor, cap = profile
+    if median <= 0:
+        return max(floor, 0.0)
+    return min(max(rng.lognormvariate(math.log(median), sigma), floor), cap)
+
+
+class DelayBudget:
+    """Decayed sums of delay and wall time, caps the share of delays"""
+
+    def __init__(self, now=None):
+        self.delayed = 0.0
+        self.wall = None  # Seeded with one window on first use
+        self.updated = time.monotonic() if now is None else now
+
+    def decay(self, window, now):
+        if self.wall is None:
+            self.wall = float(window)
+        elapsed = max(now - self.updated, 0.0)
+        self.updated = now
+        factor = math.exp(-elapsed / window)
+        self.delayed *= factor
+        # Decayed integral of the elapsed wall time (equals elapsed for short gaps)
+        self.wall = self.wall * factor + window * (1 - factor)
+
+    def share(self, window, now=None):
+        self.decay(window, time.monotonic() if now is None else now)
+        return self.delayed / self.wall if self.wall else 0.0
+
+    def grant(self, seconds, floor, share, window, now=None):
+        """Seconds allowed out of a drawn delay, at least floor"""
+        self.decay(window, time.monotonic() if now is None else now)
+        if share < 1:
+            # Largest d with (delayed + d) / (wall + d) <= share
+            seconds = min(seconds, max((share * self.wall - self.delayed) / (1 - share), 0.0))
+        granted = max(seconds, floor)
+        self.delayed += granted
+        return granted
+
+
+class Humanizer:
+    """Per-kind delay draws and stats sharing one budget"""
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+        self.budget = DelayBudget()
+        self.stats = {}  # kind -> [count, seconds, trimmed]
+
+    def next_delay(self, config, kind):
+        """Seconds to wait before the next action of this kind"""
+        profile = getattr(config, PROFILE_SETTINGS[kind])
+        wanted = draw(profile, self.rng)
+        granted = self.budget.grant(wanted, profile[2], config.HUMAN_DELAY_BUDGET, config.HUMAN_DELAY_BUDGET_WINDOW)
+        stats = self.stats.setdefault(kind, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += granted
+        stats[2] += wanted - granted if wanted > granted else 0.0
+        if metrics.registry.enabled:
+            DELAY_SECONDS.inc(granted, profile=kind)
+            if wanted > granted:
+                DELAY_TRIMMED.inc(wanted - granted, profile=kind)
+            DELAY_SHARE.set(self.budget.share(config.HUMAN_DELAY_BUDGET_WINDOW))
+        return granted
+
+    def totals(self, window):
+        """Delay and trimmed seconds so far, and the recent share of wall time"""
+        return {
+            'count': sum(count for count, _, _ in self.stats.values()),
+            'seconds': sum(seconds for _, seconds, _ in self.stats.values()),
+            'trimmed': sum(trimmed for _, _, trimmed in self.stats.values()),
+            'share': self.budget.share(window)
+        }
+
+    def summary(self):
+        """One line per kind that ran: count, mean delay, total and trimmed time"""
+        lines = []
+        for kind in KINDS:
+            if kind in self.stats:
+                count, seconds, trimmed = self.stats[kind]
+                lines.append(f"  {kind:<14} x{count:<6} {seconds / count:5.2f}s avg {seconds:9.0f}s total "
+                             f"{trimmed:7.0f}s trimmed")
+        return '\n'.join(lines)
+
+    def log_summary(self):
+        if self.stats:
+            logger.info(f"Human delays:\n{self.summary()}")
+
+
+_humanizer = None
+
+
+def get_humanizer():
+    """Process-wide humanizer, so the budget covers every bot in the process"""
+    global _humanizer
+    if _humanizer is None:
+        _humanizer = Humanizer()
+    return _humanizer
+
+
+async def delay(config, kind):
+    """Sleep a human-like delay before an action of this kind"""
+    await tracing.sleep(get_humanizer().next_delay(config, kind), "human_delay")
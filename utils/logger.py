@@ -1,34 +1,189 @@
 """
 Logger configuration
+
+Log calls only enqueue the record; formatting and output happen on a
+QueueListener thread so slow stdout pipes or disk never stall the event loop.
+Only msg % args (and a traceback, if any) is rendered when the record is
+queued, like the stdlib QueueHandler does, so the line shows the values as they
+were at the call. Use %-style arguments (logger.info("HP: %s", hp)) on hot
+paths so records below the log level are never formatted at all.
+
+Outputs are configured from the LOG_JSON, LOG_FILE, LOG_FILE_MAX_BYTES and
+LOG_FILE_BACKUPS environment variables (.env), read here rather than from
+Config because the first logger is set up while modules are still importing.
 """
 
+import atexit
+import contextvars
+import copy
+import gzip
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import shutil
 import sys
 from datetime import datetime
 
+# Per-task context fields (e.g. account) added to every record
+_log_context = contextvars.ContextVar('log_context', default={})
+
+_queue = queue.SimpleQueue()
+_queue_handler = None
+_listener = None
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(context)s%(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def set_log_context(**fields):
+    """Attach context fields (account=..., bot=...) to records logged from the current task"""
+    context = dict(_log_context.get())
+    context.update({key: value for key, value in fields.items() if value is not None})
+    _log_context.set(context)
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves all but the message text to the listener thread"""
+
+    def prepare(self, record):
+        """
+        Copy of the record with msg % args and any traceback rendered now (arguments
+        may be mutated or tracebacks freed before the listener gets to the record)
+        and the task's context attached; timestamps, context prefix and JSON are
+        formatted by the output handlers.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        record.context_fields = _log_context.get()
+        return record
+
+
+_exception_formatter = logging.Formatter()
+
+
+class TextFormatter(logging.Formatter):
+    """Plain text formatter with optional [key=value] context prefix"""
+
+    def format(self, record):
+        """Format record as text line"""
+        fields = getattr(record, 'context_fields', None)
+        record.context = ''.join(f"[{key}={value}] " for key, value in fields.items()) if fields else ''
+        return super().format(record)
+
+
+class JsonFormatter(logging.Formatter):
+    """JSON-lines formatter"""
+
+    def format(self, record):
+        """Format record as one JSON object"""
+        data = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        fields = getattr(record, 'context_fields', None)
+        if fields:
+            data.update(fields)
+        if record.exc_info:
+            data['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def _gzip_rotator(source, dest):
+    """Compress rotated log file"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _build_handlers(json_output, log_file, max_bytes, backups, level):
+    """Create output handlers run by the listener thread"""
+    formatter = JsonFormatter() if json_output else TextFormatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
+
+    # Console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(level)
+    console_handler.setFormatter(formatter)
+    handlers = [console_handler]
+
+    # Size-rotated file sink, rotated files are gzip-compressed
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                                            backupCount=backups, encoding='utf-8')
+        file_handler.namer = lambda name: name + '.gz'
+        file_handler.rotator = _gzip_rotator
+        file_handler.setLevel(level)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    return handlers
+
+
+def configure_logging(json_output=None, log_file=None, max_bytes=None, backups=None, level=None):
+    """(Re)configure log outputs; arguments default to LOG_* environment variables"""
+    global _queue_handler, _listener
+
+    if json_output is None:
+        json_output = os.getenv('LOG_JSON', 'False').lower() == 'true'
+    if log_file is None:
+        log_file = os.getenv('LOG_FILE', '')
+    if max_bytes is None:
+        max_bytes = int(os.getenv('LOG_FILE_MAX_BYTES', str(10 * 1024 * 1024)))
+    if backups is None:
+        backups = int(os.getenv('LOG_FILE_BACKUPS', '5'))
+    if level is None:
+        level = logging.DEBUG if os.getenv('DEBUG', 'False').lower() == 'true' else logging.INFO
+
+    if _listener:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+
+    if _queue_handler is None:
+        _queue_handler = ContextQueueHandler(_queue)
+    _queue_handler.setLevel(level)  # drop filtered records before they are queued
+
+    _listener = logging.handlers.QueueListener(
+        _queue, *_build_handlers(json_output, log_file, max_bytes, backups, level),
+        respect_handler_level=True
+    )
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
 
 def setup_logger(name):
-    """Setup logger with console output"""
+    """Setup logger with queued console (and optional file) output"""
     logger = logging.getLogger(name)
-    
+
     # Avoid duplicate handlers
     if logger.handlers:
         return logger
-    
+
+    if _listener is None:
+        configure_logging()
+
     logger.setLevel(logging.DEBUG)
-    
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)
-    
-    # Format
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    console_handler.setFormatter(formatter)
-    
-    # Add handler
-    logger.addHandler(console_handler)
-    
+    logger.addHandler(_queue_handler)
+
     return logger
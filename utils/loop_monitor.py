@@ -0,0 +1,195 @@
+"""
+Event loop lag monitor and optional uvloop backend.
+
+A sampler task sleeps for a fixed interval and records how late the loop
+woke it up: anything synchronous on the loop (JSON writes, log formatting,
+regex parsing) shows up as lag and delays every click scheduled behind it.
+Samples go to a bounded window for p50/p99/max reports and to the
+ostromag_event_loop_lag_seconds histogram when metrics are enabled.
+
+Lag above the slow callback threshold is logged as a blocked loop, at most
+once per SLOW_REPORT_INTERVAL: later ones in the interval are counted and
+summed up in one line with the next warning (or on stop). With
+time_callbacks (LOOP_CALLBACK_TIMING=True, off by default) each callback on
+the stock asyncio loop is timed as well, so the warning names the task that
+ran it; this replaces asyncio's Handle._run for the whole process while the
+monitor runs, so it is a diagnostic switch. uvloop runs callbacks in C and
+always reports the lag only.
+
+USE_UVLOOP=True runs the bot on uvloop when it is installed
+(pip install uvloop), falling back to asyncio otherwise.
+"""
+
+import asyncio
+import time
+from collections import deque
+
+from utils import metrics
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Seconds between slow callback warnings, the ones in between are aggregated
+SLOW_REPORT_INTERVAL = 60.0
+
+_monitor = None
+_handle_run = asyncio.events.Handle._run
+
+
+def _format_handle(handle):
+    """Task behind a callback (like asyncio debug mode prints it) or the handle itself"""
+    owner = getattr(handle._callback, '__self__', None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return f"task {owner.get_name()} ({getattr(coro, '__qualname__', coro)})"
+    return repr(handle)
+
+
+def _timed_run(handle):
+    """Handle._run replacement timing each callback on the stock loop"""
+    started = time.perf_counter()
+    try:
+        _handle_run(handle)
+    finally:
+        elapsed = time.perf_counter() - started
+        if _monitor is not None and elapsed >= _monitor.slow_callback:
+            _monitor.slow(elapsed, _format_handle(handle))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+class LoopMonitor:
+    """Samples event loop scheduling delay and reports slow callbacks"""
+
+    def __init__(self, interval=0.1, slow_callback=0.1, window=3000, time_callbacks=False,
+                 report_interval=SLOW_REPORT_INTERVAL):
+        """interval/slow_callback/report_interval in seconds, window: samples kept for percentiles"""
+        self.interval = interval
+        self.slow_callback = slow_callback
+        self.time_callbacks = time_callbacks
+        self.report_interval = report_interval
+        self.samples = deque(maxlen=window)
+        self.max_lag = 0.0
+        self.slow_callbacks = 0
+        self.next_report = 0.0
+        self.unreported = 0
+        self.unreported_max = 0.0
+        self.task = None
+        self.callbacks_timed = False
+
+    def start(self):
+        """Start sampling on the running loop"""
+        loop = asyncio.get_running_loop()
+        if self.time_callbacks and type(loop).__module__.startswith('asyncio') and self.slow_callback:
+            asyncio.events.Handle._run = _timed_run
+            self.callbacks_timed = True
+        self.task = asyncio.create_task(self.sample(), name='loop_monitor')
+        return self
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+            self.task = None
+        if self.callbacks_timed:
+            asyncio.events.Handle._run = _handle_run
+            self.callbacks_timed = False
+        self.report_unreported()
+
+    async def sample(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.observe(max(loop.time() - expected, 0.0))
+
+    def observe(self, lag):
+        self.samples.append(lag)
+        if lag > self.max_lag:
+            self.max_lag = lag
+        metrics.LOOP_LAG.observe(lag)
+        if not self.callbacks_timed and self.slow_callback and lag >= self.slow_callback:
+            self.slow(lag, None)
+
+    def slow(self, seconds, callback):
+        self.slow_callbacks += 1
+        now = time.monotonic()
+        if now < self.next_report:
+            self.unreported += 1
+            self.unreported_max = max(self.unreported_max, seconds)
+            return
+        self.report_unreported()
+        self.next_report = now + self.report_interval
+        if callback:
+            logger.warning(f"Slow callback: {callback} blocked the event loop for {seconds * 1000:.0f}ms")
+        else:
+            logger.warning(f"Event loop blocked for {seconds * 1000:.0f}ms")
+
+    def report_unreported(self):
+        """One line for the slow callbacks held back since the last warning"""
+        if self.unreported:
+            logger.warning(f"Event loop blocked {self.unreported} more times since the last warning, "
+                           f"longest {self.unreported_max * 1000:.0f}ms")
+            self.unreported = 0
+            self.unreported_max = 0.0
+
+    def stats(self):
+        ordered = sorted(self.samples)
+        return {
+            'samples': len(ordered),
+            'p50': percentile(ordered, 0.5),
+            'p99': percentile(ordered, 0.99),
+            'max': self.max_lag,
+            'slow_callbacks': self.slow_callbacks
+        }
+
+    def log_summary(self):
+        stats = self.stats()
+        if stats['samples']:
+            logger.info(f"Event loop lag: p50 {stats['p50'] * 1000:.1f}ms, p99 {stats['p99'] * 1000:.1f}ms, "
+                        f"max {stats['max'] * 1000:.1f}ms, {stats['slow_callbacks']} slow callbacks "
+                        f"({loop_backend()} loop)")
+
+
+def start(interval=0.1, slow_callback=0.1, time_callbacks=False):
+    """Start the process-wide monitor on the running loop"""
+    global _monitor
+    if _monitor is None:
+        _monitor = LoopMonitor(interval, slow_callback, time_callbacks=time_callbacks).start()
+    return _monitor
+
+
+def get_monitor():
+    return _monitor
+
+
+def stop():
+    """Stop the monitor and log its summary"""
+    global _monitor
+    if _monitor is not None:
+        _monitor.stop()
+        _monitor.log_summary()
+        _monitor = None
+
+
+def loop_backend():
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return 'no'
+    return 'uvloop' if type(loop).__module__.startswith('uvloop') else 'asyncio'
+
+
+def run(main, use_uvloop=False):
+    """asyncio.run(main), on uvloop when requested and installed"""
+    if use_uvloop:
+        try:
+            import uvloop
+        except ImportError:
+            logger.warning("USE_UVLOOP is set but uvloop is not installed (pip install uvloop) - using asyncio")
+        else:
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return asyncio.run(main)
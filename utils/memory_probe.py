@@ -0,0 +1,125 @@
+"""
+Memory probe - RSS and tracemalloc snapshots for long-running bots.
+
+The first snapshot starts tracemalloc and becomes the baseline; later
+snapshots report RSS, traced memory and the allocation sites (file:line)
+that grew the most since then. Used by the soak test
+(benchmarks/soak_test.py), the daemon's "memory" command (botctl.py memory)
+and SIGUSR1 in main.py. tracemalloc slows allocations down, so it runs only
+from the first snapshot until stop().
+"""
+
+import os
+import resource
+import sys
+import tracemalloc
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Allocations made by the probe itself are not interesting
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc is not available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryProbe:
+    """tracemalloc baseline and growth reports against it"""
+
+    def __init__(self, frames=1):
+        self.frames = frames
+        self.baseline = None
+        self.baseline_rss = 0
+        self.started_tracing = False
+
+    def start(self):
+        """Start tracing and take the baseline snapshot"""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self.started_tracing = True
+        self.baseline = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        self.baseline_rss = rss_bytes()
+        return self
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        self.baseline = None
+
+    def snapshot(self, limit=10):
+        """RSS, traced memory and the top growing allocation sites since the baseline"""
+        if self.baseline is None:
+            self.start()
+        current = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        traced, peak = tracemalloc.get_traced_memory()
+        rss = rss_bytes()
+        growth = [stat for stat in current.compare_to(self.baseline, 'lineno') if stat.size_diff > 0]
+        return {
+            'rss': rss,
+            'rss_growth': rss - self.baseline_rss,
+            'traced': traced,
+            'traced_peak': peak,
+            'top_growth': [
+                {
+                    'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                    'size': stat.size,
+                    'size_diff': stat.size_diff,
+                    'count_diff': stat.count_diff
+                }
+                for stat in growth[:limit]
+            ]
+        }
+
+
+def format_snapshot(snapshot):
+    """Human-readable report of MemoryProbe.snapshot()"""
+    lines = [f"RSS {snapshot['rss'] / 2**20:.1f}MB ({snapshot['rss_growth'] / 2**20:+.1f}MB since baseline), "
+             f"traced {snapshot['traced'] / 2**20:.1f}MB (peak {snapshot['traced_peak'] / 2**20:.1f}MB)"]
+    for site in snapshot['top_growth']:
+        lines.append(f"  {site['size_diff'] / 1024:+9.1f}KB {site['count_diff']:+7} blocks  {site['site']}")
+    return '\n'.join(lines)
+
+
+_probe = None
+
+
+def get_probe():
+    """Process-wide probe (baseline set by the first snapshot)"""
+    global _probe
+    if _probe is None:
+        _probe = MemoryProbe()
+    return _probe
+
+
+def log_snapshot(limit=10):
+    """Log a snapshot of the process-wide probe (the first call only sets the baseline)"""
+    first = get_probe().baseline is None
+    snapshot = get_probe().snapshot(limit)
+    if first:
+        logger.info(f"Memory tracing started, growth is reported from here on\n{format_snapshot(snapshot)}")
+    else:
+        logger.info(f"Memory snapshot:\n{format_snapshot(snapshot)}")
+    return snapshot
+
+
+def stop():
+    """Stop tracing for the process-wide probe"""
+    global _probe
+    if _probe is not None:
+        _probe.stop()
+        _probe = None
@@ -0,0 +1,207 @@
+"""
+Lightweight in-process metrics with a local Prometheus /metrics endpoint.
+
+Metrics are no-ops until start_metrics_server() enables the registry, so
+instrumented code costs one attribute check when metrics are disabled.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class Registry:
+    """Holds all metrics and renders them in Prometheus text format"""
+
+    def __init__(self):
+        self.enabled = False
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus text exposition of all metrics"""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def _label_str(names, values, extra=None):
+    """Render label set as {a="1",b="2"}"""
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.values = {}
+        registry.register(self)
+
+    def inc(self, amount=1, **labels):
+        if not registry.enabled:
+            return
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(tuple(labels.get(name, '') for name in self.label_names), 0)
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield f"{self.name}{_label_str(self.label_names, key)} {value}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        if not registry.enabled:
+            return
+        self.values[tuple(labels.get(name, '') for name in self.label_names)] = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, buckets, labels=()):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.label_names = tuple(labels)
+        self.series = {}  # label values -> [bucket counts..., sum, count]
+        registry.register(self)
+
+    def observe(self, value, **labels):
+        if not registry.enabled:
+            return
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [0] * (len(self.buckets) + 2)
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self):
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                labels = _label_str(self.label_names, key, 'le="%s"' % bound)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _label_str(self.label_names, key, 'le="+Inf"')
+            yield f"{self.name}_bucket{labels} {series[-1]}"
+            yield f"{self.name}_sum{_label_str(self.label_names, key)} {series[-2]}"
+            yield f"{self.name}_count{_label_str(self.label_names, key)} {series[-1]}"
+
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 10, 30)
+
+API_CALLS = Counter('ostromag_api_calls_total', 'Telegram API calls by kind', ('kind',))
+API_ERRORS = Counter('ostromag_api_errors_total', 'Failed Telegram API calls by kind', ('kind',))
+API_COALESCED = Counter('ostromag_api_coalesced_total', 'API calls served by an identical request in flight', ('kind',))
+API_LATENCY = Histogram('ostromag_api_latency_seconds', 'Telegram API call round-trip time',
+                        LATENCY_BUCKETS, ('kind',))
+REPLY_LATENCY = Histogram('ostromag_reply_latency_seconds', 'Time from our command to the game reply',
+                          LATENCY_BUCKETS, ('command',))
+BATTLES = Counter('ostromag_battles_total', 'Battles by outcome', ('outcome',))
+BATTLE_ROUNDS = Histogram('ostromag_battle_rounds', 'Actions taken per battle', (1, 2, 3, 5, 8, 12, 20, 30))
+ESCAPE_ATTEMPTS = Counter('ostromag_escape_attempts_total', 'Escape button clicks')
+DONT_RUSH = Counter('ostromag_dont_rush_total', "'Don't rush' replies from the game", ('bot',))
+FLOOD_WAIT_SECONDS = Counter('ostromag_flood_wait_seconds_total', 'Seconds requested by FloodWait errors')
+ENERGY_USED = Gauge('ostromag_energy_used', 'Energy used since the last daily reset')
+ENERGY_LIMIT = Gauge('ostromag_energy_limit', 'Daily energy limit (0 = unlimited)')
+LOOP_LAG = Histogram('ostromag_event_loop_lag_seconds', 'Event loop scheduling delay',
+                     (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1))
+
+
+async def track_api(kind, awaitable):
+    """Await an API call while counting it and timing its round-trip"""
+    if not registry.enabled:
+        return await awaitable
+    started = time.perf_counter()
+    try:
+        return await awaitable
+    except Exception:
+        API_ERRORS.inc(kind=kind)
+        raise
+    finally:
+        API_CALLS.inc(kind=kind)
+        API_LATENCY.observe(time.perf_counter() - started, kind=kind)
+
+
+def observe_reply(command, sent, messages):
+    """Record game reply latency from server timestamps of our message and the first reply"""
+    if not registry.enabled or sent is None or not getattr(sent, 'date', None):
+        return
+    replies = [msg for msg in messages if msg.id > sent.id and msg.date]
+    if replies:
+        first = min(replies, key=lambda msg: msg.id)
+        REPLY_LATENCY.observe(max((first.date - sent.date).total_seconds(), 0.0), command=command)
+
+
+async def _sample_loop_lag(interval):
+    """Measure how late the event loop wakes us up"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(loop.time() - expected, 0.0))
+
+
+async def _handle_request(reader, writer):
+    """Minimal HTTP handler serving /metrics"""
+    try:
+        request_line = await reader.readline()
+        while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+            pass
+        parts = request_line.decode('latin-1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+            body = registry.render().encode()
+            status = '200 OK'
+        else:
+            body = b'Not Found\n'
+            status = '404 Not Found'
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                     f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+    except Exception as e:
+        logger.debug(f"Metrics request failed: {e}")
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host='127.0.0.1', port=9108, lag_interval=0.5):
+    """Enable metrics and serve them at http://host:port/metrics (lag_interval 0: lag sampled elsewhere)"""
+    registry.enabled = True
+    server = await asyncio.start_server(_handle_request, host, port)
+    lag_task = asyncio.create_task(_sample_loop_lag(lag_interval)) if lag_interval else None
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return server, lag_task
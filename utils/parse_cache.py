@@ -0,0 +1,97 @@
+"""
+Memoized parse results per message version.
+
+The bots re-read the same messages many times (the HP wait rescans the last
+messages every 30 s, battle rounds re-read the battle message, the utility
+bots re-check the same menus), so parser and classifier results are kept in
+a bounded LRU keyed by (chat, message id, edit_date, parse kind). The stored
+text is compared on a hit, so an edit within the same second as the previous
+one (edit_date has one second resolution) is parsed again instead of served
+stale.
+
+One process-wide cache (get_cache) is shared by GameBot, BuyingBot and
+DisassemblyBot, which matters when the daemon runs them on one client.
+Callers get their own copy of dict and list results, so a bot correcting a
+parsed value in place (e.g. a shop price) cannot change what the cache, or
+another bot, sees for that message.
+"""
+
+from collections import OrderedDict
+
+from utils import metrics
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+LOOKUPS = metrics.Counter('ostromag_parse_cache_total', 'Parse cache lookups', ('kind', 'result'))
+
+_MISSING = object()
+
+
+def _copy(result):
+    """Copy of a parse result's dicts and lists (other values are immutable)"""
+    if isinstance(result, dict):
+        return {key: _copy(value) for key, value in result.items()}
+    if isinstance(result, list):
+        return [_copy(value) for value in result]
+    return result
+
+
+class ParseCache:
+    """Bounded LRU of parse results, maxsize 0 disables caching"""
+
+    def __init__(self, maxsize=2048):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, msg, kind, parse):
+        """parse(msg) result for this message version, computed once"""
+        text = getattr(msg, 'text', None)
+        msg_id = getattr(msg, 'id', None)
+        if not self.maxsize or msg_id is None:
+            return parse(msg)
+
+        key = (getattr(msg, 'chat_id', None), msg_id, getattr(msg, 'edit_date', None), kind)
+        entry = self.entries.get(key, _MISSING)
+        if entry is not _MISSING and entry[0] == text:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            LOOKUPS.inc(kind=kind, result='hit')
+            return _copy(entry[1])
+
+        self.misses += 1
+        LOOKUPS.inc(kind=kind, result='miss')
+        result = parse(msg)
+        self.entries[key] = (text, result)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return _copy(result)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.entries),
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def log_summary(self):
+        stats = self.stats()
+        if stats['hits'] or stats['misses']:
+            logger.info(f"Parse cache: {stats['hits']} hits, {stats['misses']} misses "
+                        f"({stats['hit_rate']:.0%} hit rate), {stats['size']} entries")
+
+
+_cache = None
+
+
+def get_cache(maxsize=2048):
+    """Process-wide cache shared by all bots (maxsize applies on first call)"""
+    global _cache
+    if _cache is None:
+        _cache = ParseCache(maxsize)
+    return _cache
@@ -3,13 +3,81 @@ Simplified Game message parser
 """
 
 import re
+
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Message kinds (GameParser.classify), checked in this order
+BATTLE_WON = 'battle_won'
+BATTLE_LOST = 'battle_lost'
+NOT_IN_BATTLE = 'not_in_battle'
+ENEMY_FLED = 'enemy_fled'
+ESCAPED = 'escaped'
+ESCAPE_FAILED = 'escape_failed'
+DONT_RUSH = 'dont_rush'
+PROFILE = 'profile'
+ENCOUNTER = 'encounter'
+
+# Kind -> text fragments that must all be present
+MESSAGE_KINDS = (
+    (BATTLE_WON, ("Ви отримали:",)),
+    (BATTLE_LOST, ("Ви зазнали поразки!",)),
+    (NOT_IN_BATTLE, ("Ви не перебуваєте в бою",)),
+    (ENEMY_FLED, ("втік",)),
+    (ESCAPED, ("Вам вдалося втекти!",)),
+    (ESCAPE_FAILED, ("Втеча не вдалася!",)),
+    (DONT_RUSH, ("не поспішайте",)),
+    (PROFILE, ("Рівень", "Здоров'я:")),
+    (ENCOUNTER, ("З'явився",)),
+)
+
+
+def classify_text(text):
+    """Message kind of a game message text, None if it is none of the known kinds"""
+    if not text:
+        return None
+    for kind, fragments in MESSAGE_KINDS:
+        if all(fragment in text for fragment in fragments):
+            return kind
+    return None
+
 
 class GameParser:
-    """Parse basic game messages"""
+    """
+    Parse basic game messages.
+    The parse_* methods work on text; the message methods (classify, profile,
+    shop_catalog, ...) go through the shared parse cache when one is given,
+    so each message version is parsed once.
+    """
+    
+    def __init__(self, cache=None):
+        """cache: utils.parse_cache.ParseCache or None to always parse"""
+        self.cache = cache
+    
+    def cached(self, msg, kind, parse):
+        if self.cache is None:
+            return parse(msg)
+        return self.cache.get(msg, kind, parse)
+    
+    def classify(self, msg):
+        """Message kind constant (BATTLE_WON, DONT_RUSH, PROFILE, ...) or None"""
+        return self.cached(msg, 'classify', lambda m: classify_text(m.text))
+    
+    def profile(self, msg):
+        return self.cached(msg, 'profile', lambda m: self.parse_profile(m.text))
+    
+    def battle_rewards(self, msg):
+        return self.cached(msg, 'rewards', lambda m: self.parse_battle_rewards(m.text))
+    
+    def shop_catalog(self, msg):
+        return self.cached(msg, 'catalog', lambda m: self.parse_shop_catalog(m.text, m.buttons))
+    
+    def item_price(self, msg):
+        return self.cached(msg, 'price', lambda m: self.parse_item_price(m.text))
+    
+    def potion_menu(self, msg):
+        return self.cached(msg, 'potions', lambda m: self.parse_potion_menu(m.text, m.buttons))
     
     def parse_battle_rewards(self, text):
         """Parse battle rewards (kept for compatibility)"""
@@ -30,4 +98,107 @@ class GameParser:
             
         except Exception as e:
             logger.error(f"Error parsing battle rewards: {e}")
-            return None
\ No newline at end of file
+            return None
+    
+    def parse_profile(self, text):
+        """Parse character profile message into a stats dict"""
+        if not text or "Рівень" not in text or "Здоров'я:" not in text:
+            return None
+        
+        profile = {}
+        
+        level_match = re.search(r'Рівень (\d+)', text)
+        if level_match:
+            profile['level'] = int(level_match.group(1))
+        
+        hp_match = re.search(r'Здоров\'я: (\d+)/(\d+)', text)
+        if hp_match:
+            profile['hp'] = int(hp_match.group(1))
+            profile['max_hp'] = int(hp_match.group(2))
+        
+        energy_match = re.search(r'Енергія: (\d+)/(\d+)', text)
+        if energy_match:
+            profile['energy'] = int(energy_match.group(1))
+            profile['max_energy'] = int(energy_match.group(2))
+        
+        gold_match = re.search(r'Золото: (\d+)', text)
+        if gold_match:
+            profile['gold'] = int(gold_match.group(1))
+        
+        hp_regen_match = re.search(r'(\d+)хв до повного відновлення здоров\'я', text)
+        profile['hp_regen_minutes'] = int(hp_regen_match.group(1)) if hp_regen_match else None
+        
+        energy_regen_match = re.search(r'(\d+)хв до відновлення енергії', text)
+        profile['energy_regen_minutes'] = int(energy_regen_match.group(1)) if energy_regen_match else None
+        
+        return profile
+    
+    def parse_shop_catalog(self, text, buttons):
+        """
+        Parse the shop item list into {item name: {'row', 'col', 'price'}}.
+        Prices are taken from the button label ("Шкіряні Чоботи - 12💰")
+        or, failing that, from a text line mentioning the item.
+        """
+        catalog = {}
+        if not buttons:
+            return catalog
+        
+        for row_idx, row in enumerate(buttons):
+            for btn_idx, btn in enumerate(row):
+                label = getattr(btn, 'text', btn)
+                if not label or any(word in label for word in ("Назад", "⬅️", "➡️", "←", "→")):
+                    continue
+                
+                price = None
+                price_match = re.search(r'(\d+)\s*💰|💰\s*(\d+)', label)
+                if price_match:
+                    price = int(price_match.group(1) or price_match.group(2))
+                
+                # Strip price and decorations to get the bare item name
+                name = re.sub(r'\(?\s*💰?\s*\d+\s*💰?\s*\)?\s*$', '', label)
+                name = re.sub(r'^[^\w]+', '', name).strip(' -–—:')
+                if not name:
+                    continue
+                
+                if price is None and text:
+                    for line in text.splitlines():
+                        if name in line:
+                            line_price = re.search(r'(\d+)\s*(?:💰|золота)', line)
+                            if line_price:
+                                price = int(line_price.group(1))
+                                break
+                
+                catalog[name] = {'row': row_idx, 'col': btn_idx, 'price': price}
+        
+        return catalog
+    
+    def parse_item_price(self, text):
+        """Parse item price from the item details message"""
+        if not text:
+            return None
+        price_match = re.search(r'Ціна: (\d+)', text)
+        return int(price_match.group(1)) if price_match else None
+    
+    def parse_potion_menu(self, text, buttons):
+        """
+        Parse the battle potion menu ("Оберіть зілля") or a "no potions" reply into
+        {potion name: count}, count None when the label does not show it
+        ("🧪 Мале зілля здоров'я (3)", "... x3", "... 3 шт"). Returns {} when no
+        potions are left and None for other messages.
+        """
+        if not text or ("Оберіть зілля" not in text and "немає зіл" not in text.lower()):
+            return None
+        
+        potions = {}
+        for row in buttons or []:
+            for btn in row:
+                label = getattr(btn, 'text', btn)
+                if not label or any(word in label for word in ("Назад", "⬅️", "➡️", "←", "→")):
+                    continue
+                count_match = re.search(r'\(\s*(\d+)\s*(?:шт\.?)?\s*\)|[x×]\s*(\d+)|(\d+)\s*шт', label)
+                count = int(next(group for group in count_match.groups() if group)) if count_match else None
+                name = label[:count_match.start()] if count_match else label
+                name = re.sub(r'^[^\w]+', '', name).strip(' -–—:')
+                if name:
+                    potions[name] = count
+        return potions
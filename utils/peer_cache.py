@@ -0,0 +1,72 @@
+"""
+Local cache of resolved peers (id + access hash) per session.
+
+Resolving the game bot by username costs a network round-trip on every
+start; with a cached access hash the InputPeer is built locally. Access
+hashes are per account, so entries are keyed by session name.
+"""
+
+import json
+import os
+from pathlib import Path
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class PeerCache:
+    """JSON file of session -> username -> {id, access_hash}"""
+
+    def __init__(self, path, session_name):
+        self.path = Path(path)
+        self.session_name = session_name
+        self.data = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.data = json.load(f)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable peer cache {self.path}: {e}")
+
+    @classmethod
+    def from_config(cls, config):
+        """Cache from PEER_CACHE_PATH, None when disabled"""
+        return cls(config.PEER_CACHE_PATH, config.SESSION_NAME) if config.PEER_CACHE_PATH else None
+
+    @staticmethod
+    def _key(username):
+        return username.lstrip('@').lower()
+
+    def get(self, username):
+        """InputPeerUser for username, None if not cached"""
+        entry = self.data.get(self.session_name, {}).get(self._key(username))
+        if not entry:
+            return None
+        from telethon.tl.types import InputPeerUser
+        return InputPeerUser(entry['id'], entry['access_hash'])
+
+    def put(self, username, entity):
+        """Store a resolved user entity (ignored if it has no access hash)"""
+        access_hash = getattr(entity, 'access_hash', None)
+        if access_hash is None:
+            return
+        self.data.setdefault(self.session_name, {})[self._key(username)] = {
+            'id': entity.id, 'access_hash': access_hash
+        }
+        self.save()
+
+    def invalidate(self, username):
+        """Forget username, e.g. after Telegram rejected the cached peer"""
+        if self.data.get(self.session_name, {}).pop(self._key(username), None) is not None:
+            logger.info(f"Dropped cached peer for {username}")
+            self.save()
+
+    def save(self):
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Error saving peer cache: {e}")
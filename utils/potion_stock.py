@@ -0,0 +1,98 @@
+"""
+Potion stock tracking for automatic restock runs
+"""
+
+import time
+
+from utils import metrics
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+POTIONS = metrics.Gauge('ostromag_potions', 'Potions left as last seen in the battle potion menu')
+RESTOCKS = metrics.Counter('ostromag_potion_restocks_total', 'Potion restock trips by outcome', ('outcome',))
+
+
+class PotionStock:
+    """
+    Potion count learned from the battle potion menu, decremented on use.
+    Unknown (None) until the menu has been seen once; a restock is due when
+    the known count drops below POTION_RESTOCK_BELOW and the HP wait is long
+    enough to shop during it. While none are left battles skip the potion
+    menu; after POTION_RESTOCK_COOLDOWN the menu is checked again.
+    """
+
+    def __init__(self, config, count=None):
+        """Initialize with config (restock settings are read on every check) and a restored count"""
+        self.config = config
+        self.count = None
+        self.last_restock = None  # time.monotonic() of the last trip
+        self.empty_since = None  # time.monotonic() when the count dropped to 0
+        self.price = None  # Shop price seen on the last trip
+        self.restocks = 0
+        self.bought = 0
+        if count is not None:
+            self.set(count)
+
+    def set(self, count):
+        if count != self.count:
+            logger.info(f"Potions left: {count}")
+        if count == 0 and self.count != 0:
+            self.empty_since = time.monotonic()
+        self.count = count
+        if count is not None:
+            POTIONS.set(count)
+
+    def observe_menu(self, potions):
+        """Update from a parsed potion menu (utils.parser.GameParser.potion_menu)"""
+        if potions is None:
+            return
+        if not potions:
+            self.set(0)
+        elif all(count is not None for count in potions.values()):
+            self.set(sum(potions.values()))
+        elif self.count == 0:
+            self.set(None)  # Potions are back but the menu does not show how many
+
+    def used(self):
+        """A potion was selected in battle"""
+        if self.count:
+            self.set(self.count - 1)
+
+    def empty(self):
+        """True when no potions are known to be left (battles skip the potion menu)"""
+        if self.count != 0:
+            return False
+        if time.monotonic() - self.empty_since >= self.config.POTION_RESTOCK_COOLDOWN:
+            self.count = None  # Look at the menu again in case potions were bought by hand
+            return False
+        return True
+
+    def restock_due(self, wait_minutes, gold=None):
+        """True when stock is low, an HP wait of wait_minutes leaves time to shop and gold buys one"""
+        config = self.config
+        if config.POTION_RESTOCK_BELOW <= 0 or self.count is None or self.count >= config.POTION_RESTOCK_BELOW:
+            return False
+        if not wait_minutes or wait_minutes < config.POTION_RESTOCK_MIN_WAIT:
+            return False
+        if self.price and gold is not None and gold < self.price:
+            return False
+        # Do not retry a failed trip on every HP wait
+        if self.last_restock is not None and time.monotonic() - self.last_restock < config.POTION_RESTOCK_COOLDOWN:
+            return False
+        return True
+
+    def wanted(self):
+        """Potions to buy to reach POTION_RESTOCK_TARGET"""
+        return max(self.config.POTION_RESTOCK_TARGET - (self.count or 0), 0)
+
+    def restocked(self, bought, price=None):
+        """Record a finished restock trip and the price seen in the shop"""
+        self.last_restock = time.monotonic()
+        if price:
+            self.price = price
+        self.restocks += 1
+        self.bought += bought
+        RESTOCKS.inc(outcome='bought' if bought else 'failed')
+        if bought:
+            self.set((self.count or 0) + bought)
@@ -0,0 +1,52 @@
+"""
+Process setup and teardown shared by the entry points (main.py, daemon.py,
+buying_bot.py, disassembly_bot.py).
+
+setup() turns on the diagnostics the config asks for before the client
+connects, start_services() starts what needs a connected client around it
+(metrics endpoint, .env watcher, memory probe signal) and teardown() writes
+the summaries and stops it all again, whatever of it was started.
+"""
+
+import asyncio
+import signal
+
+from utils import config_reload, loop_monitor, memory_probe, metrics, parse_cache, tracing, traffic_log, update_filter
+
+
+def setup(config):
+    """Tracing, traffic recording, update filter and loop monitor, as configured"""
+    if config.TRACE_FILE:
+        tracing.enable_tracing(config.TRACE_FILE)
+    if config.TRAFFIC_LOG:
+        traffic_log.enable_recording(config.TRAFFIC_LOG)
+    if config.UPDATE_FILTER:
+        update_filter.enable_filtering()
+    if config.LOOP_MONITOR:
+        loop_monitor.start(slow_callback=config.SLOW_CALLBACK_MS / 1000, time_callbacks=config.LOOP_CALLBACK_TIMING)
+
+
+async def start_services(config, watch_config=False):
+    """Metrics endpoint, .env watcher (watch_config) and kill -USR1 memory snapshots"""
+    if config.METRICS_PORT:
+        await metrics.start_metrics_server(config.METRICS_HOST, config.METRICS_PORT,
+                                           lag_interval=0 if config.LOOP_MONITOR else 0.5)
+
+    # Watch .env and the escape mob list, changes are applied by the bots at safe points
+    if watch_config:
+        config_reload.start(config)
+
+    # kill -USR1 <pid> logs a memory snapshot (the first one starts tracemalloc)
+    if hasattr(signal, 'SIGUSR1'):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, memory_probe.log_snapshot)
+
+
+def teardown():
+    """Write the trace and recordings, log the summaries and stop background work"""
+    tracing.finish_tracing()
+    traffic_log.stop_recording()
+    update_filter.log_summary()
+    parse_cache.get_cache().log_summary()
+    loop_monitor.stop()
+    config_reload.stop()
+    memory_probe.stop()
@@ -0,0 +1,215 @@
+"""
+Phase-level tracing - spans written as Chrome trace-event JSON (chrome://tracing, Perfetto).
+
+Spans have a category: 'sleep' and 'network' mark leaf waits (tracing.sleep and
+GameClient calls), everything else is a phase. The summary splits traced wall
+time into sleeping, waiting on network and computing, and ranks the sleeps.
+Tracing is disabled (spans are no-ops) until enable_tracing() is called.
+"""
+
+import asyncio
+import contextvars
+import functools
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SLEEP = 'sleep'
+NETWORK = 'network'
+PHASE = 'phase'
+
+_depth = contextvars.ContextVar('trace_depth', default=0)
+
+
+class _NoopSpan:
+    """Span used while tracing is disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    """Active span, records a complete ('X') event on exit"""
+
+    __slots__ = ('tracer', 'name', 'cat', 'args', 'start', 'token')
+
+    def __init__(self, tracer, name, cat, args):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.token = _depth.set(_depth.get() + 1)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        depth = _depth.get() - 1
+        _depth.reset(self.token)
+        self.tracer.add(self.name, self.cat, self.start, end, depth, self.args)
+        return False
+
+
+class Tracer:
+    """Collects spans in memory and writes them as Chrome trace events"""
+
+    def __init__(self, path, max_events=500000):
+        self.path = path
+        self.max_events = max_events
+        self.events = []
+        self.dropped = 0
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.task_ids = {}
+
+    def _tid(self):
+        """One trace row per asyncio task"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        key = id(task) if task else 0
+        tid = self.task_ids.get(key)
+        if tid is None:
+            tid = self.task_ids[key] = len(self.task_ids) + 1
+        return tid
+
+    def add(self, name, cat, start, end, depth, args=None):
+        """Store a finished span"""
+        if len(self.events) >= self.max_events:
+            self.dropped += 1
+            return
+        self.events.append((name, cat, start, end, depth, self._tid(), args))
+
+    def save(self):
+        """Write Chrome trace-event JSON"""
+        trace = []
+        for name, cat, start, end, depth, tid, args in self.events:
+            event = {
+                'name': name, 'cat': cat, 'ph': 'X', 'pid': self.pid, 'tid': tid,
+                'ts': round((start - self.origin) * 1e6, 1),
+                'dur': round((end - start) * 1e6, 1)
+            }
+            if args:
+                event['args'] = args
+            trace.append(event)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+        os.replace(tmp_path, self.path)
+
+    def summary(self):
+        """Time split by category, per-phase totals and the costliest sleeps"""
+        root_time = 0.0
+        category_time = defaultdict(float)
+        phases = defaultdict(lambda: [0, 0.0])
+        sleeps = defaultdict(lambda: [0, 0.0])
+
+        for name, cat, start, end, depth, tid, args in self.events:
+            duration = end - start
+            if depth == 0:
+                root_time += duration
+            if cat in (SLEEP, NETWORK):
+                category_time[cat] += duration
+                if cat == SLEEP:
+                    sleeps[name][0] += 1
+                    sleeps[name][1] += duration
+            else:
+                phases[name][0] += 1
+                phases[name][1] += duration
+
+        lines = []
+        if root_time <= 0:
+            return "No spans recorded"
+        sleep_share = category_time[SLEEP] / root_time
+        network_share = category_time[NETWORK] / root_time
+        lines.append(f"Traced wall time: {root_time:.1f}s - sleeping {sleep_share:.1%}, "
+                     f"network {network_share:.1%}, compute {max(1 - sleep_share - network_share, 0):.1%}")
+        lines.append("Phases (inclusive time):")
+        for name, (count, total) in sorted(phases.items(), key=lambda item: item[1][1], reverse=True):
+            lines.append(f"  {name:<28} {total:10.1f}s {total / root_time:7.1%}  x{count}")
+        lines.append("Sleeps (by total time):")
+        for name, (count, total) in sorted(sleeps.items(), key=lambda item: item[1][1], reverse=True)[:15]:
+            lines.append(f"  {name:<28} {total:10.1f}s {total / root_time:7.1%}  x{count}")
+        if self.dropped:
+            lines.append(f"({self.dropped} spans dropped after {self.max_events} events)")
+        return '\n'.join(lines)
+
+
+_tracer = None
+
+
+def enable_tracing(path, max_events=500000):
+    """Start collecting spans, written to path by finish_tracing()"""
+    global _tracer
+    _tracer = Tracer(path, max_events)
+    logger.info(f"Tracing enabled, spans will be written to {path}")
+    return _tracer
+
+
+def finish_tracing():
+    """Write trace file and log the time summary"""
+    global _tracer
+    if _tracer is None:
+        return
+    tracer, _tracer = _tracer, None
+    try:
+        tracer.save()
+        logger.info(f"Trace written to {tracer.path} ({len(tracer.events)} spans)\n{tracer.summary()}")
+    except Exception as e:
+        logger.error(f"Error writing trace: {e}")
+
+
+def span(name, cat=PHASE, **args):
+    """Context manager timing a block: with tracing.span('explore'): ..."""
+    if _tracer is None:
+        return _NOOP
+    return _Span(_tracer, name, cat, args or None)
+
+
+def traced(name=None, cat=PHASE):
+    """Decorator timing every call of a sync or async function"""
+    def decorator(func):
+        span_name = name or func.__name__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _tracer is None:
+                    return await func(*args, **kwargs)
+                with _Span(_tracer, span_name, cat, None):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _Span(_tracer, span_name, cat, None):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def sleep(seconds, name=None):
+    """asyncio.sleep recorded as a 'sleep' span named after the caller"""
+    if _tracer is None:
+        await asyncio.sleep(seconds)
+        return
+    if name is None:
+        name = f"{sys._getframe(1).f_code.co_name} {seconds:g}s"
+    with _Span(_tracer, name, SLEEP, None):
+        await asyncio.sleep(seconds)
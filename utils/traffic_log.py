@@ -0,0 +1,430 @@
+"""
+Record and replay of game chat traffic.
+
+TrafficRecorder appends every incoming game message/edit and our own commands
+and clicks to a JSON-lines log, with a binary offset index (.idx, one uint64
+per record) so any record can be read without scanning the log.
+
+TrafficLog memory-maps a recorded log, and StandInClient replays it into any
+of the bots in place of TelegramClient, at original or accelerated timing.
+
+    python -m utils.traffic_log replay traffic.log --bot auto --speed 20
+    python -m utils.traffic_log info traffic.log
+
+A replay keeps its state files (battle database, checkpoint, escape table,
+energy_data.json) in a temporary directory, so it never touches the live bot's files.
+"""
+
+import asyncio
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+_OFFSET = struct.Struct('<Q')
+
+# Record types
+NEW = 'new'
+EDIT = 'edit'
+SEND = 'send'
+CLICK = 'click'
+
+
+def _timestamp(value):
+    """datetime -> unix seconds (None stays None)"""
+    return value.timestamp() if value else None
+
+
+def button_labels(buttons):
+    """Button grid -> list of rows of labels"""
+    return [[btn.text for btn in row] for row in buttons] if buttons else None
+
+
+class TrafficRecorder:
+    """Append-only recorder of game chat traffic"""
+
+    def __init__(self, path):
+        """Open log and its offset index for appending"""
+        self.path = Path(path)
+        self.index_path = Path(f"{path}.idx")
+        self.log_file = open(self.path, 'ab')
+        self.index_file = open(self.index_path, 'ab')
+        self.records = 0
+
+    def write(self, record):
+        """Append one record and its offset"""
+        if self.log_file.closed:
+            return
+        offset = self.log_file.tell()
+        self.log_file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode() + b'\n')
+        self.index_file.write(_OFFSET.pack(offset))
+        self.records += 1
+        if self.records % 20 == 0:
+            self.flush()
+
+    def record_message(self, msg, kind=NEW):
+        """Record an incoming (or edited) chat message"""
+        self.write({
+            't': time.time(),
+            'k': kind,
+            'id': msg.id,
+            'date': _timestamp(msg.date),
+            'edit': _timestamp(getattr(msg, 'edit_date', None)),
+            'out': bool(getattr(msg, 'out', False)),
+            'text': msg.text or '',
+            'btn': button_labels(msg.buttons)
+        })
+
+    def record_send(self, text, sent=None):
+        """Record a command we sent"""
+        self.write({'t': time.time(), 'k': SEND, 'text': text, 'id': getattr(sent, 'id', None)})
+
+    def record_click(self, msg, args):
+        """Record a button click on a message"""
+        self.write({'t': time.time(), 'k': CLICK, 'id': msg.id, 'pos': list(args)})
+
+    def attach(self, client, chat):
+        """Subscribe to new and edited messages of the game chat"""
+        from telethon import events
+
+        async def on_new(event):
+            self.record_message(event.message, NEW)
+
+        async def on_edit(event):
+            self.record_message(event.message, EDIT)
+
+        client.add_event_handler(on_new, events.NewMessage(chats=chat))
+        client.add_event_handler(on_edit, events.MessageEdited(chats=chat))
+        logger.info(f"Recording game chat traffic to {self.path}")
+
+    def flush(self):
+        self.log_file.flush()
+        self.index_file.flush()
+
+    def close(self):
+        if not self.log_file.closed:
+            self.flush()
+            self.log_file.close()
+            self.index_file.close()
+
+
+class TrafficLog:
+    """Memory-mapped read access to a recorded log"""
+
+    def __init__(self, path):
+        """Map log and load offsets (rebuilt from newlines if the index is missing)"""
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+        index_path = Path(f"{path}.idx")
+        if index_path.exists():
+            raw = index_path.read_bytes()
+            self.offsets = [offset for (offset,) in _OFFSET.iter_unpack(raw[:len(raw) - len(raw) % 8])]
+        else:
+            self.offsets = self._scan_offsets()
+
+    def _scan_offsets(self):
+        offsets, position = [], 0
+        while position < len(self.data):
+            offsets.append(position)
+            end = self.data.find(b'\n', position)
+            if end < 0:
+                break
+            position = end + 1
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        """Decode record number index"""
+        start = self.offsets[index]
+        end = self.data.find(b'\n', start)
+        return json.loads(self.data[start:end if end >= 0 else len(self.data)])
+
+    def __iter__(self):
+        for index in range(len(self.offsets)):
+            yield self[index]
+
+
+class StandInButton:
+    """Inline button with a label"""
+
+    def __init__(self, text):
+        self.text = text
+
+
+class StandInMessage:
+    """Message object with the attributes and click() the bots use"""
+
+    def __init__(self, client, msg_id, text, buttons=None, date=None, edit_date=None, out=False):
+        self._client = client
+        self.id = msg_id
+        self.out = out
+        self.date = date or datetime.now(timezone.utc)
+        self.update(text, buttons, edit_date)
+
+    def update(self, text, buttons, edit_date=None):
+        self.text = text
+        self.raw_text = text
+        self.message = text
+        self.edit_date = edit_date
+        self.buttons = [[StandInButton(label) for label in row] for row in buttons] if buttons else None
+
+    async def click(self, i=None, j=None, **kwargs):
+        """Record the click; the game's reaction comes from the replayed log"""
+        label = None
+        if self.buttons and i is not None:
+            row = self.buttons[i] if j is not None else [b for r in self.buttons for b in r]
+            index = j if j is not None else i
+            if 0 <= index < len(row):
+                label = row[index].text
+        self._client.actions.append((self._client.now(), CLICK, self.id, label))
+        self._client.on_click(self, label)
+        return None
+
+
+class StandInEntity:
+    """Resolved game bot peer"""
+
+    def __init__(self, username):
+        self.id = 1
+        self.username = username.lstrip('@')
+
+
+class StandInClient:
+    """
+    Stand-in for TelegramClient serving a replayed (or scripted) game chat.
+
+    Incoming records are applied to the chat at their recorded time offsets
+    divided by speed; our own send/click records are skipped, the bot under
+    test produces its own, which are collected in self.actions.
+    """
+
+    def __init__(self, traffic=None, speed=1.0):
+        self.traffic = traffic
+        self.speed = speed
+        self.messages = {}
+        self.next_id = 1
+        self.actions = []
+        self.handlers = []
+        self.exhausted = asyncio.Event()
+        self.started_at = None
+        self.feed_task = None
+        self._disconnected = None
+
+    def now(self):
+        loop = asyncio.get_running_loop()
+        return loop.time() - self.started_at if self.started_at is not None else 0.0
+
+    async def start(self, *args, **kwargs):
+        """Begin feeding recorded traffic"""
+        self.started_at = asyncio.get_running_loop().time()
+        self._disconnected = asyncio.get_running_loop().create_future()
+        if self.traffic is not None:
+            self.feed_task = asyncio.create_task(self._feed())
+        return self
+
+    async def connect(self):
+        return await self.start()
+
+    def is_connected(self):
+        return True
+
+    @property
+    def disconnected(self):
+        """Future resolved by disconnect(), like TelegramClient.disconnected"""
+        if self._disconnected is None:
+            self._disconnected = asyncio.get_running_loop().create_future()
+        return asyncio.shield(self._disconnected)
+
+    async def disconnect(self):
+        if self.feed_task:
+            self.feed_task.cancel()
+        if self._disconnected is not None and not self._disconnected.done():
+            self._disconnected.set_result(None)
+
+    async def run_until_disconnected(self):
+        await self.exhausted.wait()
+
+    def add_event_handler(self, callback, event=None):
+        self.handlers.append((callback, event))
+
+    async def _feed(self):
+        """Apply incoming records at (accelerated) original timing"""
+        loop = asyncio.get_running_loop()
+        first_time = None
+        for record in self.traffic:
+            if record['k'] not in (NEW, EDIT) or record.get('out'):
+                continue
+            if first_time is None:
+                first_time = record['t']
+            due = self.started_at + (record['t'] - first_time) / self.speed
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.apply(record)
+        self.exhausted.set()
+
+    def apply(self, record):
+        """Put a recorded message (or its edit) into the chat"""
+        date = datetime.fromtimestamp(record['date'], timezone.utc) if record.get('date') else None
+        edit_date = datetime.fromtimestamp(record['edit'], timezone.utc) if record.get('edit') else None
+        msg = self.messages.get(record['id'])
+        if msg is None:
+            msg = self.messages[record['id']] = StandInMessage(self, record['id'], record['text'], record.get('btn'),
+                                                              date, edit_date, record.get('out', False))
+        else:
+            msg.update(record['text'], record.get('btn'), edit_date)
+        self.next_id = max(self.next_id, record['id'] + 1)
+        return msg
+
+    def add_message(self, text, buttons=None, out=False):
+        """Script a new incoming message (for tests and soak runs)"""
+        record = {'id': self.next_id, 'text': text, 'btn': buttons, 'out': out, 'date': time.time()}
+        return self.apply(record)
+
+    def on_click(self, msg, label):
+        """Game reaction to a click - none here, scripted stand-ins (soak test) override this"""
+
+    async def get_entity(self, entity):
+        return StandInEntity(str(entity))
+
+    async def send_message(self, entity, message, **kwargs):
+        """Record our command as an outgoing message"""
+        self.actions.append((self.now(), SEND, None, message))
+        return self.add_message(message, out=True)
+
+    async def get_messages(self, entity, limit=None, ids=None, min_id=0, **kwargs):
+        """Newest-first history like TelegramClient.get_messages"""
+        if ids is not None:
+            if isinstance(ids, (list, tuple)):
+                return [self.messages.get(msg_id) for msg_id in ids]
+            return self.messages.get(ids)
+        history = [self.messages[msg_id] for msg_id in sorted(self.messages, reverse=True) if msg_id > min_id]
+        return history[:limit] if limit is not None else history
+
+
+_recorder = None
+
+
+def enable_recording(path):
+    """Start recording game chat traffic to path (GameClient picks it up)"""
+    global _recorder
+    _recorder = TrafficRecorder(path)
+    return _recorder
+
+
+def get_recorder():
+    return _recorder
+
+
+def stop_recording():
+    """Flush and close the active recorder"""
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        logger.info(f"Recorded {_recorder.records} traffic records to {_recorder.path}")
+        _recorder = None
+
+
+def replay_config(directory):
+    """Config with all state files in directory and no recording of the replay itself"""
+    import sys
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    from config import Config
+
+    directory = Path(directory)
+    config = Config()
+    config.BATTLE_DB_PATH = str(directory / 'battles.db')
+    config.CHECKPOINT_PATH = str(directory / 'checkpoint.json')
+    config.ESCAPE_TABLE_PATH = str(directory / 'escape_table.json')
+    config.PEER_CACHE_PATH = ''
+    config.TRAFFIC_LOG = ''
+    return config
+
+
+async def replay(path, bot='auto', speed=1.0, item=None, grace=5.0):
+    """Run a bot against a recorded log, returns the stand-in client with collected actions"""
+    path = Path(path).resolve()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix='ostromag-replay-') as directory:
+        config = replay_config(directory)
+        os.chdir(directory)  # EnergyTracker keeps energy_data.json in the working directory
+        try:
+            return await _replay(path, config, bot, speed, item, grace)
+        finally:
+            os.chdir(cwd)
+
+
+async def _replay(path, config, bot, speed, item, grace):
+    client = StandInClient(TrafficLog(path), speed)
+    await client.start()
+
+    game_bot = None
+    if bot == 'auto':
+        from modules.game_bot import GameBot
+        game_bot = GameBot(client, config)
+        runner = game_bot.start()
+    elif bot == 'buy':
+        from buying_bot import BuyingBot
+        runner = BuyingBot(client, config, item or "Шкіряні Чоботи").start_buying_process()
+    elif bot == 'disassemble':
+        from disassembly_bot import DisassemblyBot
+        runner = DisassemblyBot(client, config, item or "Шкіряні Чоботи").start_disassembly_process()
+    else:
+        raise ValueError(f"Unknown bot '{bot}'")
+
+    started = time.perf_counter()
+    task = asyncio.create_task(runner)
+    await client.exhausted.wait()
+    await asyncio.sleep(grace)
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+    if game_bot:
+        await game_bot.stop()  # Flush the battle store and checkpoint before their directory goes
+    await client.disconnect()
+
+    logger.info(f"Replayed {len(client.traffic)} records in {time.perf_counter() - started:.1f}s, "
+                f"bot made {len(client.actions)} actions")
+    return client
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Game chat traffic log tools')
+    sub = parser.add_subparsers(dest='command', required=True)
+    info_parser = sub.add_parser('info', help='Summarize a recorded log')
+    info_parser.add_argument('path')
+    replay_parser = sub.add_parser('replay', help='Replay a recorded log into a bot')
+    replay_parser.add_argument('path')
+    replay_parser.add_argument('--bot', choices=('auto', 'buy', 'disassemble'), default='auto')
+    replay_parser.add_argument('--speed', type=float, default=1.0, help='Timing acceleration (default: 1.0)')
+    replay_parser.add_argument('--item', default=None, help='Item for buy/disassemble bots')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        traffic = TrafficLog(args.path)
+        kinds = {}
+        for record in traffic:
+            kinds[record['k']] = kinds.get(record['k'], 0) + 1
+        span = traffic[-1]['t'] - traffic[0]['t'] if len(traffic) else 0
+        print(f"{len(traffic)} records over {span / 3600:.1f}h: {kinds}")
+    else:
+        result = asyncio.run(replay(args.path, args.bot, args.speed, args.item))
+        for at, kind, msg_id, detail in result.actions:
+            print(f"{at:9.2f}s {kind:<6} {msg_id or '':<8} {detail}")
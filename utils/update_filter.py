@@ -0,0 +1,153 @@
+"""
+Early filtering of Telegram updates to the game chat.
+
+A userbot receives updates for every dialog of the account. Telethon stores
+the users/chats of every update batch in the session database and builds
+events for each update before any handler can ignore it. The filter wraps
+the client's update preprocessing: updates whose peer is not the game bot are
+dropped there, before session entity writes and event dispatch, and only the
+game bot and our own user are passed on as entities. The in-memory entity
+cache is still fed every batch, Telethon needs the access hashes to recover
+from update gaps.
+
+Counters: processed vs dropped updates, time spent filtering and an estimate
+of time saved (dropped updates x average cost of processing a kept update).
+"""
+
+import inspect
+import time
+
+from utils import metrics
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+UPDATES = metrics.Counter('ostromag_updates_total', 'Telegram updates by filter result', ('result',))
+FILTER_SECONDS = metrics.Counter('ostromag_update_filter_seconds_total', 'Time spent filtering updates')
+SAVED_SECONDS = metrics.Counter('ostromag_update_filter_saved_seconds_total',
+                                'Estimated processing time saved by dropping updates')
+
+
+def update_peer_id(update):
+    """Marked peer id an update belongs to, None if it has no single peer"""
+    message = getattr(update, 'message', None)
+    peer = getattr(message, 'peer_id', None)
+    if peer is not None:
+        if hasattr(peer, 'user_id'):
+            return peer.user_id
+        if hasattr(peer, 'chat_id'):
+            return -peer.chat_id
+        return -1000000000000 - peer.channel_id
+    # Short updates (only seen if not already adapted by Telethon)
+    if hasattr(update, 'user_id') and hasattr(update, 'pts'):
+        return update.user_id
+    peer = getattr(update, 'peer', None)
+    if peer is not None and hasattr(peer, 'user_id'):
+        return peer.user_id
+    return None
+
+
+class UpdateFilter:
+    """Drops non-game-chat updates inside the client's update pipeline"""
+
+    def __init__(self, client, peer_id):
+        """client: TelegramClient, peer_id: marked id of the game bot"""
+        self.client = client
+        self.peer_id = peer_id
+        self.processed = 0
+        self.dropped = 0
+        self.filter_seconds = 0.0
+        self.kept_seconds = 0.0
+        self._preprocess = client._preprocess_updates
+        self._dispatch = client._dispatch_update
+        client._preprocess_updates = self.preprocess
+        client._dispatch_update = self.dispatch
+
+    def preprocess(self, updates, users, chats):
+        """
+        Plain function like the original: Telethon before 1.40 calls it synchronously and
+        gets a list, later versions await what it returns - so the original's result is
+        passed through as it is (a list or an awaitable).
+        """
+        started = time.perf_counter()
+        peer_id = self.peer_id
+        kept = [update for update in updates if update_peer_id(update) == peer_id]
+        dropped = len(updates) - len(kept)
+
+        # Message box needs every access hash for gap recovery; session and events only need ours.
+        # The original caches what it is given, so only the entities filtered out are added here.
+        self_id = self.client._mb_entity_cache.self_id
+        other_users = [user for user in users if user.id != peer_id and user.id != self_id]
+        if other_users or chats:
+            self.client._mb_entity_cache.extend(other_users, chats)
+        users = [user for user in users if user.id == peer_id or user.id == self_id] if kept else []
+        filter_time = time.perf_counter() - started
+        self.filter_seconds += filter_time
+        FILTER_SECONDS.inc(filter_time)
+
+        if dropped:
+            self.dropped += dropped
+            UPDATES.inc(dropped, result='dropped')
+            if self.processed:
+                SAVED_SECONDS.inc(dropped * self.kept_seconds / self.processed)
+        if not kept:
+            return self._preprocess([], [], [])
+
+        started = time.perf_counter()
+        result = self._preprocess(kept, users, [])
+        if inspect.isawaitable(result):
+            return self._timed(result, started, len(kept))
+        self._count_kept(started, len(kept))
+        return result
+
+    async def _timed(self, result, started, kept):
+        try:
+            return await result
+        finally:
+            self._count_kept(started, kept)
+
+    def _count_kept(self, started, kept):
+        self.kept_seconds += time.perf_counter() - started
+        self.processed += kept
+        UPDATES.inc(kept, result='processed')
+
+    async def dispatch(self, update):
+        started = time.perf_counter()
+        try:
+            return await self._dispatch(update)
+        finally:
+            self.kept_seconds += time.perf_counter() - started
+
+    def summary(self):
+        saved = self.dropped * self.kept_seconds / self.processed if self.processed else 0.0
+        return (f"Updates: {self.processed} processed, {self.dropped} dropped; "
+                f"filtering took {self.filter_seconds * 1000:.1f}ms, saved ~{saved:.2f}s")
+
+
+_enabled = False
+_filter = None
+
+
+def enable_filtering():
+    """Filter updates once a bot resolves the game chat (GameClient.watch_chat)"""
+    global _enabled
+    _enabled = True
+
+
+def install(client, chat):
+    """Install the filter for chat on client if filtering is enabled"""
+    global _filter
+    if not _enabled or _filter is not None:
+        return _filter
+    if not hasattr(client, '_preprocess_updates') or not hasattr(client, '_mb_entity_cache'):
+        logger.warning("Update filtering not supported by this client, all updates will be processed")
+        return None
+    from telethon import utils as tl_utils
+    _filter = UpdateFilter(client, tl_utils.get_peer_id(chat))
+    logger.info(f"Filtering updates to game chat {_filter.peer_id}")
+    return _filter
+
+
+def log_summary():
+    if _filter is not None:
+        logger.info(_filter.summary())